@@ -41,22 +41,25 @@ Writer:
 - write column names of dataframe
 - write "Data" line
 - write content of dataframe excluding column names
+>> ale_iter_lines: yields the ALE as text chunks, ale_write: writes to any text or binary file-like object,
+   ale_rewrite: writes to the "altered_ale" subfolder on disk
 """
 
+import codecs
 from datetime import datetime
+import io
+import os
 import pandas as pd
-import subprocess
 from printme import *
-import chardet
+from services.encoding import sniff_encoding
 from swdit_logger import get_logger
 
+# Bump whenever the parsed output changes so cached results are invalidated
+PARSER_VERSION = '3'
 
-# FUNCTION 0: Check for proper linebreaks
-def check_line_breaks(file_path):
-    # Read file as binary
-    with open(file_path, 'rb') as file:
-        content = file.read()
 
+# FUNCTION 0: Check for proper linebreaks
+def count_line_breaks(content):
     # Count the occurrences of different types of line breaks
     crlf_count = content.count(b'\r\n')  # Windows-style line breaks
     lf_count = content.count(b'\n') - crlf_count  # Unix/MacOS-style line breaks
@@ -88,13 +91,15 @@ def check_line_breaks(file_path):
     }
 
 
+def check_line_breaks(file_path):
+    # Read file as binary
+    with open(file_path, 'rb') as file:
+        return count_line_breaks(file.read())
+
+
 # FUNCTION 1: Read ALE file into pandas dataframe and headerdict
 def ale_read_parser(ale_file, log_level="INFO", check_tape_length=True):   # provide file (filepath) of the ale file as argument
-    # Set up logger
     logger = get_logger(__name__, level=log_level)
-    logger.info(grey + f"logging startet - reading file: {ale_file}" + clrs)
-    logger.info(grey + "Set 'log_level' to 'WARNING' or 'ERROR' to receive less logging output. "
-                       "Set to 'CRITICAL' to receive no logging output" + clrs)
 
     try:
         if not ale_file.lower().endswith(".ale"):
@@ -103,145 +108,242 @@ def ale_read_parser(ale_file, log_level="INFO", check_tape_length=True):   # pro
     except (IndexError, ValueError) as e:
         logger.error(f"Error reading file {ale_file}: {e}")
         return None, None, None, None, None
+
+    # Only read of the file - everything else works on the buffer
+    with open(ale_file, 'rb') as ale:
+        content = ale.read()
+    return ale_read_buffer(content, ale_file, log_level=log_level, check_tape_length=check_tape_length)
+
+
+# FUNCTION 1b: Read ALE from a bytes buffer or binary stream in a single pass
+def ale_read_buffer(data, ale_name="<buffer>", log_level="INFO", check_tape_length=True):
+    # Set up logger
+    logger = get_logger(__name__, level=log_level)
+    logger.info(grey + f"logging startet - reading file: {ale_name}" + clrs)
+    logger.info(grey + "Set 'log_level' to 'WARNING' or 'ERROR' to receive less logging output. "
+                       "Set to 'CRITICAL' to receive no logging output" + clrs)
+
+    content = data.read() if hasattr(data, 'read') else bytes(data)
+
     # Check for proper linebreaks
     logger.info(grey + "Checking for proper linebreaks" + clrs)
-    line_break_info = check_line_breaks(ale_file)
+    line_break_info = count_line_breaks(content)
+    if line_break_info["CR"] and line_break_info["consistency"]:
+        # CR-only files (classic Mac) are normalized to LF instead of rejected
+        logger.warning(yellow + "Converting deprecated 'CR' line breaks to 'LF'" + clrs)
+        content = content.replace(b'\r', b'\n')
+        line_break_info = count_line_breaks(content)
     if not line_break_info["consistency"]:
         logger.warning(yellow + "Linebreaks are not consistent" + clrs)
         logger.warning(yellow + str(line_break_info) + clrs)
     if line_break_info["CR"]:
-        logger.error(red + f"Error in '{ale_file}' - Contains deprecated 'CR' line breaks " + clrs)
+        logger.error(red + f"Error in '{ale_name}' - Contains deprecated 'CR' line breaks " + clrs)
         logger.error(red + str(line_break_info) + clrs)
         raise ValueError("Deprecated 'CR' line breaks found.")
 
     # Check encoding of file
     logger.info(grey + "Checking encoding of file" + clrs)
-    encoding = chardet.detect(open(ale_file, 'rb').read())['encoding']
+    encoding = sniff_encoding(content)
     encoding = encoding.lower().replace("ISO-", "iso")
     encoding = encoding.lower().replace(" ", "_").replace("-", "_")
     logger.debug(grey + f"Encoding of file is: {encoding}" + clrs)
-    # First Read of the Original ALE and Check for Delimiter Status
-    with open(ale_file, 'r', encoding=encoding, newline='') as ale:
-        firstline = ale.readline()
-        scndline = ale.readline()
-        if "Heading" not in firstline:
-            if "COMMAS" in firstline:
-                delim = ","
-                logger.debug(grey + "This is a comma separated ALE file" + clrs)
-            elif "TABS" in firstline:
-                delim = "\t"
-                logger.debug(grey + "This is a tab separated ALE file" + clrs)
-            else:
-                logger.error(red + "@DELIM - This is not a valid ALE file" + clrs)
-                logger.error(red + f"{firstline}" + clrs)
-                raise ValueError("Invalid ALE file delimiter.")
-        elif "Heading" in firstline:
-            if "COMMAS" in scndline:
-                delim = ","
-                logger.debug(grey + "This is a comma separated ALE file" + clrs)
-            elif "TABS" in scndline:
-                delim = "\t"
-                logger.debug(grey + "This is a tab separated ALE file" + clrs)
-            else:
-                logger.error(red + "@DELIM - This is not a valid ALE file" + clrs)
-                logger.error(red + f"{firstline}" + clrs)
-                raise ValueError("Invalid ALE file delimiter.")
+    ale = io.StringIO(content.decode(encoding), newline='')
+    del content
+
+    # Check for Delimiter Status on the first two lines
+    firstline = ale.readline()
+    scndline = ale.readline()
+    ale.seek(0)
+    if "Heading" not in firstline:
+        if "COMMAS" in firstline:
+            delim = ","
+            logger.debug(grey + "This is a comma separated ALE file" + clrs)
+        elif "TABS" in firstline:
+            delim = "\t"
+            logger.debug(grey + "This is a tab separated ALE file" + clrs)
+        else:
+            logger.error(red + "@DELIM - This is not a valid ALE file" + clrs)
+            logger.error(red + f"{firstline}" + clrs)
+            raise ValueError("Invalid ALE file delimiter.")
+    elif "Heading" in firstline:
+        if "COMMAS" in scndline:
+            delim = ","
+            logger.debug(grey + "This is a comma separated ALE file" + clrs)
+        elif "TABS" in scndline:
+            delim = "\t"
+            logger.debug(grey + "This is a tab separated ALE file" + clrs)
         else:
-            logger.error(red + f"Firstline-Error - This is not a valid ALE file" + clrs)
-            logger.error(red + f"firstline: {firstline} scndline: {scndline}" + clrs)
-            raise ValueError("Invalid ALE file format.")
+            logger.error(red + "@DELIM - This is not a valid ALE file" + clrs)
+            logger.error(red + f"{firstline}" + clrs)
+            raise ValueError("Invalid ALE file delimiter.")
+    else:
+        logger.error(red + f"Firstline-Error - This is not a valid ALE file" + clrs)
+        logger.error(red + f"firstline: {firstline} scndline: {scndline}" + clrs)
+        raise ValueError("Invalid ALE file format.")
 
-    def ale_parser_headerlines(ale_file_infu):
+    def ale_parser_headerlines(ale_infu):
         headerdict_infu = {}
-        skiprows_infu = []
+        column_offset = None
 
-        # 2nd Read of Original ALE and to red the Headerlines
-        with open(ale_file_infu, 'r', encoding=encoding, newline='') as ale_infu:
-            for idx, line in enumerate(ale_infu):
+        # Read the Headerlines up to and including the "Column" line
+        idx = 0
+        while True:
+            line = ale_infu.readline()
+            if not line:
+                break
+            if "Column" in line:
                 # add idx and line to headerdict
                 headerdict_infu[idx] = line
-                # add idx to skiprows list
-                skiprows_infu.append(idx)
+                headerdict_infu[idx + 2] = "\n"
+                headerdict_infu[idx + 3] = "Data\n"
+                column_offset = ale_infu.tell()
+                break
+            # add idx and line to headerdict
+            headerdict_infu[idx] = line
+            idx += 1
 
-                logger.debug(headerdict_infu)
-                logger.debug(skiprows_infu)
-                if "Column" in line:
-                    skiprows_infu.append(idx + 2)
-                    headerdict_infu[idx + 2] = "\n"
-                    skiprows_infu.append(idx + 3)
-                    headerdict_infu[idx + 3] = "Data\n"
-                    break
+        logger.debug(headerdict_infu)
+        return headerdict_infu, column_offset
 
-        logger.debug(skiprows_infu)
-        return headerdict_infu, skiprows_infu
+    def getdataframe(ale_infu, delim_infu):
+        # Hand the buffer to pandas right at the column names line,
+        # skipping the blank line and the "Data" line that follow it
+        df = pd.read_csv(ale_infu, delimiter=delim_infu, skiprows=[1, 2], dtype=str)
 
-    def getdataframe(ale_file_int, delim_infu):
-        df = pd.read_csv(ale_file_int, delimiter=delim_infu, skiprows=skiprows, encoding=encoding, dtype=str)
+        # Vectorized Avid checks - one summarized log line per rule and column
+        logger.info(grey + "Validating fields (length, non-ASCII characters, name and tape length)" + clrs)
+        report = validate_dataframe(df, check_tape_length=check_tape_length)
+        for issue in report['issues']:
+            logger.warning(yellow + issue['message'] + clrs)
+        df.attrs['validation'] = report
 
-        # Check for field with too many characters
-        # Function to check length of each cell in the dataframe
-        def check_length_250(cell):
-            if isinstance(cell, str) and len(cell) > 250:
-                logger.warning(yellow + f"@Avid-MC: A field has more than 250 characters! >>> {cell}" + clrs)
+        return df
 
-        df.map(check_length_250)
+    # execute funktion for delimiter and headerlines and return variables
+    headerdict, column_offset = ale_parser_headerlines(ale)  # execute funktion for headerlines
+    if column_offset is None:
+        logger.error(red + f"Error in '{ale_name}' - No 'Column' line found" + clrs)
+        raise ValueError("Invalid ALE file format.")
+    ale.seek(column_offset)
+    dataframe = getdataframe(ale, delim)  # execute funktion for main dataframe
+    return delim, headerdict, dataframe, ale_name, encoding
+
+
+# FUNCTION 1c: Vectorized Avid Media Composer checks on a parsed ALE dataframe
+VALIDATION_MAX_ROWS = 100   # row indices listed per issue, the count is always complete
+NAME_COLUMNS = ("Clip-Name", "Clip_Name", "Name")
+
+
+def validate_dataframe(df, check_tape_length=True):
+    issues = []
+
+    def add_issue(rule, column, mask, message):
+        rows = mask.to_numpy().nonzero()[0]
+        if len(rows):
+            issues.append({
+                'rule': rule,
+                'column': column,
+                'count': int(len(rows)),
+                'rows': rows[:VALIDATION_MAX_ROWS].tolist(),
+                'message': f"@Avid-MC: {len(rows)} field(s) in column '{column}' {message}",
+            })
+
+    for column in df.columns:
+        series = df[column]
+        values = series.dropna().tolist()
+        if not values:
+            continue
+
+        # Both checks screen the whole column with C-level builtins first and
+        # only build a per-row mask for columns that actually fail
+
+        # Check for fields with too many characters
+        if max(map(len, values)) > 250:
+            add_issue('max_length_250', column, series.str.len() > 250, "have more than 250 characters")
 
         # Check for characters that are not allowed in ALE files
-        # Function to check length of each cell in the dataframe
-        def check_characters(cell):
-            if isinstance(cell, str) and not cell.isascii():
-                logger.warning(yellow + f"@Avid-MC: A field has non-ASCII characters! >>> {cell}" + clrs)
-
-        logger.info(grey + "Checking for non-ASCII characters" + clrs)
-        df.map(check_characters)
-
-        # Check if a column with the name "Clip-Name" exists.
-        # Display warning if there are entries with more than 63 characters
-        def check_length_63(name):
-            if pd.isna(name):
-                logger.warning(yellow + f" A field is empty or float and cannot be length-ckecked >>> {name}" + clrs)
-            else:
-                if len(name) > 63:
-                    logger.warning(yellow + f"@Avid-MC: a field exceeds 63 characters '{name}'" + clrs)
-
-        # Check if the column exists and apply the function
-
-        if "Clip-Name" in df.columns:
-            logger.info(grey + "Checking for Clip-Name length" + clrs)
-            df["Clip-Name"].apply(check_length_63)
-        elif "Clip_Name" in df.columns:
-            logger.info(grey + "Checking for Clip_Name length" + clrs)
-            df["Clip_Name"].apply(check_length_63)
-        elif "Name" in df.columns:
-            logger.info(grey + "Checking for Name length" + clrs)
-            df["Name"].apply(check_length_63)
+        if not "".join(values).isascii():
+            mask = series.str.contains(r'[^\x00-\x7f]', regex=True, na=False)
+            add_issue('non_ascii', column, mask, "have non-ASCII characters")
+
+    def check_length_63(rule, column, what):
+        series = df[column]
+        add_issue(rule + '_empty', column, series.isna(), "are empty and cannot be length-checked")
+        add_issue(rule + '_length_63', column, series.str.len() > 63, f"exceed 63 characters ({what})")
+
+    # Check if a column with the name "Clip-Name" exists.
+    name_column = next((name for name in NAME_COLUMNS if name in df.columns), None)
+    if name_column:
+        check_length_63('name', name_column, "clip name")
+    else:
+        issues.append({'rule': 'missing_name_column', 'column': None, 'count': 0, 'rows': [],
+                       'message': "@Avid-MC: No column named 'Clip-Name' or 'Name' found"})
+
+    if check_tape_length:
+        # Check if a column with the name "Tape" exists
+        if "Tape" in df.columns:
+            check_length_63('tape', "Tape", "tape name")
         else:
-            logger.warning(yellow + "@Avid-MC: No column named 'Clip-Name' or 'Name' found" + clrs)
-
-        if check_tape_length:
-            # Check if a column with the name "Tape" exists and
-            # Display warning if there are entries with more than 63 characters
-            def check_tape_length_63(name):
-                if pd.isna(name):
-                    logger.warning(
-                        yellow + f" A field is empty or float and cannot be length-ckecked >>> {name}" + clrs)
-                else:
-                    if len(name) > 63:
-                        logger.warning(yellow + f"@Avid-MC: a tape name exceeds 63 characters '{name}'" + clrs)
-
-            # Check if the column exists and apply the function
-            if "Tape" in df.columns:
-                logger.info(grey + "Checking for Tape length" + clrs)
-                df["Tape"].apply(check_tape_length_63)
-            else:
-                logger.warning(yellow + "@Avid-MC: No column named 'Tape' found" + clrs)
+            issues.append({'rule': 'missing_tape_column', 'column': None, 'count': 0, 'rows': [],
+                           'message': "@Avid-MC: No column named 'Tape' found"})
 
-        return df
+    return {
+        'rows': int(len(df)),
+        'columns': int(len(df.columns)),
+        'issue_count': sum(issue['count'] for issue in issues),
+        'issues': issues,
+    }
 
-    # execute funktion for delimiter and headerlines and return variables
-    headerdict, skiprows = ale_parser_headerlines(ale_file)  # execute funktion for delimiter and headerlines
-    dataframe = getdataframe(ale_file, delim)  # execute funktion for main dataframe
-    return delim, headerdict, dataframe, ale_file, encoding
+
+def validation_summary(report):
+    """Compact form of a validation report, small enough for a response header."""
+    if not report:
+        return None
+    return {
+        'rows': report['rows'],
+        'issue_count': report['issue_count'],
+        'issues': [{k: issue[k] for k in ('rule', 'column', 'count')} for issue in report['issues']],
+    }
+
+
+# FUNCTION 2a: ALE header lines (headerdict up to "Column", column names, blank line, "Data")
+def ale_header_lines(delim, headerdict, columns, newline='\n'):
+    for key in headerdict:
+        # normalize the line ending of every headerdict line to newline
+        line = headerdict[key].rstrip('\r\n') + newline
+        # write headerdict until "Column" line
+        yield line
+        if "Column" in line:
+            break
+    yield delim.join(columns) + newline
+    yield newline
+    yield "Data" + newline
+
+
+# FUNCTION 2b: Stream an ALE (header, column names, "Data" block) as text chunks - no file system access
+ALE_WRITE_CHUNK_ROWS = 5000
+
+
+def ale_iter_lines(delim, headerdict, dataframe, newline='\n', chunk_rows=ALE_WRITE_CHUNK_ROWS):
+    yield "".join(ale_header_lines(delim, headerdict, dataframe.columns, newline))
+    # Write content of dataframe excluding column names, a slice at a time
+    for start in range(0, len(dataframe), chunk_rows):
+        yield dataframe.iloc[start:start + chunk_rows].to_csv(sep=delim, index=False, header=False,
+                                                               lineterminator=newline)
+
+
+# FUNCTION 2c: Write an ALE to any text or binary file-like object
+def ale_write(ale_out, delim, headerdict, dataframe, encoding="utf-8", newline='\n', log_level="INFO"):
+    logger = get_logger(__name__, level=log_level)
+    binary = isinstance(ale_out, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(ale_out, 'mode', '')
+    logger.info(grey + f"Writing ALE ({'binary, ' + encoding if binary else 'text'})" + clrs)
+    logger.debug(grey + str(headerdict) + clrs)
+    chunks = ale_iter_lines(delim, headerdict, dataframe, newline)
+    if binary:
+        # an incremental encoder writes a BOM (utf-16/utf-32) only once
+        chunks = codecs.iterencode(chunks, encoding, errors="replace")
+    for chunk in chunks:
+        ale_out.write(chunk)
 
 
 # FUNCTION 2: Write pandas dataframe to ALE file reattaching the ALE header.
@@ -254,54 +356,30 @@ def ale_rewrite(ale_path, delim, headerdict, dataframe, encoding="utf-8", newlin
     curts = datetime.now().strftime("%H%M%S")
 
     # Extract the directory and filename from ale_path
-    dir_path, filename = ale_path.rsplit("/", 1)
+    dir_path, filename = os.path.split(ale_path)
 
     # Check if the subfolder "altered_ale" exists in the directory, if not, create it
-    subfolder_path = dir_path + "/altered_ale"
-    subprocess.run(['mkdir', '-p', subfolder_path])
+    subfolder_path = os.path.join(dir_path, "altered_ale")
+    os.makedirs(subfolder_path, exist_ok=True)
 
     # Split the filename into name and extension
-    filename_parts = filename.rsplit(".", 1)
-    new_filename = filename_parts[0] + "_new_" + curts
-    logger.info(grey + f"new filename: {new_filename}" + clrs)
-
-    if len(filename_parts) > 1:
-        new_filename += "." + filename_parts[1]
-
-    # Combine the subfolder path and the new filename to get the new file path
-    new_ale_path = subfolder_path + "/" + new_filename
+    stem, ext = os.path.splitext(filename)
+
+    # Rewrites within the same second get a counter instead of overwriting each other
+    attempt = 0
+    while True:
+        new_filename = f"{stem}_new_{curts}" + (f"_{attempt}" if attempt else "") + ext
+        new_ale_path = os.path.join(subfolder_path, new_filename)
+        try:
+            ale = open(new_ale_path, 'x', encoding=encoding, newline='')
+            break
+        except FileExistsError:
+            attempt += 1
     logger.info(grey + f"new filepath: {new_ale_path}" + clrs)
 
-    with open(new_ale_path, 'w', encoding=encoding, newline=newline) as ale:
+    with ale:
         logger.info(grey + f"Writing new ALE file: {new_ale_path}" + clrs)
-        # replace '\r\n' with '\n' in headerdict if newline is '\n'
-        if newline == '\n':
-            logger.debug(grey + str(headerdict) + clrs)
-            logger.debug(grey + "Replacing '\r\n' with '\n' in headerdict" + clrs)
-            for key in headerdict:
-                headerdict[key] = headerdict[key].replace('\r\n', '\n')
-                logger.debug(grey + str(headerdict) + clrs)
-
-        # Write headerdict excluding last line
-        logger.info(grey + "Writing headerdict" + clrs)
-        for key in headerdict:
-            # write headerdict until "Column" line
-            ale.write(headerdict[key])
-            if "Column" in headerdict[key]:
-                break
-
-        # Write column names of dataframe
-        logger.info(grey + "Writing column names of dataframe" + clrs)
-        ale.write(delim.join(dataframe.columns) + "\n")
-
-        # Write "Data" line
-        logger.info(grey + "Writing Blank line and 'Data' line" + clrs)
-        ale.write("\n")
-        ale.write("Data\n")
-
-        # Write content of dataframe excluding column names
-        logger.info(grey + "Writing dataframe content" + clrs)
-        dataframe.to_csv(ale, sep=delim, index=False, header=False, lineterminator=newline, encoding=encoding)
+        ale_write(ale, delim, headerdict, dataframe, encoding=encoding, newline=newline, log_level=log_level)
 
         # Return the new file credentials
         logger.info(grey + "Returning new file credentials" + clrs)
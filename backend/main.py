@@ -1,62 +1,69 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
 import avb
 import os
+import io
+import codecs
 import pycmx
-import pandas as pd
 from werkzeug.utils import secure_filename
 import ALE_Parser
-import io
-import csv
-import subprocess
 import json
-import chardet
 
-from parsers import edl_parser
+from services import edl_batch, timecode
+from services.encoding import charset_label, decode
+from services.csv_stream import csv_response, iter_csv, iter_dataframe_csv
+from services.ale_dedup import Deduplicator
+from services.ale_edits import apply_column_edits, parse_edits
+from services.ale_merge import AleMerge
+from services.avb_columns import iter_mob_rows, parse_columns
+from services.avb_diff import MAX_PATHS as MAX_DIFF_PATHS, diff_bins
+from services.avb_index import AvbIndex
+from services.avb_serializer import AvbSerializer, coalesce
+from services.avb_sessions import clamp_page, get_registry as get_avb_sessions
+from services.cache import MISSING, digest_stream, get_cache, make_key
+from services.fast_json import FastJSONProvider, dumps, json_array_response
+from services.jobs import INLINE, JobResult, get_queue as get_jobs, json_result
+from services.mxf_probe import ProbeError, inspect_partial, inspect_uploads, lookup as lookup_mxf
+from services.pipeline import compile_pipeline
+from services.uploads import SpooledRequest, binary_stream, detach_stream
 
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), '..', 'dist'))
-CORS(app)
-
-def convert_cr_to_lf(filepath):
-    """Converts CR-only line endings to LF."""
-    try:
-        with open(filepath, 'rb') as f:
-            content = f.read()
-        
-        # Check for files with CR but no LF, and convert them
-        if b'\r' in content and b'\n' not in content:
-            content = content.replace(b'\r', b'\n')
-            with open(filepath, 'wb') as f:
-                f.write(content)
-    except Exception as e:
-        print(f"Error converting line endings for {filepath}: {e}")
-
-def to_json_serializable(obj):
-    if isinstance(obj, dict):
-        return {k: to_json_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [to_json_serializable(v) for v in obj]
-    elif isinstance(obj, bytes):
-        return ''.join(format(x, '02x') for x in obj)
-    elif isinstance(obj, bytearray):
-        return ''.join(format(x, '02x') for x in obj)
-    elif isinstance(obj, avb.mobid.MobID):
-        return str(obj)
-    elif hasattr(obj, 'property_data'):
-        return to_json_serializable(obj.property_data)
-    elif isinstance(obj, avb.trackgroups.Track):
-        return {
-            'class': obj.__class__.__name__,
-            'media_kind': obj.media_kind,
-            'length': obj.length,
-            'index': obj.index,
-            'component': to_json_serializable(obj.component),
-        }
-    elif hasattr(obj, 'uuid'):
-        return str(obj.uuid)
-    else:
-        return obj
+app.request_class = SpooledRequest
+app.json = FastJSONProvider(app)
+CORS(app, expose_headers=["X-Parse-Errors", "X-ALE-Validation", "X-ALE-Dedup"])
+
+def read_ale_cached(stream, filename, check_tape_length):
+    """Parses an uploaded ALE stream, reusing the cached result for identical uploads."""
+    cache = get_cache()
+    key = make_key("ale", ALE_Parser.PARSER_VERSION, digest_stream(stream),
+                   {"check_tape_length": check_tape_length})
+    parsed_data = cache.get(key)
+    if parsed_data is MISSING:
+        parsed_data = ALE_Parser.ale_read_buffer(stream, filename, check_tape_length=check_tape_length)
+        if parsed_data[2] is not None:
+            cache.put(key, parsed_data)
+    return parsed_data
+
+def wants_background():
+    return request.form.get("background", "false").lower() == "true"
+
+def result_response(result):
+    """Serves a JobResult produced inline, in the request."""
+    if result.filename:
+        return csv_response(result.chunks, result.filename, result.headers, mimetype=result.mimetype)
+    response = Response(result.chunks, mimetype=result.mimetype)
+    for name, value in (result.headers or {}).items():
+        response.headers[name] = value
+    return response
+
+def submit_job(kind, work, args, streams):
+    """
+    Queues work(job, inputs, *args) as a background job on the process pool.
+    The job takes over `streams` and receives them back as `inputs`.
+    """
+    state = get_jobs().submit(kind, work, args, streams)
+    return jsonify(state), 202
 
 @app.route("/api/edl/preview", methods=["POST"])
 def preview_edl():
@@ -65,6 +72,7 @@ def preview_edl():
     
     files = request.files.getlist("files")
     options_str = request.form.get('options')
+    response_format = request.args.get('format') or request.form.get('format', 'records')
     
     if not files or all(f.filename == "" for f in files):
         return jsonify({"error": "No selected files"}), 400
@@ -75,35 +83,123 @@ def preview_edl():
     except json.JSONDecodeError:
         return jsonify({"error": "Invalid options format"}), 400
 
-    all_events = []
-    
-    for file in files:
-        if file:
-            try:
-                filename = secure_filename(file.filename)
-                raw_content = file.stream.read()
-                try:
-                    content = raw_content.decode("utf-8")
-                except UnicodeDecodeError:
-                    encoding = chardet.detect(raw_content)['encoding'] or 'utf-8'
-                    try:
-                        content = raw_content.decode(encoding)
-                    except UnicodeDecodeError:
-                        content = raw_content.decode("utf-8", errors="replace")
-                
-                if filename.lower().endswith('.edl'):
-                    events = edl_parser.parse(content, filename)
-                    all_events.extend(events)
-                # Future parsers will go here
+    uploads = [(secure_filename(file.filename), file.stream.read()) for file in files if file]
+    all_events, errors = edl_batch.parse_uploads(uploads)
 
-            except Exception as e:
-                return jsonify({"error": f"Failed to process file {file.filename}: {str(e)}"}), 500
-    
-    # Placeholder for transformation logic
-    # transformed_events = apply_transformations(all_events, options)
-    
-    return jsonify([event.to_dict() for event in all_events])
+    if errors and len(errors) == len(uploads):
+        first = errors[0]
+        return jsonify({
+            "error": f"Failed to process file {first['file']}: {first['error']}",
+            "errors": errors,
+        }), 500
+
+    all_events = compile_pipeline(options).run(all_events)
+
+    # Partial failures travel alongside the events so the batch still renders
+    headers = {"X-Parse-Errors": json.dumps(errors)} if errors else {}
+    if response_format == 'columnar':
+        payload = all_events.to_columnar()
+        payload['errors'] = errors
+        return jsonify(payload), 200, headers
+    return json_array_response(all_events.iter_records(), headers=headers)
+
+
+@app.route("/api/timecode", methods=["POST"])
+def convert_timecodes():
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return jsonify({"error": "No JSON body"}), 400
+
+    fps = data.get("fps", 24)
+    drop_frame = data.get("drop_frame")
+
+    try:
+        if "timecodes" in data:
+            parsed = timecode.parse_timecodes(data["timecodes"])
+            frames = timecode.parsed_to_frames(parsed, fps, drop_frame)
+            return jsonify({
+                "fps": timecode.normalize_rate(fps),
+                "frames": frames.tolist(),
+                "invalid": [int(i) for i in (~parsed.valid).nonzero()[0]],
+            })
+        elif "frames" in data:
+            frames = data["frames"] if isinstance(data["frames"], list) else [data["frames"]]
+            timecodes = timecode.frames_to_tc(frames, fps, bool(drop_frame))
+            return jsonify({
+                "fps": timecode.normalize_rate(fps),
+                "timecodes": timecodes.tolist(),
+            })
+        else:
+            return jsonify({"error": "Provide either 'timecodes' or 'frames'"}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def iter_avb_document(avb_file, mobs, job=INLINE):
+    """
+    Body of the /api/avb response after the summary. raw_data is a document
+    of its own, as the frontend downloads and displays it on its own: its
+    $ref pointers are relative to raw_data and never point into mobs[], so
+    every mob is written there in full once.
+    """
+    serializer = AvbSerializer()
+    yield '"mobs":['
+    for index, mob in enumerate(mobs):
+        job.progress("serializing mobs", index, len(mobs))
+        if index:
+            yield ','
+        yield '{"Name":' + dumps(mob.name) + ',"Mob ID":' + dumps(str(mob.mob_id)) + ',"details":'
+        yield from serializer.iter_json(mob, path=("mobs", index, "details"), stream_depth=0)
+        yield '}'
+    job.progress("serializing raw data")
+    yield '],"raw_data":'
+    yield from AvbSerializer().iter_json(avb_file.content, stream_depth=3)
+    yield '}'
+
+def avb_document(filename, stream, job=INLINE):
+    """
+    Builds the /api/avb response for a detached upload, which is closed once
+    the body has been produced. The bin is read while the body streams.
+    """
+    try:
+        cache = get_cache()
+        key = make_key("avb_json", avb.__version__, digest_stream(stream), {"raw_data": "standalone"})
+        cached = cache.get(key)
+        if cached is not MISSING:
+            stream.close()
+            mob_count, body = cached
+            # Same bytes may arrive under a different name
+            summary = {'File Name': filename, 'Mob Count': mob_count}
+            return JobResult(['{"summary":' + dumps(summary) + ',', body])
+
+        job.progress("reading bin")
+        avb_file = avb.open(binary_stream(stream))
+        mobs = list(avb_file.content.mobs)
+    except BaseException:
+        stream.close()
+        raise
+
+    summary = {'File Name': filename, 'Mob Count': len(mobs)}
+
+    def generate():
+        # Only bodies up to CACHE_RESPONSE_BYTES are kept for the cache
+        body = cache.collector()
+        try:
+            yield '{"summary":' + dumps(summary) + ','
+            for chunk in coalesce(iter_avb_document(avb_file, mobs, job)):
+                body.add(chunk)
+                yield chunk
+            document = body.value()
+            if document is not None:
+                cache.put(key, (len(mobs), document))
+        finally:
+            avb_file.close()
+            stream.close()
 
+    return JobResult(generate())
+
+def avb_job(job, inputs, filename):
+    return avb_document(filename, inputs[0], job)
 
 @app.route("/api/avb", methods=["POST"])
 def parse_avb():
@@ -113,41 +209,203 @@ def parse_avb():
     if file.filename == "":
         return jsonify({"error": "No selected file"}), 400
     if file:
+        filename = file.filename
+        # The bin is read while the response streams, after the request has ended
+        stream = detach_stream(file)
+        if wants_background():
+            return submit_job("avb", avb_job, (filename,), [stream])
         try:
-            filepath = f"/tmp/{file.filename}"
-            file.save(filepath)
-
-            with avb.open(filepath) as f:
-                raw_data = to_json_serializable(f.content)
-                
-                summary = {
-                    'File Name': file.filename,
-                    'Mob Count': len(raw_data.get('mobs', [])),
-                }
-
-                mobs_summary = []
-                for mob in raw_data.get('mobs', []):
-                    mobs_summary.append({
-                        'Name': mob.get('name'),
-                        'Mob ID': mob.get('mob_id'),
-                        'details': mob
-                    })
-
-                output = {
-                    "summary": summary,
-                    "mobs": mobs_summary,
-                    "raw_data": raw_data,
-                }
-                
-                return jsonify(output)
-
+            return result_response(avb_document(filename, stream))
         except Exception as e:
             import traceback
             traceback.print_exc()
             return jsonify({"error": str(e)}), 500
-        finally:
-            if 'filepath' in locals() and os.path.exists(filepath):
-                os.remove(filepath)
+
+def avb_mob_page(session, args):
+    offset, limit = clamp_page(args.get("offset"), args.get("limit"))
+    entries = session.search(args.get("q"), args.get("kind"))
+    page = entries[offset:offset + limit]
+    if args.get("details", "false").lower() == "true":
+        page = [{**entry, "details": session.details(entry["index"])} for entry in page]
+    return {
+        "session_id": session.session_id,
+        "total": len(entries),
+        "offset": offset,
+        "limit": limit,
+        "mobs": page,
+    }
+
+@app.route("/api/avb/session", methods=["POST"])
+def open_avb_session():
+    if "file" not in request.files:
+        return jsonify({"error": "No file part"}), 400
+    file = request.files["file"]
+    if file.filename == "":
+        return jsonify({"error": "No selected file"}), 400
+    try:
+        clamp_page(request.form.get("offset"), request.form.get("limit"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        session = get_avb_sessions().create(file.stream, digest_stream(file.stream))
+        output = avb_mob_page(session, request.form)
+        output["summary"] = {
+            "File Name": file.filename,
+            "Mob Count": len(session.index),
+        }
+        return jsonify(output)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/avb/session/<session_id>/mobs", methods=["GET"])
+def list_avb_session_mobs(session_id):
+    try:
+        return jsonify(avb_mob_page(get_avb_sessions().get(session_id), request.args))
+    except KeyError:
+        return jsonify({"error": "Unknown or expired session"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/api/avb/session/<session_id>/mobs/<path:mob_id>", methods=["GET"])
+def get_avb_session_mob(session_id, mob_id):
+    try:
+        session = get_avb_sessions().get(session_id)
+    except KeyError:
+        return jsonify({"error": "Unknown or expired session"}), 404
+    try:
+        entry = session.find(mob_id)
+    except KeyError:
+        return jsonify({"error": f"Mob {mob_id} not found"}), 404
+    try:
+        details = session.details(entry["index"])
+    except KeyError:
+        return jsonify({"error": "Unknown or expired session"}), 404
+    return jsonify({
+        "name": entry["name"],
+        "mob_id": mob_id,
+        "kind": entry["kind"],
+        "details": details,
+    })
+
+@app.route("/api/avb/session/<session_id>", methods=["DELETE"])
+def close_avb_session(session_id):
+    try:
+        get_avb_sessions().delete(session_id)
+    except KeyError:
+        return jsonify({"error": "Unknown or expired session"}), 404
+    return jsonify({"session_id": session_id, "deleted": True})
+
+@app.route("/api/avb/index/<name>", methods=["POST"])
+def update_avb_index(name):
+    if "files" not in request.files:
+        return jsonify({"error": "No files part"}), 400
+    files = [f for f in request.files.getlist("files") if f.filename]
+    if not files:
+        return jsonify({"error": "No selected files"}), 400
+    try:
+        index = AvbIndex(name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        results = index.update((f.filename, binary_stream(f.stream)) for f in files)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+    totals = {}
+    for result in results:
+        totals[result["status"]] = totals.get(result["status"], 0) + 1
+    return jsonify({"index": name, "bins": results, "totals": totals})
+
+@app.route("/api/avb/index/<name>", methods=["GET"])
+def search_avb_index(name):
+    try:
+        index = AvbIndex(name)
+        offset, limit = clamp_page(request.args.get("offset"), request.args.get("limit"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not index.exists():
+        return jsonify({"error": f"Unknown index {name}"}), 404
+    mob_ids = [mob_id.strip() for value in request.args.getlist("mob_id")
+               for mob_id in value.split(",") if mob_id.strip()]
+    return jsonify(index.search(
+        mob_ids=mob_ids,
+        query=request.args.get("q"),
+        tape=request.args.get("tape"),
+        kind=request.args.get("kind"),
+        bin_name=request.args.get("bin"),
+        offset=offset,
+        limit=limit,
+    ))
+
+@app.route("/api/avb/index/<name>", methods=["DELETE"])
+def delete_avb_index(name):
+    try:
+        AvbIndex(name).delete()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except KeyError:
+        return jsonify({"error": f"Unknown index {name}"}), 404
+    return jsonify({"index": name, "deleted": True})
+
+@app.route("/api/avb/index/<name>/bins", methods=["GET"])
+def list_avb_index_bins(name):
+    try:
+        index = AvbIndex(name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not index.exists():
+        return jsonify({"error": f"Unknown index {name}"}), 404
+    return jsonify({"index": name, "bins": index.bins()})
+
+@app.route("/api/avb/index/<name>/bins/<path:bin_name>", methods=["DELETE"])
+def remove_avb_index_bin(name, bin_name):
+    try:
+        index = AvbIndex(name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not index.exists():
+        return jsonify({"error": f"Unknown index {name}"}), 404
+    try:
+        index.remove_bin(bin_name)
+    except KeyError:
+        return jsonify({"error": f"Bin {bin_name} is not indexed"}), 404
+    return jsonify({"index": name, "bin": bin_name, "deleted": True})
+
+def avb_diff_output(old_stream, new_stream, names, max_paths, job=INLINE):
+    job.progress("comparing bins")
+    output = diff_bins(binary_stream(old_stream), binary_stream(new_stream), max(1, max_paths))
+    output["summary"] = {"old": names[0], "new": names[1], **output["summary"]}
+    return output
+
+def avb_diff_job(job, inputs, names, max_paths):
+    return json_result(avb_diff_output(inputs[0], inputs[1], names, max_paths, job))
+
+@app.route("/api/avb/diff", methods=["POST"])
+def diff_avb():
+    for part in ("old", "new"):
+        if part not in request.files or request.files[part].filename == "":
+            return jsonify({"error": f"Missing '{part}' bin"}), 400
+    old_file = request.files["old"]
+    new_file = request.files["new"]
+    try:
+        max_paths = int(request.form.get("max_paths") or MAX_DIFF_PATHS)
+    except ValueError:
+        return jsonify({"error": "max_paths must be an integer"}), 400
+    names = (old_file.filename, new_file.filename)
+
+    if wants_background():
+        return submit_job("avb_diff", avb_diff_job, (names, max_paths),
+                          [detach_stream(old_file), detach_stream(new_file)])
+    try:
+        return jsonify(avb_diff_output(old_file.stream, new_file.stream, names, max_paths))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
 @app.route("/api/avb/csv", methods=["POST"])
 def parse_avb_csv():
@@ -158,32 +416,48 @@ def parse_avb_csv():
         return jsonify({"error": "No selected file"}), 400
     if file:
         try:
-            filepath = f"/tmp/{file.filename}"
-            file.save(filepath)
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            writer.writerow(["Name", "Mob ID"])
+            columns = parse_columns(request.form.get("columns"))
+            kind = request.form.get("kind") or None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-            with avb.open(filepath) as f:
-                mobs = list(f.content.mobs)
-                for mob in mobs:
-                    writer.writerow([mob.name, str(mob.mob_id)])
-
-            os.remove(filepath)
+        filename = f"{os.path.splitext(file.filename)[0]}.csv"
+        header = [column.label for column in columns]
+        try:
+            cache = get_cache()
+            key = make_key("avb_csv", avb.__version__, digest_stream(file.stream),
+                           {"columns": [column.key for column in columns], "kind": kind})
+            body = cache.get(key)
+            if body is not MISSING:
+                return csv_response([body], filename)
 
-            output.seek(0)
-            return output.getvalue(), 200, {
-                "Content-Type": "text/csv",
-                "Content-Disposition": f"attachment; filename={os.path.splitext(file.filename)[0]}.csv"
-            }
+            # Rows are computed while the response streams, after the request has ended
+            stream = detach_stream(file)
+            avb_file = avb.open(binary_stream(stream))
 
         except Exception as e:
             import traceback
             traceback.print_exc()
+            if 'stream' in locals():
+                stream.close()
             return jsonify({"error": str(e)}), 500
 
+        def generate():
+            # Only bodies up to CACHE_RESPONSE_BYTES are kept for the cache
+            body = cache.collector()
+            try:
+                for chunk in iter_csv(iter_mob_rows(avb_file.content.mobs, columns, kind), header=header):
+                    body.add(chunk)
+                    yield chunk
+                csv_body = body.value()
+                if csv_body is not None:
+                    cache.put(key, csv_body)
+            finally:
+                avb_file.close()
+                stream.close()
+
+        return csv_response(generate(), filename)
+
 @app.route("/api/edl", methods=["POST"])
 def parse_edl():
     if "file" not in request.files:
@@ -194,41 +468,33 @@ def parse_edl():
     if file:
         try:
             # Read content directly from the file stream
-            file_content = file.stream.read().decode("utf-8")
-            
-            edl = pycmx.parse_cmx3600(file_content)
-
-            output = io.StringIO()
-            writer = csv.writer(output)
+            file_content = decode(file.stream.read())
             
-            # Write header
-            writer.writerow(["Event", "Reel", "Track", "Trn", "Src TC In", "Src TC Out", "Rec TC In", "Rec TC Out", "Clip Name"])
-
-            # Write events
-            for event in edl.events:
-                clip_name = None
-                if event.comments:
-                    for comment in event.comments:
-                        if comment.startswith("* FROM CLIP NAME:"):
-                            clip_name = comment.split(":", 1)[1].strip()
-                
-                writer.writerow([
-                    event.number,
-                    event.source,
-                    event.track,
-                    event.transition.kind if event.transition else "C",
-                    event.source_start,
-                    event.source_end,
-                    event.record_start,
-                    event.record_end,
-                    clip_name,
-                ])
-
-            output.seek(0)
-            return output.getvalue(), 200, {
-                "Content-Type": "text/csv",
-                "Content-Disposition": "attachment; filename=edl_export.csv"
-            }
+            # pycmx reads line by line from a text stream
+            edl = pycmx.parse_cmx3600(io.StringIO(file_content))
+
+            def track_label(channels):
+                tracks = (["V"] if channels.video else []) + [f"A{n}" for n in sorted(channels.channels)]
+                return "/".join(tracks)
+
+            def event_rows():
+                # One row per edit, dissolves and wipes carry two edits per event
+                for event in edl.events:
+                    for edit in event.edits:
+                        yield [
+                            event.number,
+                            edit.source,
+                            track_label(edit.channels),
+                            edit.transition.kind if edit.transition else "C",
+                            edit.source_in,
+                            edit.source_out,
+                            edit.record_in,
+                            edit.record_out,
+                            edit.clip_name,
+                        ]
+
+            header = ["Event", "Reel", "Track", "Trn", "Src TC In", "Src TC Out", "Rec TC In", "Rec TC Out", "Clip Name"]
+            return csv_response(iter_csv(event_rows(), header=header), "edl_export.csv")
 
         except Exception as e:
             import traceback
@@ -244,170 +510,91 @@ def parse_mxf():
         return jsonify({"error": "No selected file"}), 400
     if file:
         try:
-            filepath = f"/tmp/{file.filename}"
-            file.save(filepath)
-
-            # Try to find ffprobe - works for both Mac dev and Linux containers
-            ffprobe_path = os.getenv("FFPROBE_PATH")
-            if not ffprobe_path:
-                # Try common paths
-                import shutil
-                ffprobe_path = shutil.which("ffprobe")
-                if not ffprobe_path:
-                    # Fallback to Mac homebrew path for local development
-                    ffprobe_path = "/opt/homebrew/bin/ffprobe" if os.path.exists("/opt/homebrew/bin/ffprobe") else "ffprobe"
-
-            ffprobe_cmd = [
-                ffprobe_path,
-                "-v", "quiet",
-                "-print_format", "json",
-                "-show_format",
-                "-show_streams",
-                filepath
-            ]
+            [(summary, error)] = inspect_uploads([(file.filename, file.stream)], request.form.get("engine"))
+            if isinstance(error, ProbeError):
+                return jsonify(error.to_dict()), error.status
+            if error is not None:
+                raise error
 
-            try:
-                result = subprocess.run(ffprobe_cmd, capture_output=True, text=True, check=True)
-            except FileNotFoundError:
-                return jsonify({
-                    "error": "ffprobe not found",
-                    "details": "ffprobe is part of FFmpeg. Please install FFmpeg or set the FFPROBE_PATH environment variable to the absolute path of the ffprobe executable."
-                }), 500
-            except subprocess.CalledProcessError as e:
-                return jsonify({"error": "ffprobe command failed", "details": e.stderr}), 500
-            
-            os.remove(filepath)
-
-            # --- Start of new implementation ---
-
-            # 1. Parse the ffprobe output
-            raw_data = json.loads(result.stdout)
-
-            # Helper functions for formatting
-            def format_size(size_bytes):
-                if not size_bytes or not str(size_bytes).isdigit():
-                    return None
-                size = float(size_bytes)
-                if size < 1024:
-                    return f"{size} B"
-                elif size < 1024**2:
-                    return f"{size/1024:.2f} KB"
-                elif size < 1024**3:
-                    return f"{size/1024**2:.2f} MB"
-                else:
-                    return f"{size/1024**3:.2f} GB"
-
-            def format_bitrate(bitrate_bps):
-                if not bitrate_bps or not str(bitrate_bps).isdigit():
-                    return None
-                bitrate = float(bitrate_bps)
-                if bitrate < 1000:
-                    return f"{bitrate} bps"
-                elif bitrate < 1000**2:
-                    return f"{bitrate/1000:.2f} kbps"
-                else:
-                    return f"{bitrate/1000**2:.2f} Mbps"
-            
-            def format_duration(duration_s):
-                if not duration_s:
-                    return None
-                try:
-                    duration = float(duration_s)
-                    return f"{duration:.2f} s"
-                except (ValueError, TypeError):
-                    return None
-
-            def format_aspect_ratio(aspect_str):
-                """Convert aspect ratio from '256:135' format to '1.896:1' format"""
-                if not aspect_str or aspect_str == 'N/A':
-                    return None
-                try:
-                    if ':' in aspect_str:
-                        parts = aspect_str.split(':')
-                        width = float(parts[0])
-                        height = float(parts[1])
-                        if height > 0:
-                            ratio = width / height
-                            return f"{ratio:.3f}:1"
-                    return aspect_str
-                except (ValueError, IndexError, ZeroDivisionError):
-                    return aspect_str
-
-
-            # 2. Create the structured summary
-            output = {}
-
-            # 3. Top-level summary
-            format_info = raw_data.get('format', {})
-            tags = format_info.get('tags', {})
-            output['summary'] = {
-                'File Name': os.path.basename(format_info.get('filename')),
-                'Format': format_info.get('format_long_name'),
-                'Duration': format_duration(format_info.get('duration')),
-                'File Size': format_size(format_info.get('size')),
-                'Overall Bit Rate': format_bitrate(format_info.get('bit_rate')),
-                'Stream Count': format_info.get('nb_streams'),
-                'company_name': tags.get('company_name'),
-                'product_name': tags.get('product_name'),
-                'product_version': tags.get('product_version'),
-                'product_uid': tags.get('uid'),
-                'project_name': tags.get('project_name'),
-            }
-
-            # 4. Group streams
-            output['video_streams'] = []
-            output['audio_streams'] = []
-            output['other_streams'] = []
-
-            for stream in raw_data.get('streams', []):
-                stream_type = stream.get('codec_type')
-                
-                if stream_type == 'video':
-                    info = {
-                        'Stream Index': stream.get('index'),
-                        'Codec': stream.get('codec_long_name'),
-                        'Resolution': f"{stream.get('width')}x{stream.get('height')}",
-                        'Aspect Ratio': format_aspect_ratio(stream.get('display_aspect_ratio')),
-                        'Frame Rate': stream.get('avg_frame_rate'),
-                        'Bit Rate': format_bitrate(stream.get('bit_rate')),
-                        'Pixel Format': stream.get('pix_fmt'),
-                        'details': stream # include all original stream data
-                    }
-                    output['video_streams'].append(info)
-                
-                elif stream_type == 'audio':
-                    info = {
-                        'Stream Index': stream.get('index'),
-                        'Codec': stream.get('codec_long_name'),
-                        'Sample Rate': stream.get('sample_rate'),
-                        'Channels': f"{stream.get('channels')} ({stream.get('channel_layout')})",
-                        'Bit Rate': format_bitrate(stream.get('bit_rate')),
-                        'details': stream # include all original stream data
-                    }
-                    output['audio_streams'].append(info)
-                
-                else:
-                    info = {
-                        'Stream Index': stream.get('index'),
-                        'Codec': stream.get('codec_long_name'),
-                        'Type': stream_type,
-                        'details': stream # include all original stream data
-                    }
-                    output['other_streams'].append(info)
-
-            # 5. Include the full raw data at the end
-            output['raw_data'] = raw_data
-
-            # 6. Return the comprehensive summary
-            return jsonify(output)
-
-            # --- End of new implementation ---
+            return jsonify(summary)
 
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             import traceback
             traceback.print_exc()
             return jsonify({"error": str(e)}), 500
 
+@app.route("/api/mxf/partial", methods=["POST"])
+def parse_mxf_partial():
+    head = request.files.get("head")
+    if head is None:
+        return jsonify({"error": "No head part"}), 400
+    tail = request.files.get("tail")
+    filename = request.form.get("filename") or head.filename or "partial.mxf"
+    try:
+        size = int(request.form.get("size", ""))
+    except ValueError:
+        return jsonify({"error": "size must be the total file size in bytes"}), 400
+
+    try:
+        return jsonify(inspect_partial(filename, head.stream, tail.stream if tail is not None else None, size,
+                                       request.form.get("engine")))
+    except ProbeError as e:
+        return jsonify(e.to_dict()), e.status
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/mxf/lookup", methods=["GET"])
+def lookup_mxf_fingerprint():
+    fingerprint = request.args.get("fingerprint", "")
+    filename = request.args.get("filename") or "file.mxf"
+    try:
+        summary = lookup_mxf(fingerprint, filename, request.args.get("engine"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if summary is None:
+        return jsonify({"cached": False}), 404
+    return jsonify(summary)
+
+@app.route("/api/mxf/batch", methods=["POST"])
+def parse_mxf_batch():
+    if "files" not in request.files:
+        return jsonify({"error": "No files part"}), 400
+    files = [f for f in request.files.getlist("files") if f.filename]
+    if not files:
+        return jsonify({"error": "No selected files"}), 400
+    include_raw = request.form.get("raw", "false").lower() == "true"
+
+    try:
+        outcomes = inspect_uploads([(f.filename, f.stream) for f in files], request.form.get("engine"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+    results = []
+    for f, (summary, error) in zip(files, outcomes):
+        if error is None:
+            if not include_raw:
+                summary = {key: value for key, value in summary.items() if key != "raw_data"}
+            results.append({"file": f.filename, "ok": True, **summary})
+        elif isinstance(error, ProbeError):
+            results.append({"file": f.filename, "ok": False, "status": error.status, **error.to_dict()})
+        else:
+            results.append({"file": f.filename, "ok": False, "error": str(error)})
+    failed = sum(1 for result in results if not result["ok"])
+    return jsonify({
+        "summary": {"files": len(results), "ok": len(results) - failed, "failed": failed},
+        "files": results,
+    })
+
 @app.route("/api/ale", methods=["POST"])
 def parse_ale():
     if "file" not in request.files:
@@ -418,27 +605,26 @@ def parse_ale():
         return jsonify({"error": "No selected file"}), 400
 
     check_tape_length = request.form.get("check_tape_length", "true").lower() == "true"
+    want_report = request.form.get("report", "").lower() == "json"
 
     try:
         if filename.lower().endswith('.ale'):
-            filepath = f"/tmp/{filename}"
-            file.save(filepath)
-            convert_cr_to_lf(filepath)
-            parsed_data = ALE_Parser.ale_read_parser(filepath, check_tape_length=check_tape_length)
+            parsed_data = read_ale_cached(file.stream, filename, check_tape_length)
             if parsed_data[2] is None:
                 return jsonify({"error": "Invalid ALE file."} ), 400
             _, _, df, _, _ = parsed_data
-            os.remove(filepath)
-            
-            output = io.StringIO()
-            df.to_csv(output, index=False)
-            output.seek(0)
             
             new_filename = f"{os.path.splitext(filename)[0]}.csv"
-            return output.getvalue(), 200, {
-                "Content-Type": "text/csv",
-                "Content-Disposition": f"attachment; filename={new_filename}"
-            }
+            validation = df.attrs.get("validation")
+            if want_report:
+                return jsonify({
+                    "filename": new_filename,
+                    "content": df.to_csv(index=False),
+                    "validation": validation,
+                })
+            return csv_response(iter_dataframe_csv(df), new_filename, {
+                "X-ALE-Validation": json.dumps(ALE_Parser.validation_summary(validation)),
+            })
         
         else:
             return jsonify({"error": "Invalid file type. Please upload an .ale file."} ), 400
@@ -452,6 +638,50 @@ def parse_ale():
         traceback.print_exc()
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
+@app.route("/api/ale/rewrite", methods=["POST"])
+def rewrite_ale():
+    if "file" not in request.files:
+        return jsonify({"error": "No file part"}), 400
+    file = request.files["file"]
+    filename = file.filename
+    if filename == "":
+        return jsonify({"error": "No selected file"}), 400
+    if not filename.lower().endswith('.ale'):
+        return jsonify({"error": "Invalid file type. Please upload an .ale file."}), 400
+
+    check_tape_length = request.form.get("check_tape_length", "true").lower() == "true"
+    newline = "\r\n" if request.form.get("newline", "lf").lower() == "crlf" else "\n"
+    try:
+        edits = parse_edits(request.form.get("edits"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid edits: {str(e)}"}), 400
+
+    try:
+        parsed_data = read_ale_cached(file.stream, filename, check_tape_length)
+        if parsed_data[2] is None:
+            return jsonify({"error": "Invalid ALE file."}), 400
+        delim, headerdict, df, _, encoding = parsed_data
+
+        try:
+            df = apply_column_edits(df, edits)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        validation = ALE_Parser.validate_dataframe(df, check_tape_length=check_tape_length)
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+    # Keep the source encoding, plain ASCII input is written as its UTF-8 superset
+    encoding = "utf-8" if encoding == "ascii" else encoding
+    chunks = codecs.iterencode(ALE_Parser.ale_iter_lines(delim, headerdict, df, newline), encoding, errors="replace")
+    response = csv_response(chunks, secure_filename(filename), {
+        "X-ALE-Validation": json.dumps(ALE_Parser.validation_summary(validation)),
+    })
+    response.content_type = f"text/plain; charset={charset_label(encoding)}"
+    return response
+
 @app.route("/api/ale/multi_to_csvs", methods=["POST"])
 def convert_ales_to_csvs():
     if "files" not in request.files:
@@ -463,32 +693,80 @@ def convert_ales_to_csvs():
         return jsonify({"error": "No selected files"}), 400
 
     check_tape_length = request.form.get("check_tape_length", "true").lower() == "true"
+    ale_files = [file for file in files if file and file.filename.lower().endswith('.ale')]
+    if wants_background():
+        filenames = [file.filename for file in ale_files]
+        return submit_job("ale_csvs", ale_csvs_job, (filenames, check_tape_length),
+                          [detach_stream(file) for file in ale_files])
+
+    try:
+        return jsonify(convert_ales([(file.filename, file.stream) for file in ale_files], check_tape_length))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def convert_ales(uploads, check_tape_length, job=INLINE):
+    """
+    Converts (filename, stream) ALE uploads to CSV, skipping files that do
+    not parse. Raises ValueError when none of them do.
+    """
     csv_files = []
-    for file in files:
-        if file and file.filename.lower().endswith('.ale'):
-            filename = secure_filename(file.filename)
+    for position, (upload_name, stream) in enumerate(uploads):
+        job.progress("converting", position, len(uploads))
+        filename = secure_filename(upload_name)
+        try:
+            parsed_data = read_ale_cached(stream, filename, check_tape_length)
+            if parsed_data[2] is None:
+                print(f"Skipping file {filename} due to parsing error.")
+                continue
+
+            _, _, df, _, _ = parsed_data
+
+            csv_filename = f"{os.path.splitext(filename)[0]}.csv"
+            csv_files.append({
+                "filename": csv_filename,
+                "content": df.to_csv(index=False),
+                "validation": df.attrs.get("validation"),
+            })
+
+        except ValueError as e:
+            print(f"Error processing file {filename}: {e}")
+            continue
+        except Exception as e:
+            print(f"Error processing file {filename}: {e}")
+            continue
+
+    if not csv_files:
+        raise ValueError("No valid ALE files to process")
+    return csv_files
+
+def ale_csvs_job(job, inputs, filenames, check_tape_length):
+    return json_result(convert_ales(list(zip(filenames, inputs)), check_tape_length, job))
+
+def collect_ale_merge(uploads, check_tape_length, dedup=None, job=INLINE):
+    """
+    First pass of a merge: parses each upload once and hands its rows to the
+    merge, which spills them until the response streams, keeping only the
+    columns and validation summary in memory. Takes ownership of the
+    detached (filename, stream) uploads and closes them once parsed.
+    """
+    merge = AleMerge(dedup)
+    validations = []
+    try:
+        for position, (upload_name, stream) in enumerate(uploads):
+            job.progress("parsing", position, len(uploads))
+            if not upload_name.lower().endswith('.ale'):
+                stream.close()
+                continue
+            filename = secure_filename(upload_name)
             try:
-                filepath = f"/tmp/{filename}"
-                file.save(filepath)
-                convert_cr_to_lf(filepath)
-                
-                parsed_data = ALE_Parser.ale_read_parser(filepath, check_tape_length=check_tape_length)
+                parsed_data = read_ale_cached(stream, filename, check_tape_length)
                 if parsed_data[2] is None:
                     print(f"Skipping file {filename} due to parsing error.")
                     continue
-                
-                _, _, df, _, _ = parsed_data
-                os.remove(filepath)
-                
-                output = io.StringIO()
-                df.to_csv(output, index=False)
-                output.seek(0)
-                
-                csv_filename = f"{os.path.splitext(filename)[0]}.csv"
-                csv_files.append({
-                    "filename": csv_filename,
-                    "content": output.getvalue()
-                })
+                delim, headerdict, df, _, _ = parsed_data
+                merge.add(filename, df, delim=delim, headerdict=headerdict)
+                validations.append({"file": filename, **(ALE_Parser.validation_summary(df.attrs.get("validation")) or {})})
+                del parsed_data, df
 
             except ValueError as e:
                 print(f"Error processing file {filename}: {e}")
@@ -496,14 +774,77 @@ def convert_ales_to_csvs():
             except Exception as e:
                 print(f"Error processing file {filename}: {e}")
                 continue
-    
-    if not csv_files:
-        return jsonify({"error": "No valid ALE files to process"}), 400
-
-    return jsonify(csv_files)
+            finally:
+                stream.close()
+    except BaseException:
+        merge.close()
+        for _, stream in uploads:
+            stream.close()
+        raise
+    return merge, validations
+
+# Response headers past ~8 KB are dropped by proxies and browsers
+MAX_HEADER_JSON = 4096
+
+def json_header(value, summary):
+    """
+    JSON for a response header, or summary(value) marked truncated when the
+    full value would exceed MAX_HEADER_JSON.
+    """
+    text = json.dumps(value)
+    if len(text) <= MAX_HEADER_JSON:
+        return text
+    return json.dumps({**summary(value), "truncated": True})
+
+def validation_totals(validations):
+    return {
+        "files": len(validations),
+        "rows": sum(entry.get("rows", 0) for entry in validations),
+        "issue_count": sum(entry.get("issue_count", 0) for entry in validations),
+        "files_with_issues": sum(1 for entry in validations if entry.get("issue_count")),
+    }
 
-@app.route("/api/ale/merge_to_csv", methods=["POST"])
-def merge_ales_to_csv():
+def dedup_totals(report):
+    return {name: value for name, value in report.items() if name != "files"}
+
+def ale_merge_result(uploads, check_tape_length, dedup, dedup_key, output_format, job=INLINE, want_report=False):
+    """
+    Merges detached (filename, stream) ALE uploads into one streamed CSV or
+    ALE. The headers carry the validation and dedup reports, cut down to
+    totals when there are too many files; want_report returns the full
+    per-file reports as JSON instead of the merge. Raises ValueError when
+    there is nothing to merge or a dedup key column is missing.
+    """
+    merge, validations = collect_ale_merge(uploads, check_tape_length, dedup, job)
+
+    if not merge:
+        raise ValueError("No valid ALE files to merge")
+
+    if dedup is not None:
+        missing = [column for column in dedup_key if column not in merge.columns]
+        if missing:
+            merge.close()
+            raise ValueError(f"Dedup key column(s) not found in any ALE: {', '.join(missing)}")
+
+    if want_report:
+        report = {"validation": validations, "dedup": merge.dedup_report()}
+        merge.close()
+        return json_result(report)
+
+    headers = {"X-ALE-Validation": json_header(validations, validation_totals)}
+    if dedup is not None:
+        headers["X-ALE-Dedup"] = json_header(merge.dedup_report(), dedup_totals)
+
+    job.progress("writing")
+    if output_format == "ale":
+        return JobResult(merge.iter_ale(), "text/plain", "merged_ales.ale", headers)
+    return JobResult(merge.iter_csv(), "text/csv", "merged_ales.csv", headers)
+
+def ale_merge_job(job, inputs, filenames, check_tape_length, dedup, dedup_key, output_format, want_report):
+    return ale_merge_result(list(zip(filenames, inputs)), check_tape_length, dedup, dedup_key, output_format, job,
+                            want_report)
+
+def merge_ales(output_format):
     if "files" not in request.files:
         return jsonify({"error": "No file part"}), 400
         
@@ -513,42 +854,72 @@ def merge_ales_to_csv():
         return jsonify({"error": "No selected files"}), 400
 
     check_tape_length = request.form.get("check_tape_length", "true").lower() == "true"
-    all_dfs = []
-    for file in files:
-        if file and file.filename.lower().endswith('.ale'):
-            filename = secure_filename(file.filename)
-            try:
-                filepath = f"/tmp/{filename}"
-                file.save(filepath)
-                convert_cr_to_lf(filepath)
-                parsed_data = ALE_Parser.ale_read_parser(filepath, check_tape_length=check_tape_length)
-                if parsed_data[2] is None:
-                    print(f"Skipping file {filename} due to parsing error.")
-                    continue
-                _, _, df, _, _ = parsed_data
-                os.remove(filepath)
-                all_dfs.append(df)
+    # report=json returns the per-file validation and dedup reports instead of the merge
+    want_report = request.form.get("report", "").lower() == "json"
 
-            except ValueError as e:
-                print(f"Error processing file {filename}: {e}")
-                continue
-            except Exception as e:
-                print(f"Error processing file {filename}: {e}")
-                continue
-    
-    if not all_dfs:
-        return jsonify({"error": "No valid ALE files to merge"}), 400
+    # Optional dedup, e.g. dedup_key="Tape,Start,End" and dedup_keep="first" or "last"
+    dedup = None
+    dedup_key = [column.strip() for column in request.form.get("dedup_key", "").split(",") if column.strip()]
+    if dedup_key:
+        try:
+            dedup = Deduplicator(dedup_key, request.form.get("dedup_keep", "first").lower())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    # The merge or the job takes the streams over and closes them once parsed
+    uploads = [(file.filename, detach_stream(file)) for file in files if file]
+    if wants_background():
+        return submit_job(f"ale_merge_{output_format}", ale_merge_job,
+                          ([filename for filename, _ in uploads], check_tape_length, dedup, dedup_key, output_format,
+                           want_report),
+                          [stream for _, stream in uploads])
 
-    merged_df = pd.concat(all_dfs, ignore_index=True)
-    
-    output = io.StringIO()
-    merged_df.to_csv(output, index=False)
-    output.seek(0)
-    
-    return output.getvalue(), 200, {
-        "Content-Type": "text/csv",
-        "Content-Disposition": "attachment; filename=merged_ales.csv"
-    }
+    try:
+        return result_response(ale_merge_result(uploads, check_tape_length, dedup, dedup_key, output_format,
+                                                want_report=want_report))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/api/ale/merge_to_csv", methods=["POST"])
+def merge_ales_to_csv():
+    return merge_ales("csv")
+
+@app.route("/api/ale/merge_to_ale", methods=["POST"])
+def merge_ales_to_ale():
+    return merge_ales("ale")
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_state(job_id):
+    try:
+        return jsonify(get_jobs().state(job_id))
+    except KeyError:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    try:
+        return jsonify(get_jobs().cancel(job_id))
+    except KeyError:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    try:
+        path, state = get_jobs().result(job_id)
+    except KeyError:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e), **get_jobs().state(job_id)}), 409
+    result = state["result"]
+    response = send_file(path, mimetype=result["mimetype"], as_attachment=bool(result["filename"]),
+                         download_name=result["filename"])
+    for name, value in result["headers"].items():
+        response.headers[name] = value
+    return response
+
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(get_cache().stats())
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
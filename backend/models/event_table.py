@@ -0,0 +1,115 @@
+from array import array
+from dataclasses import MISSING, fields
+from typing import Dict, Iterable, Iterator, List, Union
+from models.event import Event
+
+FIELDS = tuple(f.name for f in fields(Event))
+DEFAULTS = {f.name: (None if f.default is MISSING else f.default) for f in fields(Event)}
+
+# Columns that are never None are packed into typed arrays, everything else
+# stays a plain list (one pointer per row instead of one dict entry per row).
+TYPED_COLUMNS = {
+    'event_num': 'q',
+    'framerate': 'd',
+    'is_black': 'b',
+    'is_audio_only': 'b',
+    'is_temp': 'b',
+}
+BOOL_COLUMNS = ('is_black', 'is_audio_only', 'is_temp')
+
+
+class EventTable:
+    """
+    Column-oriented container for events.
+
+    Parsers append plain rows, no per-event object is kept. Indexing or
+    iterating still hands out Event instances for existing callers, and
+    to_columnar() serializes one array per field.
+    """
+    __slots__ = ('_columns', '_length')
+
+    def __init__(self):
+        self._columns: Dict[str, Union[array, list]] = {
+            name: array(TYPED_COLUMNS[name]) if name in TYPED_COLUMNS else [] for name in FIELDS
+        }
+        self._length = 0
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event]) -> 'EventTable':
+        table = cls()
+        table.extend(events)
+        return table
+
+    def append_row(self, row: dict):
+        for name in FIELDS:
+            self._columns[name].append(row.get(name, DEFAULTS[name]))
+        self._length += 1
+
+    def append(self, event: Event):
+        for name in FIELDS:
+            self._columns[name].append(getattr(event, name))
+        self._length += 1
+
+    def extend(self, events: Iterable[Event]):
+        if isinstance(events, EventTable):
+            for name in FIELDS:
+                self._columns[name].extend(events._columns[name])
+            self._length += len(events)
+            return
+        for event in events:
+            self.append(event)
+
+    def column(self, name: str) -> Union[array, list]:
+        return self._columns[name]
+
+    def row(self, index: int) -> dict:
+        row = {name: self._columns[name][index] for name in FIELDS}
+        for name in BOOL_COLUMNS:
+            row[name] = bool(row[name])
+        return row
+
+    def take(self, indices: Iterable[int]) -> 'EventTable':
+        table = EventTable()
+        indices = list(indices)
+        for name in FIELDS:
+            source = self._columns[name]
+            values = [source[i] for i in indices]
+            table._columns[name] = array(TYPED_COLUMNS[name], values) if name in TYPED_COLUMNS else values
+        table._length = len(indices)
+        return table
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> Event:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("EventTable index out of range")
+        return Event(**self.row(index))
+
+    def __iter__(self) -> Iterator[Event]:
+        for index in range(self._length):
+            yield Event(**self.row(index))
+
+    def iter_records(self) -> Iterator[dict]:
+        for index in range(self._length):
+            yield self.row(index)
+
+    def to_records(self) -> List[dict]:
+        return list(self.iter_records())
+
+    def to_columnar(self) -> dict:
+        columns = {}
+        for name in FIELDS:
+            values = self._columns[name]
+            if name in BOOL_COLUMNS:
+                columns[name] = [bool(v) for v in values]
+            else:
+                columns[name] = values.tolist() if isinstance(values, array) else values
+        return {
+            'format': 'columnar',
+            'length': self._length,
+            'fields': list(FIELDS),
+            'columns': columns,
+        }
@@ -1,119 +1,209 @@
+import codecs
+import io
 import re
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Union
 from models.event import Event
+from models.event_table import EventTable
+from services import timecode
 
-def frames_to_tc(frames: int, fps: float) -> str:
-    round_fps = round(fps)
-    h = int(frames / (3600 * round_fps))
-    m = int((frames % (3600 * round_fps)) / (60 * round_fps))
-    s = int(((frames % (3600 * round_fps)) % (60 * round_fps)) / round_fps)
-    f = int(((frames % (3600 * round_fps)) % (60 * round_fps)) % round_fps)
-    return f"{h:02d}:{m:02d}:{s:02d}:{f:02d}"
-
-def tc_to_frames(tc: str, fps: float) -> int:
-    if not tc:
-        return 0
-    parts = [int(p) for p in re.split('[:;]', tc)]
-    if len(parts) != 4:
-        return 0
-    round_fps = round(fps)
-    return (parts[0] * 3600 * round_fps +
-            parts[1] * 60 * round_fps +
-            parts[2] * round_fps +
-            parts[3])
+# Bump whenever the parsed output changes so cached results are invalidated
+PARSER_VERSION = '3'
+
+# Number of events buffered while the frame rate is still being worked out.
+# Once the window is full the rate is locked and the rest of the EDL streams
+# in batches of the same size, so durations are computed array-at-a-time.
+FPS_DETECTION_WINDOW = 256
+
+TC = r'\d{2}:\d{2}:\d{2}[:;]\d{2}'
+EVENT_REGEX = re.compile(rf'^(\d+)\s+(\S+)\s+(\S+)\s+(\S+)(?:.*?)\s+({TC})\s+({TC})\s+({TC})\s+({TC})')
+COMMENT_REGEX = re.compile(r'\*\s*(FROM CLIP NAME|TO CLIP NAME|SOURCE FILE):\s*(.*)')
+
+def frames_to_tc(frames: int, fps: float, drop_frame: bool = False) -> str:
+    return timecode.frames_to_tc(frames, fps, drop_frame)
+
+def tc_to_frames(tc: str, fps: float, drop_frame: Optional[bool] = None) -> int:
+    return timecode.tc_to_frames(tc, fps, drop_frame)
+
+def _framerate_from_max_frame(max_frame: int, drop_frame: bool = False) -> float:
+    if max_frame > 50: return 59.94
+    if max_frame > 40: return 50.0
+    if max_frame > 24:
+        if drop_frame:
+            return 29.97
+        return 29.97
+    if max_frame > 23: return 25.0
+
+    return 23.976
+
+class FramerateDetector:
+    """
+    Incrementally guesses the frame rate from the highest frame number seen
+    in the record timecodes, so it can be fed line by line while parsing.
+    """
+    def __init__(self):
+        self.max_frame = 0
+        self.drop_frame = False
+        self.seen = False
+
+    def feed_line(self, line: str):
+        if 'FCM: DROP FRAME' in line:
+            self.drop_frame = True
+
+    def feed(self, *timecodes: str):
+        for tc in timecodes:
+            frame = int(tc[-2:])
+            if frame > self.max_frame:
+                self.max_frame = frame
+        self.seen = True
+
+    @property
+    def framerate(self) -> float:
+        if not self.seen:
+            return 24.0
+        return _framerate_from_max_frame(self.max_frame, self.drop_frame)
+
+    def drop_frame_for(self, fps: float) -> Optional[bool]:
+        # None lets the timecode engine decide per timecode from ';' separators
+        if self.drop_frame and timecode.normalize_rate(fps) in timecode.DROP_FRAMES:
+            return True
+        return None
 
 def detect_framerate(text: str) -> float:
     # Find event lines to extract ONLY record timecodes (last two TC groups)
-    event_regex = re.compile(r'^\d+\s+\S+\s+\S+\s+\S+(?:.*?)\s+\d{2}:\d{2}:\d{2}:\d{2}\s+\d{2}:\d{2}:\d{2}:\d{2}\s+(\d{2}:\d{2}:\d{2}:\d{2})\s+(\d{2}:\d{2}:\d{2}:\d{2})', re.MULTILINE)
+    event_regex = re.compile(rf'^\d+\s+\S+\s+\S+\s+\S+(?:.*?)\s+{TC}\s+{TC}\s+({TC})\s+({TC})', re.MULTILINE)
     matches = event_regex.findall(text)
-    
+
     if not matches:
-        tc_regex = r'(\d{2}:\d{2}:\d{2}:\d{2})'
+        tc_regex = rf'({TC})'
         all_matches = re.findall(tc_regex, text)
         if not all_matches:
             return 24.0
         matches = [(tc, tc) for tc in all_matches]
-        
-    max_frame = 0
+
+    detector = FramerateDetector()
+    detector.feed_line(text)
     for rec_in, rec_out in matches:
-        frame_in = int(rec_in[-2:])
-        frame_out = int(rec_out[-2:])
-        if frame_in > max_frame: max_frame = frame_in
-        if frame_out > max_frame: max_frame = frame_out
+        detector.feed(rec_in, rec_out)
+    return detector.framerate
 
-    if max_frame > 50: return 59.94
-    if max_frame > 40: return 50.0
-    if max_frame > 24: 
-        if 'FCM: DROP FRAME' in text:
-            return 29.97
-        return 29.97
-    if max_frame > 24: return 25.0
-    
-    return 23.976
+def _iter_lines(source, encoding: str) -> Iterator[str]:
+    """
+    Yields text lines from a str, bytes, text stream, binary stream or any
+    iterable of lines without materialising the whole document as a list.
+    """
+    if isinstance(source, str):
+        source = io.StringIO(source, newline=None)
+    elif isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
 
-def parse(text: str, filename: str = None) -> List[Event]:
-    lines = text.split('\n')
-    clips: List[Event] = []
-    current_clip_dict = {}
-    
-    fps = detect_framerate(text)
-
-    # Regex patterns translated from JS
-    event_regex = re.compile(r'^(\d+)\s+(\S+)\s+(\S+)\s+(\S+)(?:.*?)\s+(\d{2}:\d{2}:\d{2}:\d{2})\s+(\d{2}:\d{2}:\d{2}:\d{2})\s+(\d{2}:\d{2}:\d{2}:\d{2})\s+(\d{2}:\d{2}:\d{2}:\d{2})')
-    name_regex = re.compile(r'\*\s*FROM CLIP NAME:\s*(.*)')
-    to_name_regex = re.compile(r'\*\s*TO CLIP NAME:\s*(.*)')
-    source_file_regex = re.compile(r'\*\s*SOURCE FILE:\s*(.*)')
-    
-    for line in lines:
-        event_match = event_regex.match(line.strip())
-        if event_match:
-            # If a clip was being processed, finalize and add it
+    if hasattr(source, 'read') and isinstance(source.read(0), bytes):
+        source = codecs.getreader(encoding)(source, errors='replace')
+
+    for line in source:
+        if isinstance(line, bytes):
+            line = line.decode(encoding, errors='replace')
+        yield line
+
+def _finalize(clips: List[dict], fps: float, drop_frame: Optional[bool]) -> Iterator[dict]:
+    durations = timecode.durations([clip['src_in'] for clip in clips],
+                                   [clip['src_out'] for clip in clips], fps, drop_frame)
+    for clip, duration in zip(clips, durations.tolist()):
+        clip['duration_frames'] = duration
+        clip['framerate'] = fps
+        yield clip
+
+def iter_rows(source: Union[str, bytes, Iterable], filename: str = None, fps: Optional[float] = None,
+              encoding: str = 'utf-8', window: int = FPS_DETECTION_WINDOW) -> Iterator[dict]:
+    """
+    Parses a CMX3600 style EDL in a single pass and yields one dict of Event
+    fields per event.
+
+    `source` may be text, bytes, a text or binary stream, or an iterable of
+    lines. If `fps` is not given it is detected from the record timecodes of
+    the first `window` events, which are held back until the rate is known.
+    """
+    detector = FramerateDetector()
+    drop_frame = None
+    pending: List[dict] = []
+    current_clip_dict = None
+
+    for line in _iter_lines(source, encoding):
+        line = line.strip()
+        if not line:
+            continue
+
+        if line[0].isdigit():
+            event_match = EVENT_REGEX.match(line)
+            if event_match:
+                # If a clip was being processed, queue it for finalizing
+                if current_clip_dict:
+                    pending.append(current_clip_dict)
+
+                groups = event_match.groups()
+                current_clip_dict = {
+                    'event_num': int(groups[0]),
+                    'reel': groups[1],
+                    'track_type': groups[2],
+                    'transition': groups[3],
+                    'src_in': groups[4],
+                    'src_out': groups[5],
+                    'rec_in': groups[6],
+                    'rec_out': groups[7],
+                    'source_format': 'edl',
+                    'is_black': groups[1] == 'BL' or groups[1] == 'BLK',
+                }
+
+                if fps is None:
+                    detector.feed(groups[6], groups[7])
+
+                if len(pending) >= window:
+                    if fps is None:
+                        fps = detector.framerate
+                        drop_frame = detector.drop_frame_for(fps)
+                    yield from _finalize(pending, fps, drop_frame)
+                    pending = []
+                continue
+
+        if line[0] == '*':
             if current_clip_dict:
-                clips.append(Event(**current_clip_dict))
-
-            groups = event_match.groups()
-            src_in_tc = groups[4]
-            src_out_tc = groups[5]
-            
-            src_in_frames = tc_to_frames(src_in_tc, fps)
-            src_out_frames = tc_to_frames(src_out_tc, fps)
-
-            current_clip_dict = {
-                'event_num': int(groups[0]),
-                'reel': groups[1],
-                'track_type': groups[2],
-                'transition': groups[3],
-                'src_in': src_in_tc,
-                'src_out': src_out_tc,
-                'rec_in': groups[6],
-                'rec_out': groups[7],
-                'duration_frames': src_out_frames - src_in_frames,
-                'framerate': fps,
-                'source_format': 'edl',
-                'is_black': groups[1] == 'BL' or groups[1] == 'BLK',
-            }
-
-        elif current_clip_dict:
-            name_match = name_regex.match(line.strip())
-            if name_match:
-                clip_name = name_match.group(1).strip()
-                current_clip_dict['clip_name'] = clip_name
-                if 'source_file' not in current_clip_dict or not current_clip_dict['source_file']:
-                    current_clip_dict['source_file'] = clip_name
-            
-            to_name_match = to_name_regex.match(line.strip())
-            if to_name_match:
-                clip_name = to_name_match.group(1).strip()
-                current_clip_dict['clip_name'] = clip_name
-                if 'source_file' not in current_clip_dict or not current_clip_dict['source_file']:
-                    current_clip_dict['source_file'] = clip_name
-
-            source_match = source_file_regex.match(line.strip())
-            if source_match:
-                current_clip_dict['source_file'] = source_match.group(1).strip()
+                comment_match = COMMENT_REGEX.match(line)
+                if comment_match:
+                    kind, value = comment_match.groups()
+                    value = value.strip()
+                    if kind == 'SOURCE FILE':
+                        current_clip_dict['source_file'] = value
+                    else:
+                        current_clip_dict['clip_name'] = value
+                        if not current_clip_dict.get('source_file'):
+                            current_clip_dict['source_file'] = value
+        else:
+            detector.feed_line(line)
 
     # Add the last clip
     if current_clip_dict:
-        clips.append(Event(**current_clip_dict))
-        
-    return clips
+        pending.append(current_clip_dict)
+
+    if pending:
+        if fps is None:
+            fps = detector.framerate
+            drop_frame = detector.drop_frame_for(fps)
+        yield from _finalize(pending, fps, drop_frame)
+
+def iter_events(source: Union[str, bytes, Iterable], filename: str = None, fps: Optional[float] = None,
+                encoding: str = 'utf-8', window: int = FPS_DETECTION_WINDOW) -> Iterator[Event]:
+    for row in iter_rows(source, filename, fps, encoding, window):
+        yield Event(**row)
+
+def parse_table(source: Union[str, bytes, Iterable], filename: str = None, fps: Optional[float] = None,
+                encoding: str = 'utf-8', table: Optional[EventTable] = None) -> EventTable:
+    """
+    Parses an EDL straight into an EventTable, appending to `table` if given.
+    """
+    if table is None:
+        table = EventTable()
+    for row in iter_rows(source, filename, fps, encoding):
+        table.append_row(row)
+    return table
+
+def parse(text: str, filename: str = None) -> List[Event]:
+    return list(iter_events(text, filename))
@@ -0,0 +1,618 @@
+"""
+Native MXF header metadata reader (SMPTE ST 377-1).
+
+The file is memory mapped and only the KLV packets of the header metadata
+are walked: the header partition pack, then the local sets that follow it
+(Preface, Identification, packages, tracks, sequences, descriptors). When
+the header partition is marked incomplete (cameras often write the final
+metadata only on close) the repeat in the footer partition is used instead,
+found through the footer offset or the Random Index Pack. Essence is never
+touched, so the cost does not depend on the file size. The partition the
+metadata was taken from is reported as "metadata_partition", and metadata
+still marked incomplete there counts as incomplete().
+
+The result mirrors ffprobe's -show_format/-show_streams JSON, so the
+MXF Inspector summary is built the same way from either source. Only
+static local tags are decoded; anything that cannot be identified (an
+unknown picture coding, a missing descriptor) is reported by incomplete()
+so callers can fall back to ffprobe.
+"""
+
+import mmap
+import os
+import struct
+import uuid
+from fractions import Fraction
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from services.timecode import frames_to_tc
+
+# Bump whenever the parsed output changes so cached results are invalidated
+PARSER_VERSION = '2'
+
+FORMAT_NAME = 'mxf'
+FORMAT_LONG_NAME = 'MXF (Material eXchange Format)'
+RUN_IN_LIMIT = 65536
+
+_UL_PREFIX = b'\x06\x0e\x2b\x34'
+_PACK_PREFIX = bytes.fromhex('0d01020101')    # bytes 8-12 of partition, primer and RIP keys
+_SET_PREFIX = bytes.fromhex('0d0101010101')   # bytes 8-13 of structural metadata set keys
+
+_HEADER, _BODY, _FOOTER, _PRIMER, _RIP = 0x02, 0x03, 0x04, 0x05, 0x11
+_INCOMPLETE = (0x01, 0x02)
+_PARTITION_NAMES = {_HEADER: 'header', _BODY: 'body', _FOOTER: 'footer'}
+_STATUS_NAMES = {0x01: 'open_incomplete', 0x02: 'closed_incomplete', 0x03: 'open_complete', 0x04: 'closed_complete'}
+
+# Structural metadata set types (byte 14 of the set key)
+PREFACE = 0x2f
+IDENTIFICATION = 0x30
+MATERIAL_PACKAGE = 0x36
+SOURCE_PACKAGE = 0x37
+TRACKS = (0x3a, 0x3b)
+SEQUENCE = 0x0f
+SOURCE_CLIP = 0x11
+TIMECODE = 0x14
+MULTIPLE_DESCRIPTOR = 0x44
+PICTURE_DESCRIPTORS = (0x27, 0x28, 0x29, 0x51)
+CDCI_DESCRIPTOR = 0x28
+SOUND_DESCRIPTORS = (0x42, 0x47, 0x48)
+
+# Picture essence coding labels as (label, bytes compared); byte 7 is the
+# registry version and is ignored, as ffmpeg does
+_PICTURE_CODECS = [
+    ('060e2b34040101010401020271000000', 13, 'dnxhd', 'VC3/DNxHD'),
+    ('060e2b34040101010401020203060000', 14, 'prores', 'Apple ProRes (iCodec Pro)'),
+    ('060e2b34040101010401020203010000', 14, 'jpeg2000', 'JPEG 2000'),
+    ('060e2b34040101010401020201310000', 14, 'h264', 'H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10'),
+    ('060e2b34040101010401020201320000', 14, 'h264', 'H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10'),
+    ('060e2b34040101010401020201200000', 14, 'mpeg4', 'MPEG-4 part 2'),
+    ('060e2b34040101010401020201010000', 14, 'mpeg2video', 'MPEG-2 video'),
+    ('060e2b34040101010401020201020000', 14, 'mpeg2video', 'MPEG-2 video'),
+    ('060e2b34040101010401020201030000', 14, 'mpeg2video', 'MPEG-2 video'),
+    ('060e2b34040101010401020201040000', 14, 'mpeg2video', 'MPEG-2 video'),
+    ('060e2b34040101010401020202000000', 13, 'dvvideo', 'DV (Digital Video)'),
+    ('060e2b34040101010401020100000000', 12, 'rawvideo', 'raw video'),
+]
+_PCM_CODING = bytes.fromhex('04020201')  # bytes 8-11 of uncompressed sound coding labels
+
+
+class MxfError(Exception):
+    pass
+
+
+class Klv(NamedTuple):
+    key: bytes
+    start: int      # offset of the key
+    value: int      # offset of the value
+    end: int        # offset after the value
+
+
+class MxfSet(NamedTuple):
+    kind: int
+    items: Dict[int, bytes]
+
+
+def _match(label: bytes, pattern: str, length: int) -> bool:
+    expected = bytes.fromhex(pattern)
+    return label[:7] == expected[:7] and label[8:length] == expected[8:length]
+
+
+def _read_klv(buf, pos: int, size: int) -> Klv:
+    if pos + 17 > size:
+        raise MxfError(f"Truncated KLV at offset {pos}")
+    key = bytes(buf[pos:pos + 16])
+    if key[:4] != _UL_PREFIX:
+        raise MxfError(f"Lost KLV sync at offset {pos}")
+    first = buf[pos + 16]
+    value = pos + 17
+    if first < 0x80:
+        length = first
+    else:
+        count = first & 0x7f
+        if count == 0 or count > 8 or value + count > size:
+            raise MxfError(f"Invalid BER length at offset {pos}")
+        length = int.from_bytes(buf[value:value + count], 'big')
+        value += count
+    return Klv(key, pos, value, value + length)
+
+
+def _partition_kind(key: bytes) -> Optional[Tuple[int, int]]:
+    # Partition packs, the primer pack and the RIP share one key layout
+    if key[4] == 0x02 and key[5] == 0x05 and key[8:13] == _PACK_PREFIX:
+        return key[13], key[14]
+    return None
+
+
+def _set_kind(key: bytes) -> Optional[int]:
+    if key[4] == 0x02 and key[5] == 0x53 and key[8:14] == _SET_PREFIX:
+        return key[14]
+    return None
+
+
+def _local_set(buf, klv: Klv) -> Dict[int, bytes]:
+    items = {}
+    pos = klv.value
+    while pos + 4 <= klv.end:
+        tag, length = struct.unpack_from('>HH', buf, pos)
+        items[tag] = bytes(buf[pos + 4:pos + 4 + length])
+        pos += 4 + length
+    return items
+
+
+# Value decoders
+
+def _u8(value: Optional[bytes]) -> Optional[int]:
+    return value[0] if value else None
+
+
+def _uint(value: Optional[bytes]) -> Optional[int]:
+    return int.from_bytes(value, 'big') if value else None
+
+
+def _int(value: Optional[bytes]) -> Optional[int]:
+    return int.from_bytes(value, 'big', signed=True) if value else None
+
+
+def _rational(value: Optional[bytes]) -> Optional[Fraction]:
+    if not value or len(value) < 8:
+        return None
+    num, den = struct.unpack_from('>ii', value)
+    return Fraction(num, den) if den else None
+
+
+def _string(value: Optional[bytes]) -> Optional[str]:
+    if not value:
+        return None
+    return value.decode('utf-16-be', errors='replace').split('\x00', 1)[0] or None
+
+
+def _refs(value: Optional[bytes]) -> List[bytes]:
+    if not value or len(value) < 8:
+        return []
+    count, item_size = struct.unpack_from('>II', value)
+    return [value[8 + i * item_size:8 + (i + 1) * item_size] for i in range(count)
+            if 8 + (i + 1) * item_size <= len(value)]
+
+
+def _uid(value: Optional[bytes]) -> Optional[str]:
+    return str(uuid.UUID(bytes=value)) if value and len(value) == 16 else None
+
+
+def _ul(value: Optional[bytes]) -> Optional[str]:
+    if not value or len(value) != 16:
+        return None
+    text = value.hex()
+    return '.'.join(text[i:i + 8] for i in range(0, 32, 8))
+
+
+def _umid(value: Optional[bytes]) -> Optional[str]:
+    return '0x' + value.hex().upper() if value else None
+
+
+def _timestamp(value: Optional[bytes]) -> Optional[str]:
+    if not value or len(value) < 8:
+        return None
+    year, month, day, hour, minute, second, quarter_ms = struct.unpack_from('>HBBBBBB', value)
+    if not year:
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}T{hour:02d}:{minute:02d}:{second:02d}.{quarter_ms * 4000:06d}Z"
+
+
+def _version(value: Optional[bytes]) -> Optional[str]:
+    if not value or len(value) < 10:
+        return None
+    return '.'.join(str(part) for part in struct.unpack_from('>HHHHH', value))
+
+
+def _ratio(value: Optional[Fraction], separator: str) -> Optional[str]:
+    if value is None:
+        return None
+    return f"{value.numerator}{separator}{value.denominator}"
+
+
+def _data_kind(label: Optional[bytes]) -> Optional[str]:
+    """
+    Track kind from a data definition label (SMPTE RP 224), legacy labels included.
+    """
+    if not label or len(label) != 16 or label[:4] != _UL_PREFIX:
+        return None
+    if label[8:11] == b'\x01\x03\x02':
+        if label[11] == 0x01:
+            return 'timecode'
+        if label[11] == 0x02:
+            return {1: 'picture', 2: 'sound', 3: 'data'}.get(label[12])
+    return None
+
+
+def _format_timecode(frames: int, base: int, drop_frame: bool) -> str:
+    rate = {30: 29.97, 60: 59.94}.get(base) if drop_frame else float(base)
+    try:
+        return frames_to_tc(frames, rate, drop_frame)
+    except (KeyError, ValueError):
+        seconds, frame = divmod(frames, base)
+        minutes, second = divmod(seconds, 60)
+        hours, minute = divmod(minutes, 60)
+        return f"{hours % 24:02d}:{minute:02d}:{second:02d}:{frame:02d}"
+
+
+class HeaderMetadata:
+    """
+    The decoded sets of one header metadata block, indexed by instance UID.
+    """
+
+    def __init__(self, partition: Dict[str, object]):
+        self.partition = partition
+        self.sets: Dict[bytes, MxfSet] = {}
+        self.order: List[MxfSet] = []
+
+    def add(self, kind: int, items: Dict[int, bytes]):
+        entry = MxfSet(kind, items)
+        self.order.append(entry)
+        instance = items.get(0x3c0a)
+        if instance:
+            self.sets[instance] = entry
+
+    def get(self, ref: Optional[bytes]) -> Optional[MxfSet]:
+        return self.sets.get(ref) if ref else None
+
+    def first(self, *kinds: int) -> Optional[MxfSet]:
+        return next((entry for entry in self.order if entry.kind in kinds), None)
+
+    def last(self, *kinds: int) -> Optional[MxfSet]:
+        return next((entry for entry in reversed(self.order) if entry.kind in kinds), None)
+
+
+class MxfReader:
+    def __init__(self, buf, size: int):
+        self.buf = buf
+        self.size = size
+        self.run_in = 0
+
+    def _find_header(self) -> int:
+        # The header partition pack may follow a run-in of up to 64 KB
+        head = bytes(self.buf[:min(self.size, RUN_IN_LIMIT + 16)])
+        pos = head.find(_UL_PREFIX)
+        while 0 <= pos and pos + 16 <= len(head):
+            kind = _partition_kind(head[pos:pos + 16])
+            if kind is not None and kind[0] == _HEADER:
+                return pos
+            pos = head.find(_UL_PREFIX, pos + 1)
+        raise MxfError("No MXF header partition found")
+
+    def _partition(self, pos: int) -> Tuple[Klv, Dict[str, object]]:
+        klv = _read_klv(self.buf, pos, self.size)
+        kind = _partition_kind(klv.key)
+        if kind is None or kind[0] not in (_HEADER, _BODY, _FOOTER):
+            raise MxfError(f"No partition pack at offset {pos}")
+        if klv.end > self.size or klv.end - klv.value < 88:
+            raise MxfError(f"Truncated partition pack at offset {pos}")
+        fields = struct.unpack_from('>HHIQQQQQIQI', self.buf, klv.value)
+        return klv, {
+            'kind': kind[0],
+            'status': kind[1],
+            'footer': fields[5],
+            'header_bytes': fields[6],
+            'operational_pattern': bytes(self.buf[klv.value + 64:klv.value + 80]),
+        }
+
+    def _metadata(self, pos: int) -> HeaderMetadata:
+        pack, partition = self._partition(pos)
+        metadata = HeaderMetadata(partition)
+        pos = pack.end
+        end = self.size
+        started = False
+        while pos < end:
+            klv = _read_klv(self.buf, pos, self.size)
+            if klv.end > self.size:
+                raise MxfError(f"Truncated KLV at offset {pos}")
+            kind = _partition_kind(klv.key)
+            if kind is not None:
+                if kind[0] != _PRIMER:
+                    break
+                if not started and partition['header_bytes']:
+                    end = min(end, klv.start + partition['header_bytes'])
+                started = True
+            else:
+                set_kind = _set_kind(klv.key)
+                if set_kind is not None:
+                    metadata.add(set_kind, _local_set(self.buf, klv))
+                elif klv.key[4] == 0x01 and started and klv.key[8:11] != b'\x03\x01\x02':
+                    break  # essence: header metadata is over (fill keys are skipped)
+            pos = klv.end
+        return metadata
+
+    def _footer_offset(self, header: Dict[str, object]) -> Optional[int]:
+        if header['footer']:
+            return self.run_in + header['footer']
+        # Random Index Pack: its overall length is stored in the last 4 bytes
+        if self.size < 20:
+            return None
+        length = struct.unpack_from('>I', self.buf, self.size - 4)[0]
+        start = self.size - length
+        if length < 20 or start < 0:
+            return None
+        key = bytes(self.buf[start:start + 16])
+        if key[:4] != _UL_PREFIX or _partition_kind(key) != (_RIP, 0x01):
+            return None
+        klv = _read_klv(self.buf, start, self.size)
+        if klv.end > self.size:
+            raise MxfError(f"Truncated Random Index Pack at offset {start}")
+        entries = (klv.end - klv.value - 4) // 12
+        if entries <= 0:
+            return None
+        try:
+            return self.run_in + struct.unpack_from('>Q', self.buf, klv.value + (entries - 1) * 12 + 4)[0]
+        except struct.error:
+            raise MxfError(f"Truncated Random Index Pack at offset {start}")
+
+    def read(self) -> HeaderMetadata:
+        self.run_in = self._find_header()
+        metadata = self._metadata(self.run_in)
+        if metadata.partition['status'] in _INCOMPLETE or not metadata.order:
+            footer = self._footer_offset(metadata.partition)
+            if footer is not None and self.run_in < footer < self.size:
+                try:
+                    repeat = self._metadata(footer)
+                except MxfError:
+                    repeat = None
+                if repeat is not None and repeat.order and repeat.partition['kind'] == _FOOTER:
+                    return repeat
+        return metadata
+
+
+def _picture_codec(label: Optional[bytes]) -> Tuple[Optional[str], Optional[str]]:
+    if label:
+        for pattern, length, name, long_name in _PICTURE_CODECS:
+            if _match(label, pattern, length):
+                return name, long_name
+    return None, None
+
+
+def _pix_fmt(descriptor: MxfSet) -> Optional[str]:
+    if descriptor.kind != CDCI_DESCRIPTOR:
+        return None
+    items = descriptor.items
+    depth = _uint(items.get(0x3301)) or 8
+    horizontal = _uint(items.get(0x3302)) or 1
+    vertical = _uint(items.get(0x3308)) or 1
+    chroma = {(2, 1): '422', (1, 1): '444', (2, 2): '420'}.get((horizontal, vertical))
+    if chroma is None or depth not in (8, 10, 12, 16):
+        return None
+    return f"yuv{chroma}p" + ('' if depth == 8 else f"{depth}le")
+
+
+def _descriptor_for(metadata: HeaderMetadata, package: MxfSet, track_id: Optional[int],
+                    kind: str) -> Optional[MxfSet]:
+    descriptor = metadata.get(package.items.get(0x4701))
+    if descriptor is None or descriptor.kind != MULTIPLE_DESCRIPTOR:
+        return descriptor
+    subs = [metadata.get(ref) for ref in _refs(descriptor.items.get(0x3f01))]
+    subs = [sub for sub in subs if sub is not None]
+    for sub in subs:
+        if track_id is not None and _uint(sub.items.get(0x3006)) == track_id:
+            return sub
+    wanted = PICTURE_DESCRIPTORS if kind == 'picture' else SOUND_DESCRIPTORS
+    return next((sub for sub in subs if sub.kind in wanted), None)
+
+
+def _segment(metadata: HeaderMetadata, track: MxfSet) -> Tuple[Optional[MxfSet], List[MxfSet]]:
+    """
+    A track's sequence (or bare component) and its components.
+    """
+    segment = metadata.get(track.items.get(0x4803))
+    if segment is None:
+        return None, []
+    if segment.kind == SEQUENCE:
+        components = [metadata.get(ref) for ref in _refs(segment.items.get(0x1001))]
+        return segment, [component for component in components if component is not None]
+    return segment, [segment]
+
+
+def _timecode(metadata: HeaderMetadata, package: Optional[MxfSet]) -> Optional[str]:
+    if package is None:
+        return None
+    for ref in _refs(package.items.get(0x4403)):
+        track = metadata.get(ref)
+        if track is None or track.kind not in TRACKS:
+            continue
+        _, components = _segment(metadata, track)
+        for component in components:
+            if component.kind == TIMECODE:
+                base = _uint(component.items.get(0x1502))
+                start = _int(component.items.get(0x1501)) or 0
+                if base:
+                    return _format_timecode(start, base, bool(_u8(component.items.get(0x1503))))
+    return None
+
+
+def _stream(metadata: HeaderMetadata, packages: Dict[bytes, MxfSet], track: MxfSet, index: int) -> Optional[dict]:
+    segment, components = _segment(metadata, track)
+    if segment is None:
+        return None
+    kind = _data_kind(segment.items.get(0x0201))
+    if kind in (None, 'timecode'):
+        return None
+    edit_rate = _rational(track.items.get(0x4b01))
+    duration = _int(segment.items.get(0x0202))
+
+    clip = next((component for component in components if component.kind == SOURCE_CLIP), None)
+    source = packages.get(clip.items.get(0x1101)) if clip is not None else None
+    source_track = _uint(clip.items.get(0x1102)) if clip is not None else None
+    descriptor = _descriptor_for(metadata, source, source_track, kind) if source is not None else None
+
+    stream = {'index': index}
+    if kind == 'picture':
+        stream['codec_type'] = 'video'
+        items = descriptor.items if descriptor is not None else {}
+        stream['codec_name'], stream['codec_long_name'] = _picture_codec(items.get(0x3201))
+        width = _uint(items.get(0x3203))
+        height = _uint(items.get(0x3202))
+        if height and _u8(items.get(0x320c)) in (1, 4):
+            height *= 2  # field height to frame height
+        stream['width'] = width
+        stream['height'] = height
+        stream['display_aspect_ratio'] = _ratio(_rational(items.get(0x320e)), ':')
+        rate = _rational(items.get(0x3001)) or edit_rate
+        stream['r_frame_rate'] = stream['avg_frame_rate'] = _ratio(rate, '/')
+        stream['pix_fmt'] = _pix_fmt(descriptor) if descriptor is not None else None
+        depth = _uint(items.get(0x3301))
+        if depth:
+            stream['bits_per_raw_sample'] = str(depth)
+    elif kind == 'sound':
+        stream['codec_type'] = 'audio'
+        items = descriptor.items if descriptor is not None else {}
+        coding = items.get(0x3d06)
+        bits = _uint(items.get(0x3d01))
+        channels = _uint(items.get(0x3d07))
+        sample_rate = _rational(items.get(0x3d03))
+        if descriptor is not None and (not coding or coding[8:12] == _PCM_CODING) and bits in (16, 24, 32):
+            stream['codec_name'] = f"pcm_s{bits}le"
+            stream['codec_long_name'] = f"PCM signed {bits}-bit little-endian"
+        else:
+            stream['codec_name'] = stream['codec_long_name'] = None
+        stream['sample_rate'] = str(int(sample_rate)) if sample_rate else None
+        stream['channels'] = channels
+        layout = {1: 'mono', 2: 'stereo'}.get(channels)
+        if layout:
+            stream['channel_layout'] = layout
+        stream['bits_per_sample'] = bits
+        if sample_rate and channels and bits and stream['codec_name']:
+            stream['bit_rate'] = str(int(sample_rate * channels * bits))
+    else:
+        stream['codec_type'] = 'data'
+        stream['codec_name'] = None
+
+    if edit_rate and duration is not None and duration >= 0:
+        stream['time_base'] = _ratio(1 / edit_rate, '/')
+        stream['duration_ts'] = duration
+        stream['duration'] = f"{float(duration / edit_rate):.6f}"
+
+    tags = {}
+    if source is not None:
+        tags['file_package_umid'] = _umid(source.items.get(0x4401))
+    name = _string(track.items.get(0x4802))
+    if name:
+        tags['track_name'] = name
+    if tags:
+        stream['tags'] = tags
+    return stream
+
+
+def probe_buffer(buf, size: int) -> dict:
+    """
+    Reads the header metadata of an MXF held in `buf` (an mmap, bytes or
+    memoryview of `size` bytes) and returns ffprobe-style JSON.
+    """
+    metadata = MxfReader(buf, size).read()
+    preface = metadata.first(PREFACE)
+    if preface is None:
+        raise MxfError("No Preface set in the header metadata")
+
+    packages = {entry.items.get(0x4401): entry for entry in metadata.order if entry.kind == SOURCE_PACKAGE}
+    material = metadata.first(MATERIAL_PACKAGE)
+    if material is None:
+        raise MxfError("No Material Package in the header metadata")
+
+    streams = []
+    for ref in _refs(material.items.get(0x4403)):
+        track = metadata.get(ref)
+        if track is None or track.kind not in TRACKS:
+            continue
+        stream = _stream(metadata, packages, track, len(streams))
+        if stream is not None:
+            streams.append(stream)
+
+    tags = {'operational_pattern_ul': _ul(preface.items.get(0x3b09) or metadata.partition['operational_pattern'])}
+    identification = metadata.last(IDENTIFICATION)
+    if identification is not None:
+        items = identification.items
+        tags.update({
+            'uid': _uid(items.get(0x3c0a)),
+            'generation_uid': _uid(items.get(0x3c09)),
+            'company_name': _string(items.get(0x3c01)),
+            'product_name': _string(items.get(0x3c02)),
+            'product_version_num': _version(items.get(0x3c03)),
+            'product_version': _string(items.get(0x3c04)),
+            'product_uid': _uid(items.get(0x3c05)),
+            'modification_date': _timestamp(items.get(0x3c06)),
+            'toolkit_version_num': _version(items.get(0x3c07)),
+            'application_platform': _string(items.get(0x3c08)),
+        })
+    tags['material_package_umid'] = _umid(material.items.get(0x4401))
+    tags['material_package_name'] = _string(material.items.get(0x4402))
+    source_packages = list(packages.values())
+    tags['timecode'] = _timecode(metadata, material) or \
+        next((tc for tc in (_timecode(metadata, package) for package in source_packages) if tc), None)
+
+    durations = [float(stream['duration']) for stream in streams if stream.get('duration')]
+    duration = max(durations) if durations else None
+    format_info = {
+        'filename': None,
+        'nb_streams': len(streams),
+        'format_name': FORMAT_NAME,
+        'format_long_name': FORMAT_LONG_NAME,
+        'size': str(size),
+        'tags': {name: value for name, value in tags.items() if value is not None},
+    }
+    if duration:
+        format_info['duration'] = f"{duration:.6f}"
+        format_info['bit_rate'] = str(int(size * 8 / duration))
+    partition = {
+        'kind': _PARTITION_NAMES[metadata.partition['kind']],
+        'status': _STATUS_NAMES.get(metadata.partition['status'], 'unknown'),
+    }
+    return {'streams': streams, 'format': format_info, 'metadata_partition': partition}
+
+
+def probe_file(path: str) -> dict:
+    """
+    Memory maps `path` and reads its header metadata.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            raise MxfError("Empty file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            result = probe_buffer(buf, size)
+    result['format']['filename'] = path
+    return result
+
+
+def probe_stream(stream) -> dict:
+    """
+    Reads the header metadata of an open binary file object without
+    copying it: in-memory streams are read through their buffer, real files
+    are memory mapped.
+    """
+    if hasattr(stream, 'getbuffer'):
+        with stream.getbuffer() as buf:
+            if not len(buf):
+                raise MxfError("Empty file")
+            return probe_buffer(buf, len(buf))
+    stream.flush()
+    fd = stream.fileno()
+    size = os.fstat(fd).st_size
+    if size == 0:
+        raise MxfError("Empty file")
+    with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as buf:
+        return probe_buffer(buf, size)
+
+
+def incomplete(raw_data: dict) -> Optional[str]:
+    """
+    Why a native result is not good enough to stand in for ffprobe's, or
+    None when every audio and video stream was fully identified from
+    metadata marked complete.
+    """
+    partition = raw_data.get('metadata_partition') or {}
+    if partition.get('status') in (_STATUS_NAMES[status] for status in _INCOMPLETE):
+        return f"header metadata only found in an incomplete {partition['kind']} partition"
+    streams = raw_data.get('streams', [])
+    if not any(stream['codec_type'] in ('video', 'audio') for stream in streams):
+        return "no audio or video tracks decoded"
+    for stream in streams:
+        if stream['codec_type'] in ('video', 'audio') and not stream.get('codec_name'):
+            return f"unknown codec on stream {stream['index']}"
+        if stream['codec_type'] == 'video' and not (stream.get('width') and stream.get('height')):
+            return f"no picture size on stream {stream['index']}"
+    return None
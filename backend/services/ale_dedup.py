@@ -0,0 +1,94 @@
+"""
+Duplicate clip detection for ALE merges.
+
+Each row is reduced to the tuple of its key column values as strings (for
+example Tape + Start + End). During the first pass over the sources only
+one entry per distinct key is kept, mapping the key to the position of the
+row that survives, so memory follows the number of distinct clips rather
+than the number of rows. Keys are compared in full, never by a hash alone,
+so two distinct clips can not collide. While the merge streams, a row is
+written only if it is the survivor for its key.
+
+Rows whose key columns are all empty are never treated as duplicates.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+KEEP_MODES = ('first', 'last')
+
+
+class Deduplicator:
+    def __init__(self, key_columns: Sequence[str], keep: str = 'first'):
+        if not key_columns:
+            raise ValueError("A dedup key needs at least one column")
+        if keep not in KEEP_MODES:
+            raise ValueError(f"Invalid keep mode '{keep}', expected one of {', '.join(KEEP_MODES)}")
+        self.key_columns = list(key_columns)
+        self.keep = keep
+        self.rows = 0
+        self._winners: Dict[Tuple[str, ...], int] = {}
+        self._offsets: List[int] = []
+        self._unkeyed: List[int] = []
+
+    def _keys(self, df: pd.DataFrame):
+        keys = df.reindex(columns=self.key_columns).fillna('').astype(str)
+        has_key = (keys != '').any(axis=1).to_numpy()
+        return list(zip(*(keys[column].tolist() for column in self.key_columns))), has_key
+
+    def observe(self, df: pd.DataFrame) -> int:
+        """
+        Registers the next source's rows and returns its row offset.
+        """
+        offset = self.rows
+        self._offsets.append(offset)
+        self.rows += len(df)
+
+        keys, has_key = self._keys(df)
+        self._unkeyed.append(int(len(df) - has_key.sum()))
+        ordinals = np.arange(offset, offset + len(df))[has_key].tolist()
+        keys = [key for key, keyed in zip(keys, has_key.tolist()) if keyed]
+        if self.keep == 'last':
+            self._winners.update(zip(keys, ordinals))
+        else:
+            setdefault = self._winners.setdefault
+            for key, o in zip(keys, ordinals):
+                setdefault(key, o)
+        return offset
+
+    def mask(self, df: pd.DataFrame, offset: int) -> np.ndarray:
+        """
+        Boolean mask of the rows to write for a source registered at `offset`.
+        """
+        keys, has_key = self._keys(df)
+        get = self._winners.get
+        keep = np.fromiter((get(key, o) == o for key, o in zip(keys, range(offset, offset + len(df)))),
+                           dtype=bool, count=len(df))
+        return keep | ~has_key
+
+    def report(self, names: Sequence[str]) -> dict:
+        """
+        Removed row counts, overall and per source (in registration order).
+        """
+        bounds = self._offsets + [self.rows]
+        winners = np.fromiter(self._winners.values(), dtype=np.int64, count=len(self._winners))
+        # Survivors per source, found by locating each winning row among the source offsets
+        kept = np.bincount(np.searchsorted(self._offsets, winners, side='right') - 1,
+                           minlength=len(self._offsets))
+        files = []
+        removed_total = 0
+        for idx, name in enumerate(names):
+            rows = bounds[idx + 1] - bounds[idx]
+            removed = rows - int(kept[idx]) - self._unkeyed[idx]
+            removed_total += removed
+            files.append({"file": name, "rows": rows, "removed": removed})
+        return {
+            "key": self.key_columns,
+            "keep": self.keep,
+            "rows": self.rows,
+            "kept": self.rows - removed_total,
+            "removed": removed_total,
+            "files": files,
+        }
@@ -0,0 +1,80 @@
+"""
+Column edits for ALE round trips.
+
+Edits arrive as a JSON object and are applied in a fixed order:
+- "rename": {"Old Name": "New Name", ...}
+- "drop": ["Column", ...]
+- "set": {"Column": "value", ...}     adds the column or overwrites every row (null writes "")
+- "order": ["Column", ...]            listed columns first, the rest keep their order
+"""
+
+import json
+from typing import Union
+
+import pandas as pd
+
+EDIT_KEYS = ("rename", "drop", "set", "order")
+
+
+def parse_edits(raw: Union[str, dict, None]) -> dict:
+    """
+    Parses and type checks the edits, raising ValueError for anything that
+    is not in the shape listed above.
+    """
+    if not raw:
+        return {}
+    edits = json.loads(raw) if isinstance(raw, str) else raw
+    if not isinstance(edits, dict):
+        raise ValueError("Edits must be a JSON object")
+    unknown = set(edits) - set(EDIT_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown edit(s): {', '.join(sorted(unknown))}")
+    for edit in ("rename", "set"):
+        value = edits.get(edit)
+        if value is None:
+            continue
+        if not isinstance(value, dict) or not all(isinstance(key, str) for key in value):
+            raise ValueError(f"'{edit}' must be an object of column names to strings")
+        allowed = (str, type(None)) if edit == "set" else str
+        if not all(isinstance(item, allowed) for item in value.values()):
+            raise ValueError(f"'{edit}' must be an object of column names to strings")
+    for edit in ("drop", "order"):
+        value = edits.get(edit)
+        if value is None:
+            continue
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ValueError(f"'{edit}' must be a list of column names")
+    return edits
+
+
+def _require(df: pd.DataFrame, columns, edit: str):
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"'{edit}' refers to unknown column(s): {', '.join(missing)}")
+
+
+def apply_column_edits(df: pd.DataFrame, edits: dict) -> pd.DataFrame:
+    """
+    Returns a new DataFrame with `edits` applied, raising ValueError for
+    edits that name columns the ALE does not have.
+    """
+    rename = edits.get("rename") or {}
+    if rename:
+        _require(df, rename, "rename")
+        df = df.rename(columns=rename)
+
+    drop = edits.get("drop") or []
+    if drop:
+        _require(df, drop, "drop")
+        df = df.drop(columns=drop)
+
+    values = edits.get("set") or {}
+    if values:
+        df = df.assign(**{column: "" if value is None else str(value) for column, value in values.items()})
+
+    order = edits.get("order") or []
+    if order:
+        _require(df, order, "order")
+        df = df[list(order) + [column for column in df.columns if column not in order]]
+
+    return df
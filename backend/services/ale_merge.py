@@ -0,0 +1,115 @@
+"""
+Bounded-memory merge of several ALEs.
+
+Sources are registered from their parsed frame, which extends a running
+union of columns in first-seen order (the same order pd.concat would give)
+and is then spilled to an anonymous temp file. While the output is produced
+each source is read back, aligned to the union, written and dropped, so at
+most one parsed ALE is held at a time instead of every frame plus their
+concatenation, and no ALE is parsed twice whatever the parse cache kept.
+
+With a Deduplicator attached, the first pass also indexes the key of every
+row and the streaming pass writes only the surviving occurrence of each.
+"""
+
+import pickle
+import tempfile
+from typing import IO, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+import ALE_Parser
+from services.ale_dedup import Deduplicator
+from services.csv_stream import iter_dataframe_csv
+from services.uploads import spool_dir
+
+
+class MergeSource(NamedTuple):
+    name: str
+    columns: List[str]
+    rows: IO[bytes]
+    offset: int = 0
+
+    def load(self) -> pd.DataFrame:
+        self.rows.seek(0)
+        return pickle.load(self.rows)
+
+
+class AleMerge:
+    """
+    Collects ALE sources and streams them as one CSV or ALE. The spilled
+    rows are removed once the output has been produced.
+    """
+
+    def __init__(self, dedup: Optional[Deduplicator] = None):
+        self.dedup = dedup
+        self.columns: List[str] = []
+        self.sources: List[MergeSource] = []
+        self.delim: Optional[str] = None
+        self.headerdict: Optional[dict] = None
+        self._known = set()
+
+    def add(self, name: str, df: pd.DataFrame, delim: Optional[str] = None,
+            headerdict: Optional[dict] = None):
+        """
+        Registers a source from its parsed frame. Only the column names (and
+        the dedup keys) stay in memory, the rows are spilled to disk.
+        """
+        # Pickled to an unlinked file only this process can reach
+        rows = tempfile.TemporaryFile(dir=spool_dir())
+        try:
+            pickle.dump(df, rows, protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            rows.close()
+            raise
+        columns = list(df.columns)
+        for column in columns:
+            if column not in self._known:
+                self._known.add(column)
+                self.columns.append(column)
+        # The first ALE's header (FPS, VIDEO_FORMAT, ...) heads the merged ALE
+        if self.headerdict is None and headerdict is not None:
+            self.delim = delim
+            self.headerdict = headerdict
+        offset = self.dedup.observe(df) if self.dedup is not None else 0
+        self.sources.append(MergeSource(name, columns, rows, offset))
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def dedup_report(self) -> Optional[dict]:
+        if self.dedup is None:
+            return None
+        return self.dedup.report([source.name for source in self.sources])
+
+    def close(self):
+        for source in self.sources:
+            source.rows.close()
+
+    def frames(self) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Yields each source's rows aligned to the full column union.
+        """
+        for source in self.sources:
+            df = source.load()
+            if self.dedup is not None:
+                df = df[self.dedup.mask(df, source.offset)]
+            if list(df.columns) != self.columns:
+                df = df.reindex(columns=self.columns)
+            yield source.name, df
+
+    def iter_csv(self) -> Iterator[str]:
+        try:
+            yield pd.DataFrame(columns=self.columns).to_csv(index=False)
+            for _, df in self.frames():
+                yield from iter_dataframe_csv(df, header=False)
+        finally:
+            self.close()
+
+    def iter_ale(self) -> Iterator[str]:
+        try:
+            yield from ALE_Parser.ale_header_lines(self.delim, self.headerdict, self.columns)
+            for _, df in self.frames():
+                yield from iter_dataframe_csv(df, header=False, sep=self.delim, lineterminator="\n")
+        finally:
+            self.close()
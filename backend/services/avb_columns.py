@@ -0,0 +1,276 @@
+"""
+Column extractors for AVB bin exports.
+
+Each export column maps to a small function that reads just what it needs
+from a mob, so a Name + Mob ID export never touches tracks and a Tape export
+never serializes the mob. Values that several columns share (the source
+chain that leads to the tape, the primary track) are resolved at most once
+per mob by MobRow and only when a requested column asks for them.
+
+Source resolution follows the SourceClip of a mob's primary track (first
+picture track, else the first sound track, else the first track) through its
+file mob down to the tape/source mob carrying a Timecode track, adding up the
+clip offsets on the way.
+"""
+
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from services.timecode import frames_to_tc
+
+USER_PREFIX = "user:"
+MAX_SOURCE_DEPTH = 8
+
+_TRACK_LABELS = {
+    'picture': 'V',
+    'sound': 'A',
+    'timecode': 'TC',
+    'edgecode': 'EC',
+    'DescriptiveMetadata': 'D',
+}
+_TRACK_ORDER = ('V', 'A', 'TC', 'EC', 'D')
+
+
+class SourcePoint(NamedTuple):
+    mob: object
+    offset: int
+    edit_rate: float
+    timecode: object
+
+
+def _rate(component, default: float = 25.0) -> float:
+    try:
+        return float(component.edit_rate) or default
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+def _first_clip(component):
+    """
+    First non-filler component of a Sequence (or the component itself).
+    """
+    if component is None:
+        return None
+    if component.class_id == b'SEQU':
+        for item in component.components:
+            if item.class_id != b'FILL':
+                return item
+        return None
+    return component
+
+
+def _timecode_component(mob):
+    for track in mob.tracks:
+        if track.media_kind == 'timecode':
+            component = _first_clip(getattr(track, 'component', None))
+            if component is not None and component.class_id == b'TCCP':
+                return component
+    return None
+
+
+def primary_track(mob):
+    tracks = [track for track in mob.tracks if getattr(track, 'component', None) is not None]
+    for kind in ('picture', 'sound'):
+        for track in tracks:
+            if track.media_kind == kind:
+                return track
+    return tracks[0] if tracks else None
+
+
+def resolve_source(mob) -> Optional[SourcePoint]:
+    """
+    Walks SourceClips from `mob` to the deepest mob with a Timecode track
+    (normally the tape mob) and returns it with the offset reached, in that
+    mob's edit rate.
+    """
+    track = primary_track(mob)
+    if track is None:
+        return None
+    found = None
+    offset = 0
+    rate = _rate(track.component)
+    current = mob
+    for _ in range(MAX_SOURCE_DEPTH):
+        timecode = _timecode_component(current)
+        if timecode is not None:
+            found = SourcePoint(current, offset, rate, timecode)
+        clip = _first_clip(track.component)
+        if clip is None or clip.class_id != b'SCLP' or not clip.mob_id:
+            break
+        next_track = clip.track
+        if next_track is None:
+            break
+        offset += clip.start_time
+        current = clip.mob
+        track = next_track
+        next_rate = _rate(track.component, rate)
+        if next_rate != rate:
+            offset = round(offset * next_rate / rate)
+            rate = next_rate
+    return found
+
+
+def _format_tc(frames: int, rate: float, drop_frame: bool = False) -> str:
+    try:
+        return frames_to_tc(int(frames), rate, drop_frame)
+    except (KeyError, ValueError):
+        return str(frames)
+
+
+def _track_layout(mob) -> str:
+    indexes: Dict[str, List[int]] = {}
+    for track in mob.tracks:
+        label = _TRACK_LABELS.get(track.media_kind)
+        if label is None or 'index' not in track.property_data:
+            continue
+        indexes.setdefault(label, []).append(track.index)
+
+    parts = []
+    for label in _TRACK_ORDER:
+        numbers = sorted(set(indexes.get(label, ())))
+        ranges = []
+        for number in numbers:
+            if ranges and number == ranges[-1][1] + 1:
+                ranges[-1][1] = number
+            else:
+                ranges.append([number, number])
+        for low, high in ranges:
+            parts.append(f"{label}{low}" if low == high else f"{label}{low}-{high}")
+    return ' '.join(parts)
+
+
+def _user_attributes(mob) -> dict:
+    attributes = mob.attributes
+    if not attributes:
+        return {}
+    user = attributes.get('_USER')
+    return dict(user) if user else {}
+
+
+def _date(value) -> str:
+    return str(value) if value is not None else ''
+
+
+class MobRow:
+    """
+    Lazily computed values for one mob.
+    """
+
+    def __init__(self, mob):
+        self.mob = mob
+        self._source = None
+        self._source_done = False
+        self._user = None
+
+    @property
+    def source(self) -> Optional[SourcePoint]:
+        if not self._source_done:
+            self._source = resolve_source(self.mob)
+            self._source_done = True
+        return self._source
+
+    @property
+    def user(self) -> dict:
+        if self._user is None:
+            self._user = _user_attributes(self.mob)
+        return self._user
+
+
+def _tape(row: MobRow) -> str:
+    source = row.source
+    return (source.mob.name or '') if source is not None else ''
+
+
+def _start_tc(row: MobRow) -> str:
+    source = row.source
+    if source is None:
+        return ''
+    timecode = source.timecode
+    rate = _rate(timecode, source.edit_rate)
+    frames = timecode.start + round(source.offset * rate / source.edit_rate)
+    return _format_tc(frames, rate, bool(timecode.flags & 1))
+
+
+def _duration(row: MobRow) -> str:
+    track = primary_track(row.mob)
+    if track is None:
+        return ''
+    return _format_tc(track.component.length, _rate(track.component))
+
+
+def _length(row: MobRow):
+    track = primary_track(row.mob)
+    return track.component.length if track is not None else ''
+
+
+class Column(NamedTuple):
+    key: str
+    label: str
+    extract: Callable[[MobRow], object]
+
+
+COLUMNS: Dict[str, Column] = {column.key: column for column in (
+    Column('name', 'Name', lambda row: row.mob.name),
+    Column('mob_id', 'Mob ID', lambda row: str(row.mob.mob_id)),
+    Column('kind', 'Kind', lambda row: row.mob.mob_type),
+    Column('usage', 'Usage', lambda row: row.mob.usage or ''),
+    Column('tape', 'Tape', _tape),
+    Column('start_tc', 'Start', _start_tc),
+    Column('duration', 'Duration', _duration),
+    Column('length', 'Length', _length),
+    Column('tracks', 'Tracks', lambda row: _track_layout(row.mob)),
+    Column('edit_rate', 'Edit Rate', lambda row: _rate(row.mob)),
+    Column('creation_date', 'Creation Date', lambda row: _date(row.mob.creation_time)),
+    Column('modified_date', 'Modified Date', lambda row: _date(row.mob.last_modified)),
+    Column('user_attributes', 'User Attributes',
+           lambda row: json.dumps(row.user, ensure_ascii=False, default=str) if row.user else ''),
+)}
+
+DEFAULT_COLUMNS = ('name', 'mob_id')
+
+_ALIASES = {column.label.casefold(): column.key for column in COLUMNS.values()}
+
+
+def _user_column(name: str) -> Column:
+    return Column(USER_PREFIX + name, name, lambda row: row.user.get(name, ''))
+
+
+def parse_columns(spec: Optional[str]) -> List[Column]:
+    """
+    Resolves a comma separated column list. Columns may be given by key
+    ("start_tc") or label ("Start"), and "user:<Name>" selects a single user
+    attribute. Raises ValueError for unknown columns.
+    """
+    if not spec or not spec.strip():
+        return [COLUMNS[key] for key in DEFAULT_COLUMNS]
+    columns = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if item[:len(USER_PREFIX)].casefold() == USER_PREFIX:
+            name = item[len(USER_PREFIX):].strip()
+            if not name:
+                raise ValueError("User attribute column needs a name, e.g. user:Scene")
+            columns.append(_user_column(name))
+            continue
+        key = item.casefold()
+        key = key if key in COLUMNS else _ALIASES.get(key)
+        if key is None:
+            raise ValueError(f"Unknown column '{item}', expected one of {', '.join(COLUMNS)} or user:<Name>")
+        columns.append(COLUMNS[key])
+    if not columns:
+        raise ValueError("No columns selected")
+    return columns
+
+
+def iter_mob_rows(mobs: Iterable, columns: Sequence[Column], kind: Optional[str] = None) -> Iterator[list]:
+    """
+    Yields one row per mob with only the requested columns computed.
+    """
+    extractors = [column.extract for column in columns]
+    for mob in mobs:
+        if kind and mob.mob_type != kind:
+            continue
+        row = MobRow(mob)
+        yield [extract(row) for extract in extractors]
@@ -0,0 +1,156 @@
+"""
+Mob level diff between two versions of a bin.
+
+Each bin is reduced to a table of mob id -> (content digest, position, name,
+kind), where the digest is taken over the mob's serialized property data.
+Both tables are built in parallel on the process pool and kept in the parse
+cache, so diffing v2 against v3 after v1 against v2 only reads v3. Matching
+the tables by mob id is a single pass over each, and only mobs whose digests
+differ are read again and compared property by property to list the paths
+that changed.
+
+Paths are JSON pointers into the mob as /api/avb serializes it, for example
+"/tracks/0/component/length".
+"""
+
+import hashlib
+import io
+import json
+from typing import Dict, List, NamedTuple, Tuple
+
+import avb
+
+from services.avb_serializer import AvbSerializer, json_default
+from services.cache import MISSING, digest_stream, get_cache, make_key
+from services.process_pool import map_ordered
+
+MAX_PATHS = 100
+
+
+class MobDigest(NamedTuple):
+    digest: str
+    position: int
+    name: str
+    kind: str
+
+
+def _mob_value(mob):
+    # A fresh serializer per mob keeps $ref pointers relative to the mob
+    return AvbSerializer().convert(mob)
+
+
+def _digest(value) -> str:
+    text = json.dumps(value, sort_keys=True, separators=(',', ':'), default=json_default)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def digest_bin(raw_content: bytes) -> Dict[str, MobDigest]:
+    """
+    Builds the mob id -> MobDigest table of one bin. Runs inside a pool
+    worker, so it only takes and returns picklable values.
+    """
+    table = {}
+    with avb.open(io.BytesIO(raw_content)) as f:
+        for position, mob in enumerate(f.content.mobs):
+            table[str(mob.mob_id)] = MobDigest(_digest(_mob_value(mob)), position, mob.name, mob.mob_type)
+    return table
+
+
+def _pointer_part(part) -> str:
+    return str(part).replace('~', '~0').replace('/', '~1')
+
+
+def changed_paths(old, new, limit: int = MAX_PATHS) -> Tuple[List[str], bool]:
+    """
+    JSON pointers of the values that differ between two serialized mobs,
+    and whether the list was cut off at `limit`.
+    """
+    paths: List[str] = []
+    stack = [('', old, new)]
+    while stack:
+        path, a, b = stack.pop()
+        if isinstance(a, dict) and isinstance(b, dict):
+            keys = list(a)
+            keys.extend(key for key in b if key not in a)
+            for key in reversed(keys):
+                child = f"{path}/{_pointer_part(key)}"
+                if key not in a or key not in b:
+                    stack.append((child, a.get(key, MISSING), b.get(key, MISSING)))
+                elif a[key] != b[key]:
+                    stack.append((child, a[key], b[key]))
+        elif isinstance(a, list) and isinstance(b, list):
+            for index in reversed(range(max(len(a), len(b)))):
+                left = a[index] if index < len(a) else MISSING
+                right = b[index] if index < len(b) else MISSING
+                if left is MISSING or right is MISSING or left != right:
+                    stack.append((f"{path}/{index}", left, right))
+        elif a != b:
+            paths.append(path or '/')
+            if len(paths) >= limit:
+                return paths, bool(stack)
+    return paths, False
+
+
+def _entry(mob_id: str, mob: MobDigest) -> dict:
+    return {"mob_id": mob_id, "name": mob.name, "kind": mob.kind}
+
+
+def _digest_tables(streams) -> List[Dict[str, MobDigest]]:
+    cache = get_cache()
+    keys = [make_key("avb_mob_digests", avb.__version__, digest_stream(stream)) for stream in streams]
+    tables = [cache.get(key) for key in keys]
+    # Identical uploads are only digested once
+    missing = {keys[idx]: idx for idx, table in enumerate(tables) if table is MISSING}
+    outcomes = map_ordered(digest_bin, [(streams[idx].read(),) for idx in missing.values()])
+    computed = {}
+    for key, (table, error) in zip(missing, outcomes):
+        if error is not None:
+            raise error
+        cache.put(key, table)
+        computed[key] = table
+    return [computed[key] if table is MISSING else table for key, table in zip(keys, tables)]
+
+
+def diff_bins(old_stream, new_stream, max_paths: int = MAX_PATHS) -> dict:
+    """
+    Compares two bins (binary streams) by mob id and returns the added,
+    removed and changed mobs, the latter with their changed property paths.
+    """
+    old_table, new_table = _digest_tables([old_stream, new_stream])
+
+    added = [_entry(mob_id, mob) for mob_id, mob in new_table.items() if mob_id not in old_table]
+    removed = [_entry(mob_id, mob) for mob_id, mob in old_table.items() if mob_id not in new_table]
+    modified = [(mob_id, old_table[mob_id], mob) for mob_id, mob in new_table.items()
+                if mob_id in old_table and old_table[mob_id].digest != mob.digest]
+
+    changed = []
+    if modified:
+        old_stream.seek(0)
+        new_stream.seek(0)
+        with avb.open(old_stream) as old_file, avb.open(new_stream) as new_file:
+            old_items = old_file.content.items
+            new_items = new_file.content.items
+            for mob_id, old_mob, new_mob in modified:
+                paths, truncated = changed_paths(_mob_value(old_items[old_mob.position].mob),
+                                                 _mob_value(new_items[new_mob.position].mob), max_paths)
+                entry = _entry(mob_id, new_mob)
+                if old_mob.name != new_mob.name:
+                    entry["old_name"] = old_mob.name
+                entry["paths"] = paths
+                if truncated:
+                    entry["truncated"] = True
+                changed.append(entry)
+
+    return {
+        "summary": {
+            "old_mobs": len(old_table),
+            "new_mobs": len(new_table),
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+            "unchanged": len(new_table) - len(added) - len(changed),
+        },
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+    }
@@ -0,0 +1,232 @@
+"""
+Cross-bin mob index.
+
+Bins are parsed across the shared process pool into compact (mob id, name,
+kind, tape) entries, which are stored in a small SQLite database per index,
+so questions such as "which bins contain this master clip" are answered
+without reopening any bin. Every bin is recorded with the digest of the
+bytes it was indexed from: re-submitting an unchanged bin is a no-op, a
+changed bin replaces its own entries and nothing else. Per-bin entries also
+go through the parse cache, so the same bin content is only parsed once
+across indexes.
+
+Uploads are read and parsed in groups of a few bins per pool worker, so a
+batch of hundreds of bins never has to sit in memory at once.
+
+Configuration (environment):
+- AVB_INDEX_DIR: where index databases are stored (default: <tmp>/eatools-avb-index)
+"""
+
+import io
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from contextlib import closing, contextmanager
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import avb
+
+from services.avb_columns import COLUMNS, iter_mob_rows
+from services.avb_sessions import DEFAULT_PAGE_SIZE
+from services.cache import MISSING, digest_stream, get_cache, make_key
+from services.process_pool import configured_workers, map_ordered
+
+INDEX_NAME_REGEX = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+BINS_PER_WORKER = 2
+
+_ENTRY_COLUMNS = [COLUMNS[key] for key in ('mob_id', 'name', 'kind', 'tape')]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bins (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    digest TEXT NOT NULL,
+    mob_count INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mobs (
+    mob_id TEXT NOT NULL,
+    bin_id INTEGER NOT NULL REFERENCES bins(id) ON DELETE CASCADE,
+    name TEXT,
+    kind TEXT,
+    tape TEXT
+);
+CREATE INDEX IF NOT EXISTS mobs_mob_id ON mobs(mob_id);
+CREATE INDEX IF NOT EXISTS mobs_bin_id ON mobs(bin_id);
+CREATE INDEX IF NOT EXISTS mobs_tape ON mobs(tape COLLATE NOCASE);
+"""
+
+Entry = Tuple[str, str, str, str]
+
+
+def index_dir() -> str:
+    return os.getenv("AVB_INDEX_DIR") or os.path.join(tempfile.gettempdir(), "eatools-avb-index")
+
+
+def index_bin(raw_content: bytes) -> List[Entry]:
+    """
+    Reads the (mob id, name, kind, tape) entries of one bin. Runs inside a
+    pool worker, so it only takes and returns picklable values.
+    """
+    with avb.open(io.BytesIO(raw_content)) as f:
+        return [tuple(row) for row in iter_mob_rows(f.content.mobs, _ENTRY_COLUMNS)]
+
+
+def _cache_key(digest: str) -> str:
+    return make_key("avb_index_bin", avb.__version__, digest)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class AvbIndex:
+    """
+    One named index database.
+    """
+
+    def __init__(self, name: str):
+        if not INDEX_NAME_REGEX.match(name):
+            raise ValueError(f"Invalid index name '{name}', use letters, digits, '-' and '_'")
+        self.name = name
+        self.path = os.path.join(index_dir(), name + '.sqlite')
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(_SCHEMA)
+            with conn:
+                yield conn
+
+    def _digests(self) -> dict:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT name, digest FROM bins"))
+
+    def _store(self, bin_name: str, digest: str, entries: Sequence[Entry]) -> bool:
+        with self._connect() as conn:
+            existed = conn.execute("DELETE FROM bins WHERE name = ?", (bin_name,)).rowcount > 0
+            bin_id = conn.execute(
+                "INSERT INTO bins (name, digest, mob_count, indexed_at) VALUES (?, ?, ?, ?)",
+                (bin_name, digest, len(entries), time.time()),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO mobs (mob_id, bin_id, name, kind, tape) VALUES (?, ?, ?, ?, ?)",
+                [(mob_id, bin_id, name, kind, tape or None) for mob_id, name, kind, tape in entries],
+            )
+        return existed
+
+    def update(self, sources: Iterable[Tuple[str, object]]) -> List[dict]:
+        """
+        Indexes (bin name, binary stream) pairs and returns one status entry
+        per bin: added, updated, unchanged or error. Bins are parsed across
+        the process pool, a few per worker at a time.
+        """
+        cache = get_cache()
+        known = self._digests()
+        results: List[dict] = []
+        pending: List[Tuple[int, str, str, object]] = []
+
+        for bin_name, stream in sources:
+            digest = digest_stream(stream)
+            if known.get(bin_name) == digest:
+                results.append({"bin": bin_name, "status": "unchanged"})
+                continue
+            results.append({"bin": bin_name, "status": None})
+            pending.append((len(results) - 1, bin_name, digest, stream))
+
+        group_size = max(1, configured_workers() * BINS_PER_WORKER)
+        for start in range(0, len(pending), group_size):
+            group = pending[start:start + group_size]
+            entries = [cache.get(_cache_key(digest)) for _, _, digest, _ in group]
+            missing = [idx for idx, value in enumerate(entries) if value is MISSING]
+            outcomes = map_ordered(index_bin, [(group[idx][3].read(),) for idx in missing])
+            for idx, (value, error) in zip(missing, outcomes):
+                if error is not None:
+                    entries[idx] = error
+                else:
+                    cache.put(_cache_key(group[idx][2]), value)
+                    entries[idx] = value
+
+            for (position, bin_name, digest, _), value in zip(group, entries):
+                if isinstance(value, BaseException):
+                    results[position].update(status="error", error=str(value))
+                    continue
+                existed = self._store(bin_name, digest, value)
+                known[bin_name] = digest
+                results[position].update(status="updated" if existed else "added", mobs=len(value))
+        return results
+
+    def remove_bin(self, bin_name: str):
+        with self._connect() as conn:
+            if conn.execute("DELETE FROM bins WHERE name = ?", (bin_name,)).rowcount == 0:
+                raise KeyError(bin_name)
+
+    def delete(self):
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                if not suffix:
+                    raise KeyError(self.name)
+
+    def bins(self) -> List[dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT name, digest, mob_count, indexed_at FROM bins ORDER BY name").fetchall()
+        return [{"bin": name, "digest": digest, "mobs": mob_count, "indexed_at": indexed_at}
+                for name, digest, mob_count, indexed_at in rows]
+
+    def search(self, mob_ids: Optional[Sequence[str]] = None, query: Optional[str] = None,
+               tape: Optional[str] = None, kind: Optional[str] = None, bin_name: Optional[str] = None,
+               offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """
+        Finds mobs by id, name substring, tape, kind or bin and returns a
+        page of distinct mob ids, each with every bin it appears in.
+        """
+        clauses = []
+        params: list = []
+        if mob_ids:
+            clauses.append(f"m.mob_id IN ({', '.join('?' * len(mob_ids))})")
+            params.extend(mob_ids)
+        if query:
+            clauses.append("m.name LIKE ? ESCAPE '\\'")
+            params.append(f"%{_escape_like(query)}%")
+        if tape:
+            clauses.append("m.tape = ? COLLATE NOCASE")
+            params.append(tape)
+        if kind:
+            clauses.append("m.kind = ?")
+            params.append(kind)
+        if bin_name:
+            clauses.append("b.name = ?")
+            params.append(bin_name)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        matches = f"SELECT DISTINCT m.mob_id FROM mobs m JOIN bins b ON b.id = m.bin_id {where}"
+
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM ({matches})", params).fetchone()[0]
+            page = [row[0] for row in conn.execute(f"{matches} ORDER BY m.mob_id LIMIT ? OFFSET ?",
+                                                   params + [limit, offset])]
+            rows = conn.execute(
+                f"SELECT m.mob_id, m.name, m.kind, m.tape, b.name FROM mobs m JOIN bins b ON b.id = m.bin_id "
+                f"WHERE m.mob_id IN ({', '.join('?' * len(page))}) ORDER BY b.name",
+                page,
+            ).fetchall() if page else []
+
+        mobs = {mob_id: {"mob_id": mob_id, "names": [], "tapes": [], "bins": []} for mob_id in page}
+        for mob_id, name, kind_, tape_, bin_ in rows:
+            entry = mobs[mob_id]
+            entry["bins"].append({"bin": bin_, "name": name, "kind": kind_, "tape": tape_})
+            if name not in entry["names"]:
+                entry["names"].append(name)
+            if tape_ and tape_ not in entry["tapes"]:
+                entry["tapes"].append(tape_)
+        return {"index": self.name, "total": total, "offset": offset, "limit": limit,
+                "mobs": list(mobs.values())}
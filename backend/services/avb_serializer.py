@@ -0,0 +1,244 @@
+"""
+Serializer for pyavb object graphs.
+
+Values are converted through a per-type dispatch table (resolved once per
+class along its MRO) instead of an isinstance chain, bytes are hex encoded
+with bytes.hex(), and every AVB object is remembered by identity: the second
+time one is reached it is emitted as {"$ref": "<JSON pointer>"} pointing at
+its first occurrence, which also makes cycles safe. Depth and node limits
+cut off pathological graphs with {"$truncated": "depth"|"size"} markers.
+
+iter_json() streams the outer levels of a document as JSON text and only
+converts the values below `stream_depth` into Python objects (one mob at a
+time for a bin), so no whole-bin nested dict is ever built.
+
+Configuration (environment):
+- AVB_MAX_DEPTH: deepest nesting serialized (default 64)
+- AVB_MAX_NODES: objects, dicts and lists serialized per document, 0 for no limit (default 0)
+"""
+
+import uuid
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import avb
+from avb.core import AVBObject
+from avb.utils import AVBObjectRef
+from werkzeug.http import http_date
+
+from services.env import env_int
+from services.fast_json import dumps
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_DEPTH = 64
+
+
+def _pointer(path: Tuple) -> str:
+    return "#" + "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in path)
+
+
+def coalesce(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Joins many small text pieces into chunks of roughly `chunk_size`.
+    """
+    pending: List[str] = []
+    size = 0
+    for piece in pieces:
+        pending.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield ''.join(pending)
+
+
+def json_default(obj):
+    # Same datetime format as Flask's jsonify, anything else falls back to str()
+    if isinstance(obj, (datetime, date)):
+        return http_date(obj)
+    return str(obj)
+
+
+# Kinds a type can be dispatched to
+_LEAF, _DICT, _LIST, _HEX, _STR, _OBJECT, _REF, _UUID = range(1, 9)
+
+_KIND_BY_TYPE = {
+    str: _LEAF,
+    int: _LEAF,
+    float: _LEAF,
+    bool: _LEAF,
+    type(None): _LEAF,
+    datetime: _LEAF,
+    date: _LEAF,
+    dict: _DICT,
+    list: _LIST,
+    tuple: _LIST,
+    bytes: _HEX,
+    bytearray: _HEX,
+    memoryview: _HEX,
+    avb.mobid.MobID: _STR,
+    uuid.UUID: _STR,
+    AVBObjectRef: _REF,
+    AVBObject: _OBJECT,
+}
+
+
+# Resolved kind per concrete class, shared by all serializers
+_kinds: Dict[type, int] = dict(_KIND_BY_TYPE)
+
+
+def _resolve_kind(cls: type) -> int:
+    kind = _LEAF
+    for base in cls.__mro__:
+        if base in _KIND_BY_TYPE:
+            kind = _KIND_BY_TYPE[base]
+            break
+    else:
+        if hasattr(cls, 'property_data'):
+            kind = _OBJECT
+        elif hasattr(cls, 'uuid'):
+            kind = _UUID
+    _kinds[cls] = kind
+    return kind
+
+
+class AvbSerializer:
+    """
+    Converts pyavb objects into JSON compatible values.
+
+    One instance covers one output document: references always point into
+    the document produced by the same instance.
+    """
+
+    def __init__(self, max_depth: Optional[int] = None, max_nodes: Optional[int] = None, refs: bool = True):
+        self.max_depth = max_depth if max_depth is not None else env_int("AVB_MAX_DEPTH", DEFAULT_MAX_DEPTH)
+        self.max_nodes = max_nodes if max_nodes is not None else env_int("AVB_MAX_NODES", 0)
+        self.refs = refs
+        self.nodes = 0
+        self.truncated = False
+        # id -> (object, path); the object is kept alive so its id cannot be reused
+        self._seen: Dict[int, Tuple[Any, Tuple]] = {}
+
+    def _enter(self, obj, path: List) -> Optional[dict]:
+        """
+        Registers an AVB object, returning a $ref marker if it was seen before.
+        """
+        if not self.refs:
+            return None
+        seen = self._seen.get(id(obj))
+        if seen is not None:
+            return {"$ref": _pointer(seen[1])}
+        self._seen[id(obj)] = (obj, tuple(path))
+        return None
+
+    def _limit(self, depth: int) -> Optional[dict]:
+        # Only containers count towards the limits, scalars are cheap
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.truncated = True
+            return {"$truncated": "depth"}
+        if self.max_nodes and self.nodes > self.max_nodes:
+            self.truncated = True
+            return {"$truncated": "size"}
+        return None
+
+    def _expand(self, obj, path: List, depth: int):
+        """
+        Classifies a value as ('dict', items), ('list', values) or ('leaf', value).
+        """
+        kind = _kinds.get(type(obj)) or _resolve_kind(type(obj))
+        while kind == _REF:
+            obj = obj.value
+            kind = _kinds.get(type(obj)) or _resolve_kind(type(obj))
+        if kind == _LEAF:
+            return 'leaf', obj
+        if kind == _HEX:
+            return 'leaf', bytes(obj).hex()
+        if kind == _STR:
+            return 'leaf', str(obj)
+        if kind == _UUID:
+            return 'leaf', str(obj.uuid)
+        marker = self._limit(depth)
+        if marker is not None:
+            return 'leaf', marker
+        if kind == _DICT:
+            return 'dict', obj.items()
+        if kind == _LIST:
+            return 'list', obj
+        ref = self._enter(obj, path)
+        if ref is not None:
+            return 'leaf', ref
+        return 'dict', obj.property_data.items()
+
+    def _convert(self, obj, path: List, depth: int):
+        # Scalars are by far the most common values, so they skip _expand
+        if _kinds.get(type(obj)) == _LEAF:
+            return obj
+        shape, value = self._expand(obj, path, depth)
+        if shape == 'leaf':
+            return value
+        convert = self._convert
+        depth += 1
+        if shape == 'dict':
+            result = {}
+            for key, item in value:
+                path.append(key)
+                result[key] = convert(item, path, depth)
+                path.pop()
+            return result
+        result = []
+        for index, item in enumerate(value):
+            path.append(index)
+            result.append(convert(item, path, depth))
+            path.pop()
+        return result
+
+    def convert(self, obj, path: Tuple = ()) -> Any:
+        """
+        Converts `obj`, located at `path` within the output document.
+        """
+        return self._convert(obj, list(path), 0)
+
+    def _stream(self, obj, path: List, depth: int, stream_depth: int) -> Iterator[str]:
+        if depth >= stream_depth:
+            yield dumps(self._convert(obj, path, depth))
+            return
+        shape, value = self._expand(obj, path, depth)
+        if shape == 'leaf':
+            yield dumps(value)
+            return
+        if shape == 'dict':
+            yield '{'
+            for position, (key, item) in enumerate(value):
+                yield (',' if position else '') + dumps(str(key)) + ':'
+                path.append(key)
+                yield from self._stream(item, path, depth + 1, stream_depth)
+                path.pop()
+            yield '}'
+        else:
+            yield '['
+            for index, item in enumerate(value):
+                if index:
+                    yield ','
+                path.append(index)
+                yield from self._stream(item, path, depth + 1, stream_depth)
+                path.pop()
+            yield ']'
+
+    def iter_json(self, obj, path: Tuple = (), stream_depth: int = 2,
+                  chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+        """
+        Yields `obj` as JSON text in chunks of roughly `chunk_size`. The first
+        `stream_depth` levels are written incrementally, deeper values are
+        converted one at a time.
+        """
+        return coalesce(self._stream(obj, list(path), 0, stream_depth), chunk_size)
+
+
+def to_json_serializable(obj, max_depth: Optional[int] = None, max_nodes: Optional[int] = None) -> Any:
+    """
+    Converts a single pyavb value with a fresh serializer.
+    """
+    return AvbSerializer(max_depth, max_nodes).convert(obj)
@@ -0,0 +1,249 @@
+"""
+Browsing sessions for large AVB bins.
+
+An uploaded bin is stored once under its content digest, which doubles as
+the session id, so every gunicorn worker can reach it and re-uploading the
+same bin resumes the same session. Each worker keeps a few bins open in a
+small LRU. The lightweight mob index (position, name, mob id, kind) is built
+once per bin and shared through the parse cache. Full mob details are read
+and serialized one mob or one page at a time, under the session lock, so
+a bin is never closed (evicted or expired) while a request still reads it.
+
+Configuration (environment):
+- AVB_SESSION_DIR: where session bins are stored (default: <tmp>/eatools-avb-sessions)
+- AVB_SESSION_TTL: seconds a session is kept after its last use (default 3600);
+  expired sessions are removed when a session is opened or looked up
+- AVB_SESSION_OPEN: open bins kept per worker (default 4)
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import avb
+
+from services.avb_serializer import to_json_serializable
+from services.cache import get_cache, make_key
+from services.env import env_int
+
+SESSION_ID_REGEX = re.compile(r'^[0-9a-f]{40}$')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+COPY_CHUNK_SIZE = 1024 * 1024
+EXPIRE_INTERVAL = 60
+
+
+def session_dir() -> str:
+    return os.getenv("AVB_SESSION_DIR") or os.path.join(tempfile.gettempdir(), "eatools-avb-sessions")
+
+
+def _session_path(session_id: str) -> str:
+    if not SESSION_ID_REGEX.match(session_id):
+        raise KeyError(session_id)
+    return os.path.join(session_dir(), session_id + '.avb')
+
+
+def _build_index(avb_file) -> List[dict]:
+    return [
+        {
+            'index': position,
+            'name': mob.name,
+            'mob_id': str(mob.mob_id),
+            'kind': mob.mob_type,
+        }
+        for position, mob in enumerate(avb_file.content.mobs)
+    ]
+
+
+def clamp_page(offset, limit) -> tuple:
+    try:
+        offset = max(0, int(offset or 0))
+        limit = int(limit or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError("offset and limit must be integers")
+    return offset, min(max(1, limit), MAX_PAGE_SIZE)
+
+
+class AvbSession:
+    """
+    One open bin with its mob index.
+    """
+
+    def __init__(self, session_id: str, path: str):
+        self.session_id = session_id
+        self.path = path
+        self._file = avb.open(path)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        cache = get_cache()
+        key = make_key("avb_index", avb.__version__, session_id)
+        self.index: List[dict] = cache.get_or_compute(key, lambda: _build_index(self._file))
+        self._positions: Dict[str, int] = {entry['mob_id']: entry['index'] for entry in self.index}
+
+    def close(self):
+        # Waits for a reader still serializing from the file
+        with self._lock:
+            self._closed = True
+            self._file.close()
+
+    def search(self, query: Optional[str] = None, kind: Optional[str] = None) -> List[dict]:
+        entries = self.index
+        if query:
+            needle = query.casefold()
+            entries = [entry for entry in entries if needle in (entry['name'] or '').casefold()]
+        if kind:
+            entries = [entry for entry in entries if entry['kind'] == kind]
+        return entries
+
+    def find(self, mob_id: str) -> dict:
+        position = self._positions.get(mob_id)
+        if position is None:
+            raise KeyError(mob_id)
+        return self.index[position]
+
+    def details(self, position: int):
+        """
+        The serialized mob at `position`, raising KeyError(session_id) when
+        the session was closed in the meantime.
+        """
+        # pyavb reads objects lazily from the file handle, so the whole
+        # serialization has to happen before the lock is released
+        with self._lock:
+            if self._closed:
+                raise KeyError(self.session_id)
+            return to_json_serializable(self._file.content.items[position].mob)
+
+
+class SessionRegistry:
+    def __init__(self, max_open: int, ttl: int):
+        self.max_open = max(1, max_open)
+        self.ttl = ttl
+        self._open: 'OrderedDict[str, AvbSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_expiry = 0.0
+
+    def create(self, stream, digest: str) -> AvbSession:
+        """
+        Stores an uploaded bin under its digest (a no-op when it is already
+        there) and opens it.
+        """
+        directory = session_dir()
+        os.makedirs(directory, exist_ok=True)
+        self.expire()
+        path = _session_path(digest)
+        if not os.path.exists(path):
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    stream.seek(0)
+                    shutil.copyfileobj(stream, out, COPY_CHUNK_SIZE)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return self.get(digest)
+
+    def get(self, session_id: str) -> AvbSession:
+        """
+        Returns the open session, raising KeyError for unknown or expired ids.
+        A session whose bin is gone, e.g. expired by another worker, is
+        closed here as well.
+        """
+        path = _session_path(session_id)
+        self._expire_due()
+        try:
+            last_used = os.stat(path).st_mtime
+        except FileNotFoundError:
+            last_used = None
+        if last_used is None or last_used < time.time() - self.ttl:
+            self._close(session_id)
+            if last_used is not None:
+                self._remove(path)
+            raise KeyError(session_id)
+        with self._lock:
+            session = self._open.get(session_id)
+            if session is not None:
+                self._open.move_to_end(session_id)
+        if session is None:
+            session = AvbSession(session_id, path)
+            evicted = []
+            with self._lock:
+                self._open[session_id] = session
+                while len(self._open) > self.max_open:
+                    evicted.append(self._open.popitem(last=False)[1])
+            # Closing waits for in-flight readers, so not under the registry lock
+            for stale in evicted:
+                stale.close()
+        try:
+            os.utime(path)  # mtime is the last-use clock for expiry
+        except FileNotFoundError:
+            pass
+        return session
+
+    def _close(self, session_id: str):
+        with self._lock:
+            session = self._open.pop(session_id, None)
+        if session is not None:
+            session.close()
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def delete(self, session_id: str):
+        path = _session_path(session_id)
+        self._close(session_id)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            raise KeyError(session_id)
+
+    def expire(self):
+        directory = session_dir()
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(directory):
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith('.avb'):
+                self._close(entry.name[:-4])
+
+    def _expire_due(self):
+        # Lookups sweep the directory at most once per EXPIRE_INTERVAL
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_expiry:
+                return
+            self._next_expiry = now + EXPIRE_INTERVAL
+        try:
+            self.expire()
+        except FileNotFoundError:
+            pass
+
+
+_registry: Optional[SessionRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> SessionRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SessionRegistry(
+                max_open=env_int("AVB_SESSION_OPEN", 4),
+                ttl=env_int("AVB_SESSION_TTL", 3600),
+            )
+        return _registry
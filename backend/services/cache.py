@@ -0,0 +1,342 @@
+"""
+Content-addressed cache for parse results.
+
+Entries are keyed on a hash of the uploaded bytes, the parser version and
+any options that change the result. Values are pickled once and kept in a
+byte-bounded in-process LRU, backed by a size-capped directory on disk that
+all gunicorn workers share. Disk writes go through a temp file and
+os.replace so concurrent workers never see half-written entries.
+
+Entries are pickles, and unpickling runs code, so the disk tier is only used
+when its directory is private: created with mode 0700, a real directory
+(not a symlink), owned by the current user and not writable by group or
+others. Otherwise it is disabled with a warning and only the memory tier is
+used.
+
+Configuration (environment):
+- CACHE_DIR: on-disk tier location (default: <tmp>/eatools-cache)
+- CACHE_MAX_BYTES: on-disk size cap, 0 disables the disk tier (default 1 GB)
+- CACHE_MEMORY_BYTES: in-process LRU cap, 0 disables it (default 128 MB)
+- CACHE_RESPONSE_BYTES: largest streamed response body collected for the
+  cache; longer ones stream without being cached (default 16 MB)
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+from services.env import env_int
+
+MISSING = object()
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_RESPONSE_BYTES = 16 * 1024 ** 2
+
+
+def private_dir(path: str) -> bool:
+    """
+    Creates `path` as a 0700 directory if needed and reports whether it can
+    be trusted: a real directory owned by this user that no one else can
+    write to. Group or other read access is removed.
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+    except OSError as e:
+        print(f"Cache directory {path} is unusable: {e}")
+        return False
+    if not stat.S_ISDIR(st.st_mode):
+        print(f"Cache directory {path} is not a directory")
+        return False
+    if hasattr(os, 'geteuid') and st.st_uid != os.geteuid():
+        print(f"Cache directory {path} is owned by another user")
+        return False
+    if st.st_mode & 0o022:
+        # Others may already have planted entries
+        print(f"Cache directory {path} is writable by other users (mode {stat.S_IMODE(st.st_mode):o})")
+        return False
+    if st.st_mode & 0o077:
+        # Readable only, as created by earlier versions: nothing in it can be foreign
+        os.chmod(path, 0o700)
+    return True
+
+
+def digest_bytes(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def digest_stream(stream) -> str:
+    """
+    Hashes a seekable stream in chunks and rewinds it afterwards.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def make_key(namespace: str, version: str, digest: str, options: Optional[dict] = None) -> str:
+    options_part = json.dumps(options or {}, sort_keys=True, default=str)
+    material = f"{namespace}\0{version}\0{digest}\0{options_part}".encode('utf-8')
+    return hashlib.sha256(material).hexdigest()
+
+
+class BodyCollector:
+    """
+    Collects the chunks of a streamed response for the cache, and gives up
+    (dropping what it has) once they exceed `limit` characters, so caching
+    never holds more than that much of a response in memory.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.size = 0
+        self._chunks: Optional[List[str]] = [] if limit > 0 else None
+
+    def add(self, chunk: str):
+        if self._chunks is None:
+            return
+        self.size += len(chunk)
+        if self.size > self.limit:
+            self._chunks = None
+        else:
+            self._chunks.append(chunk)
+
+    def value(self) -> Optional[str]:
+        """
+        The whole body, or None when it outgrew the limit.
+        """
+        return None if self._chunks is None else ''.join(self._chunks)
+
+
+class ParseCache:
+    def __init__(self, directory: Optional[str], memory_bytes: int, disk_bytes: int,
+                 response_bytes: int = DEFAULT_RESPONSE_BYTES):
+        self.directory = directory if disk_bytes > 0 else None
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.response_bytes = response_bytes
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_used = 0
+        self._disk_used: Optional[int] = None
+        self._lock = threading.Lock()
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'errors': 0,
+        }
+        if self.directory and not private_dir(self.directory):
+            print("Disk cache disabled, only the memory tier is used")
+            self.directory = None
+
+    # --- memory tier -----------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+            return blob
+
+    def _memory_put(self, key: str, blob: bytes):
+        # Skip entries that would push out most of the cache on their own
+        if len(blob) > self.memory_bytes // 2:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= len(old)
+            self._memory[key] = blob
+            self._memory_used += len(blob)
+            while self._memory_used > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted)
+                self.counters['memory_evictions'] += 1
+
+    # --- disk tier -------------------------------------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+            os.utime(path)  # mtime doubles as the LRU clock
+            return blob
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Cache read failed for {path}: {e}")
+            self.counters['errors'] += 1
+            return None
+
+    def _disk_put(self, key: str, blob: bytes):
+        if len(blob) > self.disk_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Cache write failed for {path}: {e}")
+            self.counters['errors'] += 1
+            return
+
+        with self._lock:
+            if self._disk_used is None:
+                self._disk_used = self._scan_disk_usage()
+            else:
+                self._disk_used += len(blob)
+            over_budget = self._disk_used > self.disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _iter_disk_entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.pkl'):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, st.st_size, st.st_mtime
+
+    def _scan_disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._iter_disk_entries())
+
+    def _evict_disk(self):
+        # Other workers write to the same directory, so re-measure before evicting
+        entries = sorted(self._iter_disk_entries(), key=lambda e: e[2])
+        used = sum(size for _, size, _ in entries)
+        target = int(self.disk_bytes * 0.9)
+        for path, size, _ in entries:
+            if used <= target:
+                break
+            try:
+                os.remove(path)
+                self.counters['disk_evictions'] += 1
+            except FileNotFoundError:
+                pass
+            used -= size
+        with self._lock:
+            self._disk_used = used
+
+    # --- public API ------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        if self.memory_bytes > 0:
+            blob = self._memory_get(key)
+            if blob is not None:
+                self.counters['memory_hits'] += 1
+                return pickle.loads(blob)
+
+        if self.directory:
+            blob = self._disk_get(key)
+            if blob is not None:
+                try:
+                    value = pickle.loads(blob)
+                except Exception as e:
+                    print(f"Dropping unreadable cache entry {key}: {e}")
+                    self.counters['errors'] += 1
+                    self.discard(key)
+                else:
+                    self.counters['disk_hits'] += 1
+                    if self.memory_bytes > 0:
+                        self._memory_put(key, blob)
+                    return value
+
+        self.counters['misses'] += 1
+        return MISSING
+
+    def put(self, key: str, value: Any):
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"Value for cache key {key} is not picklable: {e}")
+            self.counters['errors'] += 1
+            return
+        self.counters['stores'] += 1
+        if self.memory_bytes > 0:
+            self._memory_put(key, blob)
+        if self.directory:
+            self._disk_put(key, blob)
+
+    def collector(self) -> BodyCollector:
+        """
+        A BodyCollector sized to the smaller of CACHE_RESPONSE_BYTES and the
+        largest entry a tier would store.
+        """
+        storable = max(self.memory_bytes // 2 if self.memory_bytes > 0 else 0,
+                       self.disk_bytes if self.directory else 0)
+        return BodyCollector(min(self.response_bytes, storable))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def discard(self, key: str):
+        with self._lock:
+            blob = self._memory.pop(key, None)
+            if blob is not None:
+                self._memory_used -= len(blob)
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            memory_entries = len(self._memory)
+            memory_used = self._memory_used
+        hits = self.counters['memory_hits'] + self.counters['disk_hits']
+        lookups = hits + self.counters['misses']
+        return {
+            **self.counters,
+            'hits': hits,
+            'hit_rate': round(hits / lookups, 4) if lookups else None,
+            'memory_entries': memory_entries,
+            'memory_bytes_used': memory_used,
+            'memory_bytes_limit': self.memory_bytes,
+            'disk_directory': self.directory,
+            'disk_bytes_used': self._disk_used,
+            'disk_bytes_limit': self.disk_bytes if self.directory else 0,
+        }
+
+
+_cache: Optional[ParseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ParseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ParseCache(
+                directory=os.getenv("CACHE_DIR") or os.path.join(tempfile.gettempdir(), "eatools-cache"),
+                memory_bytes=env_int("CACHE_MEMORY_BYTES", 128 * 1024 ** 2),
+                disk_bytes=env_int("CACHE_MAX_BYTES", 1024 ** 3),
+                response_bytes=env_int("CACHE_RESPONSE_BYTES", DEFAULT_RESPONSE_BYTES),
+            )
+        return _cache
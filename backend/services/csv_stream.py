@@ -0,0 +1,68 @@
+"""
+Chunked CSV output for download endpoints.
+
+Rows are written into a small reusable buffer that is flushed every
+CHUNK_SIZE characters, so a response starts going out after the first
+chunk and never holds more than one chunk of rendered CSV in memory.
+"""
+
+import csv
+import io
+from typing import Iterable, Iterator, Optional, Sequence
+
+import pandas as pd
+from flask import Response
+
+CHUNK_SIZE = 64 * 1024
+DATAFRAME_CHUNK_ROWS = 5000
+
+
+def _drain(buffer: io.StringIO) -> str:
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+def iter_csv(rows: Iterable[Sequence], header: Optional[Sequence] = None,
+             chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Renders rows with csv.writer and yields the output in chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield _drain(buffer)
+    if buffer.tell():
+        yield _drain(buffer)
+
+
+def iter_dataframe_csv(df: pd.DataFrame, header: bool = True,
+                       chunk_rows: int = DATAFRAME_CHUNK_ROWS, **to_csv_kwargs) -> Iterator[str]:
+    """
+    Renders a DataFrame slice by slice with DataFrame.to_csv, so each chunk
+    still goes through pandas' own writer.
+    """
+    to_csv_kwargs.setdefault('index', False)
+    if len(df) == 0:
+        if header:
+            yield df.to_csv(**to_csv_kwargs)
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(header=header and start == 0, **to_csv_kwargs)
+
+
+def csv_response(chunks: Iterable[str], filename: str, headers: Optional[dict] = None,
+                 mimetype: str = "text/csv") -> Response:
+    """
+    Wraps a chunk generator in a streamed attachment response.
+    """
+    response = Response(chunks, mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    for name, value in (headers or {}).items():
+        response.headers[name] = value
+    return response
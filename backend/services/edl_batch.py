@@ -0,0 +1,46 @@
+from typing import List, Tuple
+from models.event_table import EventTable
+from parsers import edl_parser
+from services.cache import MISSING, digest_bytes, get_cache, make_key
+from services.encoding import sniff_encoding
+from services.process_pool import map_ordered
+
+def parse_upload(filename: str, raw_content: bytes) -> EventTable:
+    """
+    Sniffs the encoding of and parses a single uploaded file. Runs inside a
+    pool worker, so it only takes and returns picklable values.
+    """
+    if filename.lower().endswith('.edl'):
+        return edl_parser.parse_table(raw_content, filename, encoding=sniff_encoding(raw_content))
+    # Future parsers will go here
+    return EventTable()
+
+def _cache_key(filename: str, raw_content: bytes) -> str:
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return make_key('edl', edl_parser.PARSER_VERSION, digest_bytes(raw_content), {'ext': extension})
+
+def parse_uploads(uploads: List[Tuple[str, bytes]]) -> Tuple[EventTable, List[dict]]:
+    """
+    Parses (filename, raw bytes) uploads across the process pool and merges
+    the results in upload order. Uploads seen before are served from the
+    parse cache and never reach the pool. Files that fail are reported in
+    the returned error list instead of aborting the batch.
+    """
+    cache = get_cache()
+    keys = [_cache_key(filename, raw_content) for filename, raw_content in uploads]
+    outcomes = [(cache.get(key), None) for key in keys]
+
+    pending = [idx for idx, (table, _) in enumerate(outcomes) if table is MISSING]
+    for idx, outcome in zip(pending, map_ordered(parse_upload, [uploads[idx] for idx in pending])):
+        outcomes[idx] = outcome
+        if outcome[1] is None:
+            cache.put(keys[idx], outcome[0])
+
+    all_events = EventTable()
+    errors = []
+    for (filename, _), (table, error) in zip(uploads, outcomes):
+        if error is not None:
+            errors.append({"file": filename, "error": str(error)})
+        else:
+            all_events.extend(table)
+    return all_events, errors
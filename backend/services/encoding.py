@@ -0,0 +1,150 @@
+"""
+Layered text encoding detection shared by EDL and ALE ingestion.
+
+Cheapest checks run first and only fall through when they cannot decide:
+1. byte order mark
+2. pure ASCII (C-speed bytes.isascii)
+3. memoized result for identical content
+4. strict UTF-8 validation
+5. chardet on a bounded sample around the first non-ASCII byte
+"""
+
+import codecs
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import chardet
+
+SAMPLE_SIZE = 64 * 1024
+CACHE_SIZE = 256
+FALLBACK_ENCODING = 'latin-1'
+
+# IANA charset labels for Python codec names that differ from them
+_CHARSET_LABELS = {
+    'ascii': 'us-ascii',
+    'utf-8-sig': 'utf-8',
+    'mac-roman': 'macintosh',
+    'euc_jp': 'euc-jp',
+    'euc_kr': 'euc-kr',
+    'cp932': 'windows-31j',
+    'cp949': 'ks_c_5601-1987',
+    'cp936': 'gbk',
+}
+
+# Longest BOMs first so UTF-32 LE is not mistaken for UTF-16 LE
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+_cache: 'OrderedDict[bytes, str]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _bom_encoding(raw: bytes) -> Optional[str]:
+    for bom, encoding in BOMS:
+        if raw.startswith(bom):
+            return encoding
+    return None
+
+
+def _first_non_ascii(raw: bytes) -> int:
+    # Binary search on isascii() keeps this in C for the common long ASCII prefix
+    lo, hi = 0, len(raw)
+    while hi - lo > 4096:
+        mid = (lo + hi) // 2
+        if raw[lo:mid].isascii():
+            lo = mid
+        else:
+            hi = mid
+    for idx in range(lo, hi):
+        if raw[idx] > 0x7F:
+            return idx
+    return hi
+
+
+def _sample(raw: bytes, sample_size: int) -> bytes:
+    if len(raw) <= sample_size:
+        return raw
+    # Start a little before the first non-ASCII byte so chardet sees context
+    start = max(0, _first_non_ascii(raw) - sample_size // 8)
+    return raw[start:start + sample_size]
+
+
+def _detect(raw: bytes, sample_size: int) -> str:
+    try:
+        raw.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    sample = _sample(raw, sample_size)
+    encoding = chardet.detect(sample)['encoding']
+    if not encoding or encoding.lower() == 'ascii':
+        return FALLBACK_ENCODING
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return FALLBACK_ENCODING
+    return encoding.lower()
+
+
+def sniff_encoding(raw: bytes, sample_size: int = SAMPLE_SIZE) -> str:
+    """
+    Returns a Python codec name for the given bytes.
+    """
+    encoding = _bom_encoding(raw)
+    if encoding:
+        return encoding
+    if raw.isascii():
+        return 'ascii'
+
+    key = hashlib.blake2b(raw, digest_size=16).digest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    encoding = _detect(raw, sample_size)
+
+    with _cache_lock:
+        _cache[key] = encoding
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return encoding
+
+
+def decode(raw: bytes) -> str:
+    """
+    Decodes bytes with the sniffed encoding, replacing anything that still
+    does not fit rather than failing the upload.
+    """
+    encoding = sniff_encoding(raw)
+    try:
+        return raw.decode(encoding)
+    except UnicodeDecodeError:
+        return raw.decode(encoding, errors='replace')
+
+
+def charset_label(encoding: str) -> str:
+    """
+    The IANA charset label for a Python codec name, e.g. 'utf_8' becomes
+    'utf-8', 'latin_1' 'iso-8859-1' and 'cp1252' 'windows-1252', for use in
+    a Content-Type header.
+    """
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return encoding
+    if name in _CHARSET_LABELS:
+        return _CHARSET_LABELS[name]
+    if name.startswith('iso8859-'):
+        return 'iso-8859-' + name[len('iso8859-'):]
+    if name.startswith('cp125') and len(name) == 6:
+        return 'windows-' + name[2:]
+    return name
@@ -0,0 +1,24 @@
+"""
+Environment variable helpers for the services' settings.
+"""
+
+import os
+from typing import Optional
+
+
+def env_int(name: str, default: int, minimum: Optional[int] = None) -> int:
+    """
+    Reads an integer setting, falling back to `default` when it is unset,
+    empty or not an integer. Values below `minimum` are raised to it.
+    """
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        print(f"Ignoring invalid {name} value: {value}")
+        return default
+    if minimum is not None and number < minimum:
+        return minimum
+    return number
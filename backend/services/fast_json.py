@@ -0,0 +1,154 @@
+"""
+JSON serialization for API responses.
+
+orjson is used when it is installed and the stdlib json module otherwise,
+behind the same few functions. orjson writes dataclasses, UUIDs and numpy
+arrays natively and is several times faster than json on the large nested
+structures the AVB and MXF endpoints return. Output matches what Flask's
+jsonify produced before: keys are sorted where jsonify sorted them,
+datetimes use the HTTP date format and unknown objects fall back to str().
+
+Dataclass instances such as Event are written field by field without an
+intermediate to_dict() copy (json: a shallow field mapping instead of the
+deep copy dataclasses.asdict makes). FastJSONProvider plugs the encoder into
+Flask, so every jsonify() call goes through it, and iter_json_array() /
+json_array_response() stream long lists in batches instead of building one
+large string.
+
+Configuration (environment):
+- JSON_ENCODER: orjson or json (default: orjson when installed)
+"""
+
+import dataclasses
+import json
+import os
+from array import array
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ARRAY_BATCH = 1000
+
+_fields_by_type: Dict[type, Tuple[str, ...]] = {}
+
+
+def _encoder_name() -> str:
+    requested = os.getenv("JSON_ENCODER")
+    if requested not in (None, "", "orjson", "json"):
+        print(f"Ignoring invalid JSON_ENCODER value: {requested}")
+        requested = None
+    if requested == "json" or orjson is None:
+        return "json"
+    return "orjson"
+
+
+ENCODER = _encoder_name()
+
+
+def _dataclass_fields(obj) -> Tuple[str, ...]:
+    names = _fields_by_type.get(type(obj))
+    if names is None:
+        names = _fields_by_type[type(obj)] = tuple(f.name for f in dataclasses.fields(obj))
+    return names
+
+
+def json_default(obj):
+    """
+    Fallback for values neither encoder handles natively.
+    """
+    if isinstance(obj, (datetime, date)):
+        # Same format as Flask's jsonify
+        return http_date(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {name: getattr(obj, name) for name in _dataclass_fields(obj)}
+    if isinstance(obj, array):
+        return obj.tolist()
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if hasattr(obj, 'tolist'):
+        # numpy scalars and arrays
+        return obj.tolist()
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    return str(obj)
+
+
+if ENCODER == "orjson":
+    _BASE_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(value: Any, sort_keys: bool = False) -> bytes:
+        options = _BASE_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _BASE_OPTIONS
+        try:
+            return orjson.dumps(value, default=json_default, option=options)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and the like, which json still handles
+            return json.dumps(value, default=json_default, sort_keys=sort_keys,
+                              separators=(',', ':')).encode('utf-8')
+
+    def dumps(value: Any, sort_keys: bool = False) -> str:
+        return dumps_bytes(value, sort_keys).decode('utf-8')
+
+    loads: Callable[[Any], Any] = orjson.loads
+
+else:
+    def dumps(value: Any, sort_keys: bool = False) -> str:
+        return json.dumps(value, default=json_default, sort_keys=sort_keys, separators=(',', ':'))
+
+    def dumps_bytes(value: Any, sort_keys: bool = False) -> bytes:
+        return dumps(value, sort_keys).encode('utf-8')
+
+    loads = json.loads
+
+
+def iter_json_array(items: Iterable, sort_keys: bool = False, batch_size: int = ARRAY_BATCH) -> Iterator[bytes]:
+    """
+    Encodes an iterable as a JSON array, `batch_size` items per chunk, so a
+    long list is never held as one encoded string.
+    """
+    yield b'['
+    batch = []
+    first = True
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield (b'' if first else b',') + dumps_bytes(batch, sort_keys)[1:-1]
+            first = False
+            batch = []
+    if batch:
+        yield (b'' if first else b',') + dumps_bytes(batch, sort_keys)[1:-1]
+    yield b']'
+
+
+def json_array_response(items: Iterable, sort_keys: bool = True, status: int = 200,
+                        headers: Optional[dict] = None) -> Response:
+    """
+    Streams an iterable as a JSON array response, sorting keys like jsonify.
+    """
+    return Response(iter_json_array(items, sort_keys), status=status, headers=headers,
+                    mimetype="application/json")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by this module, set as app.json so jsonify()
+    and request.get_json() use it.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj, kwargs.get("sort_keys", self.sort_keys))
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, self.sort_keys) + b'\n', mimetype=self.mimetype)
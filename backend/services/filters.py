@@ -1,41 +1,48 @@
-from typing import List
+from typing import Callable, List
 from models.event import Event
 
+Reject = Callable[[dict], bool]
+
+def _is_audio_only(row: dict) -> bool:
+    track_type = row.get('track_type')
+    return bool(track_type) and 'A' in track_type and 'V' not in track_type
+
+def _is_missing_reel(row: dict) -> bool:
+    return row.get('reel') in ('', 'AX', None)
+
+def _is_missing_name(row: dict) -> bool:
+    return not row.get('clip_name')
+
+def _is_black(row: dict) -> bool:
+    return row.get('reel') in ('BL', 'BLK')
+
+def _is_avid_temp(row: dict) -> bool:
+    clip_name = row.get('clip_name') or ''
+    source_file = row.get('source_file') or ''
+    return '.NEW.' in clip_name or '.NEW.' in source_file
+
+def compile_filters(options: dict) -> List[Reject]:
+    """
+    Reads the filter options once and returns the predicates that are
+    switched on. Each predicate takes an event row and returns True if the
+    event should be dropped.
+    """
+    rejects = []
+    if options.get('ignoreAudio', False):
+        rejects.append(_is_audio_only)
+    if options.get('ignoreMissingReel', False):
+        rejects.append(_is_missing_reel)
+    if options.get('ignoreMissingName', False):
+        rejects.append(_is_missing_name)
+    if options.get('ignoreBlack', False):
+        rejects.append(_is_black)
+    if options.get('ignoreAvidTemp', False):
+        rejects.append(_is_avid_temp)
+    return rejects
+
 def apply_filters(events: List[Event], options: dict) -> List[Event]:
     """
     Applies filtering to a list of events based on the provided options.
     """
-    filtered = []
-    
-    ignore_audio = options.get('ignoreAudio', False)
-    ignore_missing_reel = options.get('ignoreMissingReel', False)
-    ignore_missing_name = options.get('ignoreMissingName', False)
-    ignore_black = options.get('ignoreBlack', False)
-    ignore_avid_temp = options.get('ignoreAvidTemp', False)
-
-    for event in events:
-        if ignore_audio:
-            if event.track_type and 'A' in event.track_type and 'V' not in event.track_type:
-                continue
-                
-        if ignore_missing_reel:
-            if event.reel in ('', 'AX', None):
-                continue
-                
-        if ignore_missing_name:
-            if not event.clip_name:
-                continue
-                
-        if ignore_black:
-            if event.reel in ('BL', 'BLK'):
-                continue
-                
-        if ignore_avid_temp:
-            clip_name = event.clip_name or ''
-            source_file = getattr(event, 'source_file', '') or ''
-            if '.NEW.' in clip_name or '.NEW.' in source_file:
-                continue
-                
-        filtered.append(event)
-        
-    return filtered
+    rejects = compile_filters(options)
+    return [event for event in events if not any(reject(vars(event)) for reject in rejects)]
@@ -0,0 +1,362 @@
+"""
+Background jobs for long running requests.
+
+Heavy endpoints (full AVB dumps, bin diffs, ALE batch conversions and
+merges) accept background=true: the uploads are saved into the job's
+directory and the request returns a job id at once, so a few large jobs no
+longer hold every gunicorn sync worker while the frontend and interactive
+endpoints wait. The work itself runs on the shared process pool
+(services.process_pool), not on a thread of the worker handling requests;
+a small per-worker thread pool only limits how many jobs each worker has
+running and waits for them.
+
+Each job is a directory in JOBS_DIR holding its state.json, its inputs, the
+finished result and, once requested, a cancel marker, so the pool process
+running a job and any gunicorn worker can report progress, cancel or serve
+the result of a job queued by another. Cancelling is cooperative: a queued
+job never starts and a running job stops at its next progress report or
+output chunk. A job whose worker process has gone away is reported as
+failed. Inputs are removed when a job ends, finished jobs JOB_TTL seconds
+after they end.
+
+Configuration (environment):
+- JOBS_DIR: where job state, inputs and results are kept (default: <tmp>/eatools-jobs)
+- JOB_WORKERS: jobs run at once per gunicorn worker (default 1)
+- JOB_TTL: seconds finished jobs and their results are kept (default 3600)
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from services import process_pool
+from services.env import env_int
+from services.fast_json import dumps_bytes
+
+JOB_ID_REGEX = re.compile(r'^[0-9a-f]{32}$')
+FINISHED = ('done', 'failed', 'cancelled')
+PROGRESS_INTERVAL = 0.5
+CANCEL_CHECK_INTERVAL = 0.2
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def jobs_dir() -> str:
+    return os.getenv("JOBS_DIR") or os.path.join(tempfile.gettempdir(), "eatools-jobs")
+
+
+def _job_dir(job_id: str) -> str:
+    if not JOB_ID_REGEX.match(job_id):
+        raise KeyError(job_id)
+    return os.path.join(jobs_dir(), job_id)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobResult(NamedTuple):
+    """
+    What a job produces: the response body as str or bytes chunks, plus how
+    to serve it. With a filename it is served as an attachment.
+    """
+    chunks: Iterable
+    mimetype: str = "application/json"
+    filename: Optional[str] = None
+    headers: Optional[Dict[str, str]] = None
+
+
+def json_result(value) -> JobResult:
+    # Sorted keys, like the jsonify() response the same work gives inline
+    return JobResult([dumps_bytes(value, sort_keys=True)])
+
+
+class JobContext:
+    """
+    Progress reporting for work that may run as a job. The base class is
+    used when the same work runs inline in a request, where it does nothing.
+    """
+
+    def progress(self, stage: str, done: Optional[int] = None, total: Optional[int] = None):
+        pass
+
+    def check(self):
+        pass
+
+
+INLINE = JobContext()
+
+
+class Job(JobContext):
+    def __init__(self, job_id: str, directory: str):
+        self.id = job_id
+        self.directory = directory
+        self._stage = None
+        self._reported = 0.0
+        self._checked = 0.0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def read_state(self) -> dict:
+        with open(self._path('state.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def write_state(self, **changes) -> dict:
+        state = self.read_state()
+        state.update(changes)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            json.dump(state, out)
+        os.replace(tmp_path, self._path('state.json'))
+        return state
+
+    def save_inputs(self, streams: Sequence[IO[bytes]]):
+        for index, stream in enumerate(streams):
+            stream.seek(0)
+            with open(self._path(f'input-{index}'), 'wb') as out:
+                shutil.copyfileobj(stream, out, COPY_CHUNK_SIZE)
+
+    def open_inputs(self, count: int) -> List[IO[bytes]]:
+        inputs = []
+        try:
+            for index in range(count):
+                inputs.append(open(self._path(f'input-{index}'), 'rb'))
+        except BaseException:
+            for stream in inputs:
+                stream.close()
+            raise
+        return inputs
+
+    def remove_inputs(self):
+        try:
+            entries = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in entries:
+            if name.startswith('input-'):
+                os.remove(self._path(name))
+
+    def cancel_requested(self) -> bool:
+        return os.path.exists(self._path('cancel'))
+
+    def check(self):
+        now = time.monotonic()
+        if now - self._checked < CANCEL_CHECK_INTERVAL:
+            return
+        self._checked = now
+        if self.cancel_requested():
+            raise JobCancelled(self.id)
+
+    def progress(self, stage: str, done: Optional[int] = None, total: Optional[int] = None):
+        """
+        Records the current stage and, optionally, how far into it the job
+        is. Writes are throttled, except when the stage changes. Raises
+        JobCancelled once the job has been cancelled.
+        """
+        self.check()
+        now = time.monotonic()
+        if stage == self._stage and now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._stage = stage
+        self._reported = now
+        self.write_state(stage=stage, done=done, total=total)
+
+
+def run_job(job: Job, work: Callable[..., JobResult], args: Sequence, input_count: int):
+    """
+    Runs work(job, inputs, *args) to its end and records the outcome and
+    result in the job's directory. Runs on a pool worker, so it only takes
+    picklable values.
+    """
+    result_path = job._path('result')
+    part_path = result_path + '.part'
+    chunks = None
+    inputs: List[IO[bytes]] = []
+    try:
+        if job.cancel_requested():
+            raise JobCancelled(job.id)
+        job.write_state(status="running", started=time.time())
+        inputs = job.open_inputs(input_count)
+        result = work(job, inputs, *args)
+        chunks = result.chunks
+        with open(part_path, 'wb') as out:
+            for chunk in chunks:
+                job.check()
+                out.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        os.replace(part_path, result_path)
+        job.write_state(status="done", stage=None, done=None, total=None, finished=time.time(), result={
+            "mimetype": result.mimetype,
+            "filename": result.filename,
+            "headers": result.headers or {},
+            "size": os.path.getsize(result_path),
+        })
+    except JobCancelled:
+        job.write_state(status="cancelled", finished=time.time())
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        job.write_state(status="failed", error=str(e), finished=time.time())
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        for stream in inputs:
+            stream.close()
+
+
+class JobQueue:
+    def __init__(self, max_workers: int, ttl: int):
+        self.max_workers = max(1, max_workers)
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, work: Callable[..., JobResult], args: Sequence = (),
+               streams: Sequence[IO[bytes]] = ()) -> dict:
+        """
+        Queues work(job, inputs, *args) and returns the new job's state. The
+        `streams`, typically detached uploads, are saved into the job's
+        directory and closed; the job gets them back as open files, `inputs`,
+        in the same order. The work runs on the process pool, so `work` must
+        be a module level function and `args` picklable.
+        """
+        try:
+            directory = jobs_dir()
+            os.makedirs(directory, exist_ok=True)
+            self.expire()
+            job_id = uuid.uuid4().hex
+            job = Job(job_id, os.path.join(directory, job_id))
+            os.makedirs(job.directory)
+            with open(job._path('state.json'), 'w', encoding='utf-8') as out:
+                json.dump({
+                    "job_id": job_id,
+                    "kind": kind,
+                    "status": "queued",
+                    "stage": None,
+                    "done": None,
+                    "total": None,
+                    "error": None,
+                    "created": time.time(),
+                    "started": None,
+                    "finished": None,
+                    "pid": os.getpid(),
+                }, out)
+            job.save_inputs(streams)
+        finally:
+            for stream in streams:
+                stream.close()
+
+        with self._lock:
+            self._futures[job_id] = self._executor.submit(self._run, job, work, args, len(streams))
+        return self._public(job.read_state())
+
+    def _run(self, job: Job, work: Callable[..., JobResult], args: Sequence, input_count: int):
+        try:
+            process_pool.call(run_job, job, work, args, input_count)
+        except Exception as e:
+            # The pool worker died (e.g. OOM killed) or the job could not be handed to it
+            import traceback
+            traceback.print_exc()
+            job.write_state(status="failed", error=str(e) or type(e).__name__, finished=time.time())
+        finally:
+            job.remove_inputs()
+            with self._lock:
+                self._futures.pop(job.id, None)
+
+    @staticmethod
+    def _public(state: dict) -> dict:
+        return {key: value for key, value in state.items() if key != "pid"}
+
+    def _load(self, job_id: str) -> Tuple[Job, dict]:
+        job = Job(job_id, _job_dir(job_id))
+        try:
+            state = job.read_state()
+        except FileNotFoundError:
+            raise KeyError(job_id)
+        if state["status"] not in FINISHED and not _pid_alive(state["pid"]):
+            state = job.write_state(status="failed", error="The worker running this job exited",
+                                    finished=time.time())
+        return job, state
+
+    def state(self, job_id: str) -> dict:
+        """
+        Returns the job's state, raising KeyError for unknown or expired ids.
+        """
+        return self._public(self._load(job_id)[1])
+
+    def cancel(self, job_id: str) -> dict:
+        """
+        Cancels a queued or running job, or discards a finished one together
+        with its result. Returns the last known state.
+        """
+        job, state = self._load(job_id)
+        if state["status"] in FINISHED:
+            shutil.rmtree(job.directory, ignore_errors=True)
+            return self._public({**state, "discarded": True})
+        open(job._path('cancel'), 'a').close()
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            # Never started, so _run will not clean up after it
+            with self._lock:
+                self._futures.pop(job_id, None)
+            state = job.write_state(status="cancelled", finished=time.time())
+            job.remove_inputs()
+        return self._public(state)
+
+    def result(self, job_id: str) -> Tuple[str, dict]:
+        """
+        Returns the result path and the job's state. Raises KeyError for
+        unknown ids and ValueError while the job has no result.
+        """
+        job, state = self._load(job_id)
+        if state["status"] != "done":
+            raise ValueError(f"Job is {state['status']}")
+        return job._path('result'), self._public(state)
+
+    def expire(self):
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(jobs_dir()):
+            if not entry.is_dir() or not JOB_ID_REGEX.match(entry.name):
+                continue
+            try:
+                with open(os.path.join(entry.path, 'state.json'), encoding='utf-8') as f:
+                    state = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+            if state["status"] in FINISHED and (state["finished"] or 0) < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(
+                max_workers=env_int("JOB_WORKERS", 1),
+                ttl=env_int("JOB_TTL", 3600),
+            )
+        return _queue
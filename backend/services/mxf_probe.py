@@ -0,0 +1,490 @@
+"""
+Managed ffprobe execution for the MXF Inspector.
+
+Probes run on a small per-worker thread pool, so at most
+MXF_PROBE_CONCURRENCY ffprobe processes run at once in each gunicorn worker
+and a batch of files is probed concurrently instead of one after another.
+Every probe has a timeout: an overrunning ffprobe is killed together with its
+process group and reported as a failed probe, so a stuck file can no longer
+hold a gunicorn worker indefinitely. A batch shares one deadline as well:
+whatever is still queued or running when MXF_BATCH_TIMEOUT runs out is
+cancelled or killed and reported as a timed out file, so a batch of stuck
+files answers inside the worker timeout. Each upload is turned into a local path
+inside its pool task, so a large batch never materializes more than
+MXF_PROBE_CONCURRENCY copies at a time.
+
+Before any of that, the native KLV reader in parsers.mxf_klv tries the file
+inline: it only walks the header metadata of the memory mapped upload, so a
+well formed OP1a file is answered in about a millisecond without starting
+a process. Files it cannot fully identify (unknown
+codecs, damaged partitions) fall back to ffprobe. The engine can be forced
+per request with "native" (never run ffprobe) or "ffprobe" (skip the native
+reader).
+
+Finished inspector responses are kept in the parse cache (and so on disk)
+under a cheap fingerprint instead of a hash of the whole file: the size plus
+SHA-256 digests of the first and last FINGERPRINT_CHUNK bytes, with the
+ffprobe version and native reader version in the key. Header and footer
+partitions carry the package UIDs and index tables, so in practice two
+different MXF files do not share a fingerprint. A hit skips the probe and
+the formatting pass; clients can ask for one with the fingerprint alone,
+before uploading anything.
+
+Configuration (environment):
+- FFPROBE_PATH: ffprobe binary (default: ffprobe on PATH)
+- MXF_PROBE_CONCURRENCY: ffprobe processes per worker (default 4)
+- MXF_PROBE_TIMEOUT: seconds before a probe is killed (default 20, inside gunicorn's 30 s worker timeout)
+- MXF_BATCH_TIMEOUT: seconds for all probes of one request together (default 25)
+- MXF_PROBE_ENGINE: auto, native or ffprobe (default auto)
+- MXF_PARTIAL_MAX_SIZE: largest total file size accepted for head/tail uploads (default 4 TB)
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, List, Optional, Sequence, Tuple
+
+from parsers import mxf_klv
+from services.cache import MISSING, get_cache, make_key
+from services.env import env_int
+from services.fast_json import loads
+from services.mxf_summary import summarize
+from services.uploads import LocalPath, local_path, raw_file, sparse_file, stream_size
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 20
+DEFAULT_BATCH_TIMEOUT = 25
+DEFAULT_PARTIAL_MAX_SIZE = 4 * 1024 ** 4
+ENGINES = ('auto', 'native', 'ffprobe')
+FINGERPRINT_CHUNK = 1024 * 1024
+FINGERPRINT_REGEX = re.compile(r'^[0-9]+-[0-9a-f]{64}-[0-9a-f]{64}$')
+
+Outcome = Tuple[Any, Optional[BaseException]]
+
+_NOT_FOUND_DETAILS = ("ffprobe is part of FFmpeg. Please install FFmpeg or set the FFPROBE_PATH environment "
+                      "variable to the absolute path of the ffprobe executable.")
+
+
+class ProbeError(Exception):
+    """
+    A failed probe, carrying the error/details pair returned to the client.
+    """
+    status = 500
+
+    def __init__(self, error: str, details: Optional[str] = None):
+        super().__init__(error)
+        self.error = error
+        self.details = details
+
+    def to_dict(self) -> dict:
+        result = {"error": self.error}
+        if self.details:
+            result["details"] = self.details
+        return result
+
+
+class ProbeTimeout(ProbeError):
+    status = 504
+
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """
+    Validates a requested probe engine, falling back to MXF_PROBE_ENGINE.
+    Raises ValueError for unknown names.
+    """
+    if not engine:
+        engine = os.getenv("MXF_PROBE_ENGINE") or 'auto'
+        if engine not in ENGINES:
+            print(f"Ignoring invalid MXF_PROBE_ENGINE value: {engine}")
+            engine = 'auto'
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown probe engine '{engine}', use one of: {', '.join(ENGINES)}")
+    return engine
+
+
+def ffprobe_path() -> str:
+    # Works for both Mac dev and Linux containers
+    path = os.getenv("FFPROBE_PATH")
+    if not path:
+        path = shutil.which("ffprobe")
+        if not path:
+            # Fallback to Mac homebrew path for local development
+            path = "/opt/homebrew/bin/ffprobe" if os.path.exists("/opt/homebrew/bin/ffprobe") else "ffprobe"
+    return path
+
+
+def _kill(proc: subprocess.Popen):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        proc.kill()
+
+
+def run_ffprobe(path: str, pass_fds: Sequence[int] = (), timeout: Optional[float] = None,
+                on_start: Optional[Callable[[subprocess.Popen], bool]] = None) -> dict:
+    """
+    Runs ffprobe on `path` and returns its parsed JSON output. Raises
+    ProbeTimeout (after killing the process) if it does not finish within
+    `timeout` seconds, ProbeError for any other failure. `on_start` is
+    handed the running process; when it returns False the probe was
+    aborted meanwhile and the process is killed at once.
+    """
+    ffprobe_cmd = [
+        ffprobe_path(),
+        "-v", "quiet",
+        "-print_format", "json",
+        "-show_format",
+        "-show_streams",
+        path
+    ]
+    try:
+        # A session of its own lets a timeout kill anything ffprobe started
+        proc = subprocess.Popen(ffprobe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                pass_fds=tuple(pass_fds), start_new_session=True)
+    except FileNotFoundError:
+        raise ProbeError("ffprobe not found", _NOT_FOUND_DETAILS)
+
+    if on_start is not None and not on_start(proc):
+        _kill(proc)
+        proc.communicate()
+        raise ProbeTimeout("ffprobe timed out", "The probe was aborted")
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill(proc)
+        proc.communicate()
+        raise ProbeTimeout("ffprobe timed out", f"No result after {timeout} s, the probe was killed")
+    except BaseException:
+        _kill(proc)
+        proc.wait()
+        raise
+
+    if proc.returncode != 0:
+        raise ProbeError("ffprobe command failed", stderr)
+    try:
+        return loads(stdout)
+    except json.JSONDecodeError:
+        raise ProbeError("ffprobe returned invalid JSON", stdout[:1000])
+
+
+class ProbeTask:
+    """
+    A queued or running probe: its future plus a way to abort it, which
+    cancels it while queued and kills its ffprobe once started.
+    """
+
+    def __init__(self):
+        self.future: Optional['Future[dict]'] = None
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._aborted = False
+
+    def result(self, timeout: Optional[float] = None) -> dict:
+        return self.future.result(timeout)
+
+    def started(self, proc: subprocess.Popen) -> bool:
+        with self._lock:
+            if self._aborted:
+                return False
+            self._proc = proc
+            return True
+
+    def abort(self):
+        with self._lock:
+            self._aborted = True
+            proc = self._proc
+        if not self.future.cancel() and proc is not None and proc.poll() is None:
+            _kill(proc)
+
+
+class ProbePool:
+    def __init__(self, max_workers: int, timeout: float, batch_timeout: float = DEFAULT_BATCH_TIMEOUT):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout if timeout > 0 else None
+        self.batch_timeout = batch_timeout if batch_timeout > 0 else None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ffprobe")
+
+    def probe(self, open_path: Callable[[], ContextManager[LocalPath]]) -> ProbeTask:
+        """
+        Queues a probe of the path yielded by `open_path()`, which is entered
+        on the pool thread right before ffprobe starts, and returns its task.
+        """
+        probe_task = ProbeTask()
+
+        def task():
+            with open_path() as local:
+                return run_ffprobe(local.path, local.pass_fds, self.timeout, on_start=probe_task.started)
+        probe_task.future = self._executor.submit(task)
+        return probe_task
+
+    def probe_stream(self, stream, suffix: str = '') -> ProbeTask:
+        # ffprobe needs a path, usually a /proc view of the spooled upload
+        return self.probe(lambda: local_path(stream, suffix=suffix))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[ProbePool] = None
+_pool_lock = threading.Lock()
+_versions: dict = {}
+_version_lock = threading.Lock()
+
+
+def get_probe_pool() -> ProbePool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProbePool(
+                max_workers=env_int("MXF_PROBE_CONCURRENCY", DEFAULT_CONCURRENCY),
+                timeout=env_int("MXF_PROBE_TIMEOUT", DEFAULT_TIMEOUT),
+                batch_timeout=env_int("MXF_BATCH_TIMEOUT", DEFAULT_BATCH_TIMEOUT),
+            )
+        return _pool
+
+
+def _probe_native(read: Callable[[], dict], filename: str, engine: str) -> Optional[dict]:
+    """
+    Runs the native reader unless ffprobe was asked for. Returns None when
+    the result should come from ffprobe instead; in native mode a file the
+    reader cannot handle is a ProbeError.
+    """
+    if engine == 'ffprobe':
+        return None
+    try:
+        raw_data = read()
+    except mxf_klv.MxfError as e:
+        if engine == 'native':
+            raise ProbeError("MXF header could not be read", str(e))
+        return None
+    except Exception as e:
+        if engine == 'native':
+            raise
+        print(f"Native MXF reader failed on {filename}, using ffprobe: {e}")
+        return None
+    if engine == 'auto' and mxf_klv.incomplete(raw_data):
+        return None
+    raw_data['format']['filename'] = filename
+    raw_data['probe_engine'] = 'native'
+    return raw_data
+
+
+def probe_uploads(uploads: List[Tuple[str, Any]], engine: Optional[str] = None) -> List[Outcome]:
+    """
+    Probes (filename, stream) uploads and returns (ffprobe style JSON,
+    error) pairs in upload order. Files the native reader handles are
+    answered inline; the rest are probed concurrently by ffprobe. A failing
+    probe only affects its own entry. Probes still queued or running when
+    the batch deadline passes are aborted and answered with ProbeTimeout.
+    """
+    engine = resolve_engine(engine)
+    pool = get_probe_pool()
+    deadline = time.monotonic() + pool.batch_timeout if pool.batch_timeout else None
+    outcomes: List[Outcome] = []
+    tasks = {}
+    for idx, (filename, stream) in enumerate(uploads):
+        try:
+            raw_data = _probe_native(lambda: mxf_klv.probe_stream(raw_file(stream)), filename, engine)
+        except Exception as e:
+            raw_data, error = None, e
+        else:
+            error = None
+            if raw_data is None:
+                tasks[idx] = pool.probe_stream(stream, suffix=os.path.splitext(filename)[1])
+        finally:
+            stream.seek(0)
+        outcomes.append((raw_data, error))
+
+    if not tasks:
+        return outcomes
+    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+    _, pending = wait([task.future for task in tasks.values()], timeout=remaining)
+    for task in tasks.values():
+        if task.future in pending:
+            task.abort()
+    # Killed probes exit at once; let them release their uploads before returning
+    wait(pending, timeout=1)
+
+    for idx, task in tasks.items():
+        if task.future in pending:
+            outcomes[idx] = (None, ProbeTimeout(
+                "ffprobe timed out",
+                f"The batch did not finish within {pool.batch_timeout} s, this probe was cancelled"))
+            continue
+        try:
+            outcomes[idx] = (task.result(), None)
+        except Exception as e:
+            outcomes[idx] = (None, e)
+    return outcomes
+
+
+def _check_ranges(head, tail, size: int) -> Tuple[int, int]:
+    head_size = stream_size(head)
+    tail_size = stream_size(tail) if tail is not None else 0
+    if size <= 0 or head_size > size or tail_size > size:
+        raise ValueError("The head and tail ranges must fit inside the file size")
+    max_size = env_int("MXF_PARTIAL_MAX_SIZE", DEFAULT_PARTIAL_MAX_SIZE)
+    if size > max_size:
+        raise ValueError(f"size must not exceed {max_size} bytes")
+    return head_size, tail_size
+
+
+def probe_partial(filename: str, head, tail, size: int, engine: Optional[str] = None) -> dict:
+    """
+    Probes a file from its leading and trailing byte ranges plus its total
+    size. MXF keeps nearly all of its metadata in the header and footer
+    partitions, so the native reader or ffprobe read the same values from a
+    sparse stand-in with only those ranges filled in. Raises ProbeError or
+    ValueError.
+    """
+    engine = resolve_engine(engine)
+    _, tail_size = _check_ranges(head, tail, size)
+
+    parts = [(0, head)]
+    if tail is not None:
+        parts.append((size - tail_size, tail))
+    with sparse_file(parts, size, suffix=os.path.splitext(filename)[1]) as local:
+        raw_data = _probe_native(lambda: mxf_klv.probe_file(local.path), filename, engine)
+        if raw_data is None:
+            raw_data = get_probe_pool().probe(lambda: nullcontext(local)).result()
+        return raw_data
+
+
+def _chunk_digest(stream, offset: int, length: int) -> str:
+    stream.seek(offset)
+    digest = hashlib.sha256(stream.read(length)).hexdigest()
+    stream.seek(0)
+    return digest
+
+
+def fingerprint(stream) -> str:
+    """
+    The cache fingerprint of a whole upload: its size and the SHA-256 of
+    its first and last FINGERPRINT_CHUNK bytes, "<size>-<head>-<tail>".
+    Browsers compute the same string with SubtleCrypto before uploading.
+    """
+    size = stream_size(stream)
+    length = min(FINGERPRINT_CHUNK, size)
+    return f"{size}-{_chunk_digest(stream, 0, length)}-{_chunk_digest(stream, size - length, length)}"
+
+
+def range_fingerprint(head, tail, size: int) -> Optional[str]:
+    """
+    The fingerprint of a file sent as head and tail ranges, or None when
+    the ranges do not cover the chunks the fingerprint is taken from.
+    """
+    head_size, tail_size = _check_ranges(head, tail, size)
+    length = min(FINGERPRINT_CHUNK, size)
+    if head_size < length:
+        return None
+    if tail is not None and tail_size >= length:
+        tail_digest = _chunk_digest(tail, tail_size - length, length)
+    elif head_size == size:
+        tail_digest = _chunk_digest(head, size - length, length)
+    else:
+        return None
+    return f"{size}-{_chunk_digest(head, 0, length)}-{tail_digest}"
+
+
+def ffprobe_version() -> str:
+    """
+    The first line of `ffprobe -version`, remembered per binary and
+    modification time so an upgraded ffprobe invalidates cached probes.
+    """
+    path = ffprobe_path()
+    resolved = shutil.which(path) or path
+    try:
+        marker = (resolved, os.stat(resolved).st_mtime_ns)
+    except OSError:
+        return "unavailable"
+    with _version_lock:
+        version = _versions.get(marker)
+    if version is None:
+        try:
+            result = subprocess.run([resolved, "-version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    text=True, timeout=10)
+            version = result.stdout.partition('\n')[0].strip() or "unknown"
+        except (OSError, subprocess.SubprocessError):
+            version = "unavailable"
+        with _version_lock:
+            _versions[marker] = version
+    return version
+
+
+def _summary_key(fingerprint_: str, engine: str) -> str:
+    version = f"{ffprobe_version()}|native {mxf_klv.PARSER_VERSION}"
+    return make_key("mxf_summary", version, fingerprint_, {"engine": engine})
+
+
+def _named(summary: dict, filename: str) -> dict:
+    # Cached summaries are shared by every copy of the file, whatever it is called
+    return {**summary, "summary": {**summary["summary"], "File Name": os.path.basename(filename)}}
+
+
+def lookup(fingerprint_: str, filename: str, engine: Optional[str] = None) -> Optional[dict]:
+    """
+    The cached inspector response for a fingerprint, or None on a miss.
+    Raises ValueError for a malformed fingerprint or engine.
+    """
+    if not FINGERPRINT_REGEX.match(fingerprint_):
+        raise ValueError("fingerprint must be '<size>-<sha256 of head>-<sha256 of tail>'")
+    summary = get_cache().get(_summary_key(fingerprint_, resolve_engine(engine)))
+    if summary is MISSING:
+        return None
+    return _named(summary, filename)
+
+
+def inspect_uploads(uploads: List[Tuple[str, Any]], engine: Optional[str] = None) -> List[Outcome]:
+    """
+    Returns (inspector response, error) pairs for (filename, stream)
+    uploads. Responses are cached by fingerprint, so a file seen before
+    skips both probing and formatting.
+    """
+    engine = resolve_engine(engine)
+    cache = get_cache()
+    keys = [_summary_key(fingerprint(stream), engine) for _, stream in uploads]
+    outcomes: List[Outcome] = []
+    missing = []
+    for idx, ((filename, _), key) in enumerate(zip(uploads, keys)):
+        summary = cache.get(key)
+        if summary is MISSING:
+            missing.append(idx)
+            outcomes.append((None, None))
+        else:
+            outcomes.append((_named(summary, filename), None))
+
+    probed = probe_uploads([uploads[idx] for idx in missing], engine)
+    for idx, (raw_data, error) in zip(missing, probed):
+        if error is not None:
+            outcomes[idx] = (None, error)
+            continue
+        summary = summarize(raw_data, uploads[idx][0])
+        cache.put(keys[idx], summary)
+        outcomes[idx] = (summary, None)
+    return outcomes
+
+
+def inspect_partial(filename: str, head, tail, size: int, engine: Optional[str] = None) -> dict:
+    """
+    probe_partial() with the fingerprint cache in front of it. A file
+    inspected whole before is served from the same entry.
+    """
+    engine = resolve_engine(engine)
+    fingerprint_ = range_fingerprint(head, tail, size)
+    key = _summary_key(fingerprint_, engine) if fingerprint_ else None
+    if key:
+        summary = get_cache().get(key)
+        if summary is not MISSING:
+            return _named(summary, filename)
+    summary = summarize(probe_partial(filename, head, tail, size, engine), filename)
+    if key:
+        get_cache().put(key, summary)
+    return summary
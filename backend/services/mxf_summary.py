@@ -0,0 +1,130 @@
+"""
+MXF Inspector output: turns ffprobe's -show_format/-show_streams JSON into
+the summary and per-stream tables the frontend displays.
+"""
+
+import os
+
+
+def format_size(size_bytes):
+    if not size_bytes or not str(size_bytes).isdigit():
+        return None
+    size = float(size_bytes)
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024**2:
+        return f"{size/1024:.2f} KB"
+    elif size < 1024**3:
+        return f"{size/1024**2:.2f} MB"
+    else:
+        return f"{size/1024**3:.2f} GB"
+
+
+def format_bitrate(bitrate_bps):
+    if not bitrate_bps or not str(bitrate_bps).isdigit():
+        return None
+    bitrate = float(bitrate_bps)
+    if bitrate < 1000:
+        return f"{bitrate} bps"
+    elif bitrate < 1000**2:
+        return f"{bitrate/1000:.2f} kbps"
+    else:
+        return f"{bitrate/1000**2:.2f} Mbps"
+
+
+def format_duration(duration_s):
+    if not duration_s:
+        return None
+    try:
+        duration = float(duration_s)
+        return f"{duration:.2f} s"
+    except (ValueError, TypeError):
+        return None
+
+
+def format_aspect_ratio(aspect_str):
+    """Convert aspect ratio from '256:135' format to '1.896:1' format"""
+    if not aspect_str or aspect_str == 'N/A':
+        return None
+    try:
+        if ':' in aspect_str:
+            parts = aspect_str.split(':')
+            width = float(parts[0])
+            height = float(parts[1])
+            if height > 0:
+                ratio = width / height
+                return f"{ratio:.3f}:1"
+        return aspect_str
+    except (ValueError, IndexError, ZeroDivisionError):
+        return aspect_str
+
+
+def summarize(raw_data: dict, filename: str, include_raw: bool = True) -> dict:
+    """
+    Builds the /api/mxf response for one file from ffprobe's JSON output.
+    """
+    output = {}
+
+    # Top-level summary
+    format_info = raw_data.get('format', {})
+    tags = format_info.get('tags', {})
+    output['summary'] = {
+        'File Name': os.path.basename(filename),
+        'Format': format_info.get('format_long_name'),
+        'Duration': format_duration(format_info.get('duration')),
+        'File Size': format_size(format_info.get('size')),
+        'Overall Bit Rate': format_bitrate(format_info.get('bit_rate')),
+        'Stream Count': format_info.get('nb_streams'),
+        'company_name': tags.get('company_name'),
+        'product_name': tags.get('product_name'),
+        'product_version': tags.get('product_version'),
+        'product_uid': tags.get('uid'),
+        'project_name': tags.get('project_name'),
+    }
+
+    # Group streams
+    output['video_streams'] = []
+    output['audio_streams'] = []
+    output['other_streams'] = []
+
+    for stream in raw_data.get('streams', []):
+        stream_type = stream.get('codec_type')
+
+        if stream_type == 'video':
+            info = {
+                'Stream Index': stream.get('index'),
+                'Codec': stream.get('codec_long_name'),
+                'Resolution': f"{stream.get('width')}x{stream.get('height')}",
+                'Aspect Ratio': format_aspect_ratio(stream.get('display_aspect_ratio')),
+                'Frame Rate': stream.get('avg_frame_rate'),
+                'Bit Rate': format_bitrate(stream.get('bit_rate')),
+                'Pixel Format': stream.get('pix_fmt'),
+                'details': stream # include all original stream data
+            }
+            output['video_streams'].append(info)
+
+        elif stream_type == 'audio':
+            info = {
+                'Stream Index': stream.get('index'),
+                'Codec': stream.get('codec_long_name'),
+                'Sample Rate': stream.get('sample_rate'),
+                'Channels': f"{stream.get('channels')} ({stream.get('channel_layout')})",
+                'Bit Rate': format_bitrate(stream.get('bit_rate')),
+                'details': stream # include all original stream data
+            }
+            output['audio_streams'].append(info)
+
+        else:
+            info = {
+                'Stream Index': stream.get('index'),
+                'Codec': stream.get('codec_long_name'),
+                'Type': stream_type,
+                'details': stream # include all original stream data
+            }
+            output['other_streams'].append(info)
+
+    # Include the full raw data at the end
+    if include_raw:
+        output['raw_data'] = raw_data
+
+    return output
@@ -0,0 +1,44 @@
+from models.event_table import EventTable
+from services.filters import compile_filters
+from services.sorters import compile_sort_key
+from services.transforms import compile_transforms
+
+class Pipeline:
+    """
+    Options compiled once into a single fused filter + transform pass over an
+    EventTable, followed by at most one sort.
+    """
+    def __init__(self, options: dict):
+        self.rejects = compile_filters(options)
+        self.transforms = compile_transforms(options)
+        self.sort_key = compile_sort_key(options)
+
+    @property
+    def is_noop(self) -> bool:
+        return not (self.rejects or self.transforms or self.sort_key)
+
+    def run(self, table: EventTable) -> EventTable:
+        if self.is_noop:
+            return table
+
+        rejects = self.rejects
+        transforms = self.transforms
+        rows = []
+        for index in range(len(table)):
+            row = table.row(index)
+            if any(reject(row) for reject in rejects):
+                continue
+            for transform in transforms:
+                transform(row)
+            rows.append(row)
+
+        if self.sort_key is not None:
+            rows.sort(key=self.sort_key)
+
+        result = EventTable()
+        for row in rows:
+            result.append_row(row)
+        return result
+
+def compile_pipeline(options: dict) -> Pipeline:
+    return Pipeline(options or {})
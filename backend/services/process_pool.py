@@ -0,0 +1,115 @@
+"""
+Shared, lazily created process pool for CPU bound parsing.
+
+The pool is created on first use inside each gunicorn worker (so it is never
+inherited across a fork) and sized by the PARSE_WORKERS environment variable,
+defaulting to min(4, cpu_count). PARSE_WORKERS=1 disables the pool and runs
+everything inline.
+
+Background jobs run on the same pool (see services.jobs), so CPU heavy work
+never competes with request handling inside the gunicorn worker. Code that
+already runs on a pool worker, such as a job fanning out over several bins,
+runs its batches inline rather than starting a pool of its own.
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from services.env import env_int
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_in_worker = False
+
+Outcome = Tuple[Any, Optional[BaseException]]
+
+
+def configured_workers() -> int:
+    return env_int("PARSE_WORKERS", max(1, min(4, os.cpu_count() or 1)), minimum=1)
+
+
+def _mark_worker():
+    global _in_worker
+    _in_worker = True
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=configured_workers(), initializer=_mark_worker)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """
+    Drops a broken pool, unless another thread already replaced it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown_pool)
+
+
+def _call(fn: Callable, args: Sequence) -> Outcome:
+    try:
+        return fn(*args), None
+    except Exception as e:
+        return None, e
+
+
+def map_ordered(fn: Callable, arg_list: List[Sequence], min_batch: int = 2) -> List[Outcome]:
+    """
+    Runs fn(*args) for every entry of arg_list and returns (result, error)
+    pairs in input order. A failing call only affects its own entry. Batches
+    smaller than `min_batch` run inline to skip the pickling overhead.
+    """
+    if len(arg_list) < min_batch or configured_workers() <= 1 or _in_worker:
+        return [_call(fn, args) for args in arg_list]
+
+    pool = get_pool()
+    futures = [pool.submit(fn, *args) for args in arg_list]
+    outcomes = []
+    for future in futures:
+        try:
+            outcomes.append((future.result(), None))
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM killed); start a fresh pool next time
+            _discard_pool(pool)
+            outcomes.append((None, e))
+        except Exception as e:
+            outcomes.append((None, e))
+    return outcomes
+
+
+def call(fn: Callable, *args) -> Any:
+    """
+    Runs fn(*args) on a pool worker and returns its result, or runs it
+    inline when the pool is disabled or this already is a pool worker.
+    Exceptions raised by fn propagate, as does BrokenProcessPool when the
+    worker dies.
+    """
+    if configured_workers() <= 1 or _in_worker:
+        return fn(*args)
+    pool = get_pool()
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
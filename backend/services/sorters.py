@@ -1,15 +1,25 @@
-from typing import List
+from typing import Any, Callable, List, Optional
 from models.event import Event
 
-def apply_sorters(events: List[Event], options: dict) -> List[Event]:
+def compile_sort_key(options: dict) -> Optional[Callable[[dict], Any]]:
     """
-    Applies sorting to a list of events based on the provided options.
+    Returns the sort key for an event row, or None to keep the original order.
     """
     sort_option = options.get('sort', 'original')
-    
+
     if sort_option == 'clip_name':
-        events.sort(key=lambda e: (e.clip_name or '').lower())
+        return lambda row: (row.get('clip_name') or '').lower()
     elif sort_option == 'reel_tc':
-        events.sort(key=lambda e: ((e.reel or '').lower(), e.src_in or ''))
-    
+        return lambda row: ((row.get('reel') or '').lower(), row.get('src_in') or '')
+    return None
+
+def apply_sorters(events: List[Event], options: dict) -> List[Event]:
+    """
+    Applies sorting to a list of events based on the provided options.
+    """
+    key = compile_sort_key(options)
+
+    if key is not None:
+        events.sort(key=lambda e: key(vars(e)))
+
     return events
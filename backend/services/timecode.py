@@ -0,0 +1,217 @@
+"""
+Vectorised timecode <-> frame count conversion backed by NumPy.
+
+Every function accepts either a single value or a sequence/array and returns
+the same shape, so a whole EDL (or a batch from the Timecode Calculator) is
+converted in one call instead of one Python round trip per timecode.
+
+Supported rates are 23.976, 24, 25, 29.97, 30, 50 and 59.94. Drop-frame
+counting is available for 29.97 (2 frames per minute) and 59.94 (4 frames per
+minute), skipping every tenth minute as per SMPTE 12M.
+"""
+
+import re
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# Nominal (integer) timebase for each supported rate
+TIMEBASES = {
+    23.976: 24,
+    24.0: 24,
+    25.0: 25,
+    29.97: 30,
+    30.0: 30,
+    50.0: 50,
+    59.94: 60,
+}
+
+# Frame numbers dropped at the start of each non-tenth minute
+DROP_FRAMES = {
+    29.97: 2,
+    59.94: 4,
+}
+
+_TC_WIDTH = 11  # "HH:MM:SS:FF"
+_SEPARATORS = (ord(':'), ord(';'), ord('.'))
+_ZERO = ord('0')
+
+
+class ParsedTimecodes(NamedTuple):
+    hours: np.ndarray
+    minutes: np.ndarray
+    seconds: np.ndarray
+    frames: np.ndarray
+    valid: np.ndarray
+    drop_frame: np.ndarray
+
+
+def normalize_rate(fps: float) -> float:
+    """
+    Maps a frame rate such as 23.98 or 29.970029 onto one of the supported rates.
+    """
+    fps = float(fps)
+    for rate in TIMEBASES:
+        if abs(rate - fps) < 0.01:
+            return rate
+    raise ValueError(f"Unsupported frame rate: {fps}")
+
+
+def timebase(fps: float) -> int:
+    return TIMEBASES[normalize_rate(fps)]
+
+
+def _drop_count(fps: float, drop_frame: bool) -> int:
+    if not drop_frame:
+        return 0
+    rate = normalize_rate(fps)
+    if rate not in DROP_FRAMES:
+        raise ValueError(f"Drop-frame timecode is not defined for {rate} fps")
+    return DROP_FRAMES[rate]
+
+
+def _parse_slow(tc) -> Optional[tuple]:
+    if not isinstance(tc, str) or not tc:
+        return None
+    parts = re.split('[:;.]', tc.strip())
+    if len(parts) != 4 or not all(p.isdigit() for p in parts):
+        return None
+    return int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]), ';' in tc
+
+
+def parse_timecodes(timecodes) -> ParsedTimecodes:
+    """
+    Splits timecode strings into hour/minute/second/frame arrays.
+
+    Well-formed "HH:MM:SS:FF" strings are decoded as a single uint8 matrix;
+    anything else goes through a per-item fallback. Rows that cannot be
+    parsed are zero and flagged in `valid`. `drop_frame` flags rows that use
+    a ';' separator.
+    """
+    tcs = np.asarray(timecodes, dtype=object).ravel()
+    n = len(tcs)
+    hours = np.zeros(n, dtype=np.int64)
+    minutes = np.zeros(n, dtype=np.int64)
+    seconds = np.zeros(n, dtype=np.int64)
+    frames = np.zeros(n, dtype=np.int64)
+    valid = np.zeros(n, dtype=bool)
+    drop_frame = np.zeros(n, dtype=bool)
+    if n == 0:
+        return ParsedTimecodes(hours, minutes, seconds, frames, valid, drop_frame)
+
+    # One spare character so over-long strings are not silently truncated
+    text = tcs.astype(f'U{_TC_WIDTH + 1}')
+    lengths = np.char.str_len(text)
+    raw = text.view(np.uint32).reshape(n, _TC_WIDTH + 1)
+
+    digits = raw[:, [0, 1, 3, 4, 6, 7, 9, 10]].astype(np.int64) - _ZERO
+    seps = raw[:, [2, 5, 8]]
+    fast = ((lengths == _TC_WIDTH)
+            & np.all((digits >= 0) & (digits <= 9), axis=1)
+            & np.all(np.isin(seps, _SEPARATORS), axis=1))
+
+    hours[fast] = digits[fast, 0] * 10 + digits[fast, 1]
+    minutes[fast] = digits[fast, 2] * 10 + digits[fast, 3]
+    seconds[fast] = digits[fast, 4] * 10 + digits[fast, 5]
+    frames[fast] = digits[fast, 6] * 10 + digits[fast, 7]
+    valid[fast] = True
+    drop_frame[fast] = np.any(seps[fast] == ord(';'), axis=1)
+
+    for idx in np.flatnonzero(~fast):
+        parsed = _parse_slow(tcs[idx])
+        if parsed is not None:
+            hours[idx], minutes[idx], seconds[idx], frames[idx], drop_frame[idx] = parsed
+            valid[idx] = True
+
+    return ParsedTimecodes(hours, minutes, seconds, frames, valid, drop_frame)
+
+
+def parsed_to_frames(parsed: ParsedTimecodes, fps: float, drop_frame: Optional[bool] = None) -> np.ndarray:
+    """
+    Frame counts for already split timecodes, see `tc_to_frames`.
+    """
+    rate = normalize_rate(fps)
+    base = TIMEBASES[rate]
+
+    total = ((parsed.hours * 60 + parsed.minutes) * 60 + parsed.seconds) * base + parsed.frames
+
+    if rate in DROP_FRAMES:
+        if drop_frame is None:
+            df_mask = parsed.drop_frame
+        else:
+            df_mask = np.full(len(total), bool(drop_frame))
+        if df_mask.any():
+            total_minutes = parsed.hours * 60 + parsed.minutes
+            dropped = DROP_FRAMES[rate] * (total_minutes - total_minutes // 10)
+            total = np.where(df_mask, total - dropped, total)
+    elif drop_frame:
+        raise ValueError(f"Drop-frame timecode is not defined for {rate} fps")
+
+    return np.where(parsed.valid, total, 0)
+
+
+def tc_to_frames(timecodes, fps: float, drop_frame: Optional[bool] = None):
+    """
+    Converts timecode(s) to frame counts.
+
+    If `drop_frame` is None it is inferred per timecode from a ';' separator
+    (only honoured at 29.97/59.94). Invalid or empty timecodes count as 0.
+    Returns an int for a single timecode and an int64 array otherwise.
+    """
+    scalar = timecodes is None or isinstance(timecodes, str)
+    total = parsed_to_frames(parse_timecodes([timecodes] if scalar else timecodes), fps, drop_frame)
+    return int(total[0]) if scalar else total
+
+
+def frames_to_tc(frames, fps: float, drop_frame: bool = False):
+    """
+    Converts frame count(s) to "HH:MM:SS:FF" timecode(s).
+
+    Drop-frame timecodes use ';' as the frame separator. Returns a str for a
+    single frame count and a NumPy unicode array otherwise.
+    """
+    scalar = np.isscalar(frames)
+    counts = np.atleast_1d(np.asarray(frames)).astype(np.int64)
+    base = timebase(fps)
+    drop = _drop_count(fps, drop_frame)
+
+    negative = counts < 0
+    counts = np.abs(counts)
+
+    if drop:
+        per_ten_minutes = base * 600 - drop * 9
+        per_minute = base * 60 - drop
+        tens, remainder = np.divmod(counts, per_ten_minutes)
+        extra = np.where(remainder > drop, drop * ((remainder - drop) // per_minute), 0)
+        counts = counts + drop * 9 * tens + extra
+
+    ff = counts % base
+    total_seconds = counts // base
+    ss = total_seconds % 60
+    mm = (total_seconds // 60) % 60
+    hh = total_seconds // 3600
+
+    n = len(counts)
+    out = np.empty((n, _TC_WIDTH), dtype=np.uint8)
+    for col, values in ((0, hh), (3, mm), (6, ss), (9, ff)):
+        out[:, col] = (values // 10) % 10 + _ZERO
+        out[:, col + 1] = values % 10 + _ZERO
+    out[:, 2] = ord(':')
+    out[:, 5] = ord(':')
+    out[:, 8] = ord(';') if drop else ord(':')
+    result = out.view(f'S{_TC_WIDTH}').ravel().astype(f'U{_TC_WIDTH + 2}')
+
+    # Rare cases the fixed-width matrix cannot express
+    sep = ';' if drop else ':'
+    for idx in np.flatnonzero(negative | (hh > 99)):
+        sign = '-' if negative[idx] else ''
+        result[idx] = f"{sign}{hh[idx]:02d}:{mm[idx]:02d}:{ss[idx]:02d}{sep}{ff[idx]:02d}"
+
+    return str(result[0]) if scalar else result
+
+
+def durations(tc_in, tc_out, fps: float, drop_frame: Optional[bool] = None) -> np.ndarray:
+    """
+    Frame differences between two equally long timecode sequences.
+    """
+    return tc_to_frames(tc_out, fps, drop_frame) - tc_to_frames(tc_in, fps, drop_frame)
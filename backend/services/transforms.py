@@ -1,20 +1,35 @@
-from typing import List
+from typing import Callable, List
 from models.event import Event
 
+Transform = Callable[[dict], None]
+
+def _locator_to_clip_name(row: dict):
+    if row.get('locator_name'):
+        row['clip_name'] = row['locator_name']
+
+def _file_name_to_tape_name(row: dict):
+    if row.get('source_file'):
+        row['reel'] = row['source_file']
+
+def compile_transforms(options: dict) -> List[Transform]:
+    """
+    Reads the transform options once and returns the transforms that are
+    switched on. Each transform updates an event row in place.
+    """
+    transforms = []
+    if options.get('locatorToClipName', False):
+        transforms.append(_locator_to_clip_name)
+    if options.get('fileNameToTapeName', False):
+        transforms.append(_file_name_to_tape_name)
+    return transforms
+
 def apply_transforms(events: List[Event], options: dict) -> List[Event]:
     """
     Applies transformations to a list of events based on the provided options.
     """
-    locator_to_clip_name = options.get('locatorToClipName', False)
-    file_name_to_tape_name = options.get('fileNameToTapeName', False)
-    
+    transforms = compile_transforms(options)
     for event in events:
-        if locator_to_clip_name:
-            if event.locator_name:
-                event.clip_name = event.locator_name
-        
-        if file_name_to_tape_name:
-            if getattr(event, 'source_file', None):
-                event.reel = event.source_file
-                
+        row = vars(event)
+        for transform in transforms:
+            transform(row)
     return events
@@ -0,0 +1,189 @@
+"""
+Spooled upload handling.
+
+Request bodies are received into SpooledTemporaryFile objects: uploads up to
+UPLOAD_MEMORY_LIMIT stay in memory, anything larger rolls over to an
+anonymous temp file that the OS removes as soon as it is closed. Nothing is
+written under the client supplied file name, so concurrent uploads with the
+same name cannot collide and no file outlives its request.
+
+Parsers read the stream directly. Tools that insist on a filesystem path
+(ffprobe) get one from local_path(), which prefers /proc/self/fd views of the
+existing spool file or a memfd over copying into a named temp file.
+sparse_file() does the same for a file rebuilt from a few byte ranges (the
+head and tail of a large MXF), leaving everything in between as a hole.
+
+Configuration (environment):
+- UPLOAD_MEMORY_LIMIT: bytes kept in memory per upload (default 64 MB)
+- UPLOAD_TMP_DIR: directory for spilled uploads (default: system temp dir)
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple, Optional, Sequence, Tuple
+
+from flask import Request
+
+from services.env import env_int
+
+DEFAULT_MEMORY_LIMIT = 64 * 1024 ** 2
+COPY_CHUNK_SIZE = 1024 * 1024
+_PROC_FD = '/proc/self/fd'
+
+
+def memory_limit() -> int:
+    return env_int("UPLOAD_MEMORY_LIMIT", DEFAULT_MEMORY_LIMIT)
+
+
+def spool_dir() -> Optional[str]:
+    return os.getenv("UPLOAD_TMP_DIR") or None
+
+
+class SpooledRequest(Request):
+    """
+    Request class that spools every uploaded file instead of using
+    werkzeug's 500 KB in-memory threshold.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=memory_limit(), mode='rb+', dir=spool_dir())
+
+
+def binary_stream(stream) -> io.IOBase:
+    """
+    Returns a rewound, fully featured binary file object for an upload.
+
+    SpooledTemporaryFile only grew readinto() in Python 3.11, and libraries
+    such as pyavb check for it, so hand out the underlying BytesIO or temp
+    file instead.
+    """
+    raw = stream
+    if isinstance(stream, tempfile.SpooledTemporaryFile) and not hasattr(stream, 'readinto'):
+        raw = stream._file
+    raw.seek(0)
+    return raw
+
+
+def raw_file(stream) -> io.IOBase:
+    """
+    The BytesIO or real file behind an upload, for readers that want to
+    map it without copying. Unlike fileno(), this never forces an in-memory
+    SpooledTemporaryFile to roll over to disk.
+    """
+    if isinstance(stream, tempfile.SpooledTemporaryFile):
+        return stream._file
+    return stream
+
+
+def detach_stream(file_storage):
+    """
+    Takes ownership of an upload's stream so it survives the end of the
+    request (Flask closes request.files when the view returns, before a
+    streamed response body is produced). The caller must close it.
+    """
+    stream = file_storage.stream
+    file_storage.stream = io.BytesIO()
+    stream.seek(0)
+    return stream
+
+
+def _spilled_fd(stream) -> Optional[int]:
+    # fileno() on a SpooledTemporaryFile forces a rollover, so only ask
+    # once the data is already on disk
+    if isinstance(stream, tempfile.SpooledTemporaryFile) and not stream._rolled:
+        return None
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+class LocalPath(NamedTuple):
+    path: str
+    pass_fds: Tuple[int, ...]
+
+
+@contextmanager
+def local_path(stream, suffix: str = '') -> Iterator[LocalPath]:
+    """
+    Yields a filesystem path with the full contents of an upload.
+
+    On Linux the path is /proc/self/fd/N for either the already spilled
+    spool file or a memfd, and `pass_fds` must be handed to subprocess so
+    the child can open it. Elsewhere the data is copied to a uniquely named
+    temp file. Everything is released when the block exits.
+    """
+    stream.seek(0)
+    use_proc = sys.platform.startswith('linux') and os.path.isdir(_PROC_FD)
+
+    fd = _spilled_fd(stream) if use_proc else None
+    if fd is not None:
+        stream.flush()
+        try:
+            yield LocalPath(f"{_PROC_FD}/{fd}", (fd,))
+        finally:
+            stream.seek(0)
+        return
+
+    if use_proc and hasattr(os, 'memfd_create'):
+        fd = os.memfd_create('upload')
+        try:
+            with open(fd, 'wb', closefd=False) as out:
+                shutil.copyfileobj(stream, out, COPY_CHUNK_SIZE)
+            yield LocalPath(f"{_PROC_FD}/{fd}", (fd,))
+        finally:
+            os.close(fd)
+            stream.seek(0)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=suffix, dir=spool_dir()) as out:
+        shutil.copyfileobj(stream, out, COPY_CHUNK_SIZE)
+        out.flush()
+        try:
+            yield LocalPath(out.name, ())
+        finally:
+            stream.seek(0)
+
+
+def stream_size(stream) -> int:
+    """
+    Length of a seekable stream, which is left rewound.
+    """
+    stream.seek(0, io.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+@contextmanager
+def sparse_file(parts: Sequence[Tuple[int, object]], size: int, suffix: str = '') -> Iterator[LocalPath]:
+    """
+    Yields a path to a `size` byte file holding each (offset, stream) part
+    at its offset. The rest of the file is never written, so on filesystems
+    with sparse file support it takes no space. On Linux the file is
+    unnamed and reached through /proc/self/fd, like local_path(). Raises
+    ValueError when the filesystem cannot hold a file of `size` bytes.
+    """
+    use_proc = sys.platform.startswith('linux') and os.path.isdir(_PROC_FD)
+    if use_proc:
+        out = tempfile.TemporaryFile(dir=spool_dir())
+    else:
+        out = tempfile.NamedTemporaryFile(suffix=suffix, dir=spool_dir())
+    with out:
+        try:
+            out.truncate(size)
+        except OSError as e:
+            raise ValueError(f"Cannot create a {size} byte file: {e.strerror}")
+        for offset, stream in parts:
+            stream.seek(0)
+            out.seek(offset)
+            shutil.copyfileobj(stream, out, COPY_CHUNK_SIZE)
+            stream.seek(0)
+        out.flush()
+        if use_proc:
+            yield LocalPath(f"{_PROC_FD}/{out.fileno()}", (out.fileno(),))
+        else:
+            yield LocalPath(out.name, ())
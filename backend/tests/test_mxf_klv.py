@@ -0,0 +1,184 @@
+"""
+Native MXF reader tests on small synthetic OP1a files: a DNxHD picture
+track and two PCM tracks described by a Multiple Descriptor, a timecode
+track, and header/footer partitions that can be left out or marked
+incomplete.
+"""
+
+import struct
+import uuid
+
+import pytest
+
+from parsers import mxf_klv
+
+OP1A = bytes.fromhex('060e2b34040101010d01020101010900')
+DNXHD = bytes.fromhex('060e2b340401010a0401020271010000')
+DATA_DEF_TIMECODE = bytes.fromhex('060e2b34040101010103020101000000')
+DATA_DEF_PICTURE = bytes.fromhex('060e2b34040101010103020201000000')
+DATA_DEF_SOUND = bytes.fromhex('060e2b34040101010103020202000000')
+UMID_PREFIX = bytes.fromhex('060a2b340101010501010f2013000000')
+ESSENCE_KEY = bytes.fromhex('060e2b34010201010d01030115010500')
+FILL_KEY = bytes.fromhex('060e2b34010101020301021001000000')
+PRIMER_KEY = bytes.fromhex('060e2b34020501010d01020101050100')
+RIP_KEY = bytes.fromhex('060e2b34020501010d01020101110100')
+
+HEADER, FOOTER = 0x02, 0x04
+OPEN_INCOMPLETE, CLOSED_COMPLETE = 0x01, 0x04
+
+
+def klv(key: bytes, value: bytes) -> bytes:
+    return key + b'\x83' + len(value).to_bytes(3, 'big') + value
+
+
+def partition(kind: int, status: int, this: int, footer: int, header_bytes: int) -> bytes:
+    key = bytes.fromhex('060e2b34020501010d01020101') + bytes([kind, status, 0])
+    value = struct.pack('>HHIQQQQQIQI', 1, 3, 1, this, 0, footer, header_bytes, 0, 0, 0, 1)
+    return klv(key, value + OP1A + struct.pack('>II', 0, 16))
+
+
+def refs(ids) -> bytes:
+    return struct.pack('>II', len(ids), 16) + b''.join(ids)
+
+
+def utf16(text: str) -> bytes:
+    return text.encode('utf-16-be')
+
+
+def rational(numerator: int, denominator: int) -> bytes:
+    return struct.pack('>ii', numerator, denominator)
+
+
+def header_metadata(tc_base: int = 25, tc_start: int = 90000, drop_frame: bool = False) -> bytes:
+    sets = []
+
+    def add(kind, items):
+        instance = uuid.uuid4().bytes
+        value = struct.pack('>HH', 0x3c0a, 16) + instance
+        value += b''.join(struct.pack('>HH', tag, len(data)) + data for tag, data in items)
+        sets.append(klv(bytes.fromhex('060e2b34025301010d01010101') + bytes([0x01, kind, 0x00]), value))
+        return instance
+
+    def sequence(data_def, components):
+        return add(0x0f, [(0x0201, data_def), (0x0202, struct.pack('>q', 250)), (0x1001, refs(components))])
+
+    def clip(data_def, package, track_id):
+        return add(0x11, [(0x0201, data_def), (0x0202, struct.pack('>q', 250)), (0x1201, struct.pack('>q', 0)),
+                          (0x1101, package), (0x1102, struct.pack('>I', track_id))])
+
+    def track(track_id, number, segment, name=None):
+        items = [(0x4801, struct.pack('>I', track_id)), (0x4804, struct.pack('>I', number)),
+                 (0x4b01, rational(25, 1)), (0x4b02, struct.pack('>q', 0)), (0x4803, segment)]
+        if name:
+            items.append((0x4802, utf16(name)))
+        return add(0x3b, items)
+
+    def sound_descriptor(track_id):
+        return add(0x48, [(0x3006, struct.pack('>I', track_id)), (0x3d03, rational(48000, 1)),
+                          (0x3d07, struct.pack('>I', 1)), (0x3d01, struct.pack('>I', 24))])
+
+    material_umid = UMID_PREFIX + uuid.uuid4().bytes
+    source_umid = UMID_PREFIX + uuid.uuid4().bytes
+    timecode = add(0x14, [(0x0201, DATA_DEF_TIMECODE), (0x0202, struct.pack('>q', 250)),
+                          (0x1502, struct.pack('>H', tc_base)), (0x1501, struct.pack('>q', tc_start)),
+                          (0x1503, bytes([drop_frame]))])
+    material_tracks = [
+        track(1, 0, sequence(DATA_DEF_TIMECODE, [timecode])),
+        track(2, 0x15010500, sequence(DATA_DEF_PICTURE, [clip(DATA_DEF_PICTURE, source_umid, 1)]), 'V1'),
+        track(3, 0x16010100, sequence(DATA_DEF_SOUND, [clip(DATA_DEF_SOUND, source_umid, 2)]), 'A1'),
+        track(4, 0x16010200, sequence(DATA_DEF_SOUND, [clip(DATA_DEF_SOUND, source_umid, 3)]), 'A2'),
+    ]
+    picture = add(0x28, [(0x3006, struct.pack('>I', 1)), (0x3001, rational(25, 1)), (0x3201, DNXHD),
+                         (0x3203, struct.pack('>I', 1920)), (0x3202, struct.pack('>I', 1080)),
+                         (0x320e, rational(16, 9)), (0x320c, b'\x00'), (0x3301, struct.pack('>I', 10)),
+                         (0x3302, struct.pack('>I', 2)), (0x3308, struct.pack('>I', 1))])
+    descriptor = add(0x44, [(0x3f01, refs([picture, sound_descriptor(2), sound_descriptor(3)]))])
+    source_tracks = [track(track_id, 0, sequence(data_def, [clip(data_def, b'\x00' * 32, 0)]))
+                     for track_id, data_def in ((1, DATA_DEF_PICTURE), (2, DATA_DEF_SOUND), (3, DATA_DEF_SOUND))]
+    source = add(0x37, [(0x4401, source_umid), (0x4403, refs(source_tracks)), (0x4701, descriptor)])
+    material = add(0x36, [(0x4401, material_umid), (0x4402, utf16('A001C003_230101')),
+                          (0x4403, refs(material_tracks))])
+    content = add(0x18, [(0x1901, refs([material, source]))])
+    identification = add(0x30, [(0x3c01, utf16('ARRI')), (0x3c02, utf16('ALEXA Mini LF')),
+                                (0x3c04, utf16('7.2'))])
+    add(0x2f, [(0x3b03, content), (0x3b06, refs([identification])), (0x3b09, OP1A)])
+    return klv(PRIMER_KEY, struct.pack('>II', 0, 18)) + b''.join(sets)
+
+
+def build_mxf(run_in: bytes = b'', header_status: int = CLOSED_COMPLETE, header_meta: bool = True,
+              footer_meta: bool = True, footer_in_header: bool = True, rip: bool = True, **metadata) -> bytes:
+    meta = header_metadata(**metadata)
+    header_meta_bytes = meta if header_meta else b''
+    fill = klv(FILL_KEY, b'\x00' * 100)
+    body = klv(ESSENCE_KEY, b'\x11' * 1000)
+    footer_offset = len(partition(HEADER, header_status, 0, 0, 0)) + len(fill) + len(header_meta_bytes) + len(body)
+    header = partition(HEADER, header_status, 0, footer_offset if footer_in_header else 0, len(header_meta_bytes))
+    footer_meta_bytes = meta if footer_meta else b''
+    footer = partition(FOOTER, CLOSED_COMPLETE, footer_offset, footer_offset, len(footer_meta_bytes))
+    data = run_in + header + fill + header_meta_bytes + body + footer + footer_meta_bytes
+    if rip:
+        entries = struct.pack('>IQ', 0, 0) + struct.pack('>IQ', 0, footer_offset)
+        # The overall length at the end counts the whole pack, key and length included
+        data += klv(RIP_KEY, entries + struct.pack('>I', 16 + 4 + len(entries) + 4))
+    return data
+
+
+def probe(data: bytes) -> dict:
+    return mxf_klv.probe_buffer(data, len(data))
+
+
+def test_complete_header():
+    result = probe(build_mxf())
+    video, first_audio, second_audio = result['streams']
+    assert (video['codec_name'], video['width'], video['height']) == ('dnxhd', 1920, 1080)
+    assert [first_audio['codec_type'], second_audio['codec_type']] == ['audio', 'audio']
+    assert result['format']['tags']['company_name'] == 'ARRI'
+    assert result['metadata_partition'] == {'kind': 'header', 'status': 'closed_complete'}
+    assert mxf_klv.incomplete(result) is None
+
+
+def test_run_in_before_header_partition():
+    plain = probe(build_mxf())
+    shifted = probe(build_mxf(run_in=b'\xff' * 4096, header_status=OPEN_INCOMPLETE, header_meta=False))
+    # The footer offset is relative to the header partition, not the file start
+    assert shifted['metadata_partition']['kind'] == 'footer'
+    assert [stream['codec_name'] for stream in shifted['streams']] == \
+        [stream['codec_name'] for stream in plain['streams']]
+
+
+def test_footer_found_through_random_index_pack():
+    result = probe(build_mxf(header_status=OPEN_INCOMPLETE, header_meta=False, footer_in_header=False))
+    assert result['metadata_partition'] == {'kind': 'footer', 'status': 'closed_complete'}
+    assert result['streams'][0]['codec_name'] == 'dnxhd'
+    assert mxf_klv.incomplete(result) is None
+
+
+def test_incomplete_header_without_footer_repeat():
+    result = probe(build_mxf(header_status=OPEN_INCOMPLETE, footer_meta=False))
+    assert result['metadata_partition'] == {'kind': 'header', 'status': 'open_incomplete'}
+    assert result['streams'][0]['codec_name'] == 'dnxhd'
+    assert mxf_klv.incomplete(result) is not None
+
+
+def test_truncated_random_index_pack():
+    data = build_mxf(header_status=OPEN_INCOMPLETE, header_meta=False, footer_in_header=False, rip=False)
+    # A RIP key whose length runs past the end of the file
+    data += RIP_KEY + b'\x83\xff\xff\xff' + struct.pack('>I', 16 + 4 + 4)
+    with pytest.raises(mxf_klv.MxfError):
+        probe(data)
+
+
+def test_multiple_descriptor_sub_descriptors():
+    video, first_audio, second_audio = probe(build_mxf())['streams']
+    assert video['display_aspect_ratio'] == '16:9'
+    for audio in (first_audio, second_audio):
+        assert (audio['codec_name'], audio['sample_rate'], audio['channels']) == ('pcm_s24le', '48000', 1)
+
+
+@pytest.mark.parametrize('tc_base, tc_start, drop_frame, expected', [
+    (25, 90000, False, '01:00:00:00'),
+    (30, 107892, True, '01:00:00;00'),
+])
+def test_timecode(tc_base, tc_start, drop_frame, expected):
+    result = probe(build_mxf(tc_base=tc_base, tc_start=tc_start, drop_frame=drop_frame))
+    assert result['format']['tags']['timecode'] == expected
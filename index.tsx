@@ -93,6 +93,41 @@ const formatNumber = (num: number, decimals = 2) =>
     maximumFractionDigits: decimals,
   });
 
+// Heavy endpoints run as background jobs: the upload returns a job id at once
+// and the job is polled until its result (same body and headers as an inline
+// response) can be fetched, so no request is held open while the server works.
+const JOB_POLL_INTERVAL = 500;
+
+const describeJob = (job: any): string => {
+  if (!job.stage) return job.status === 'queued' ? 'Queued...' : 'Processing...';
+  const stage = job.stage.charAt(0).toUpperCase() + job.stage.slice(1);
+  return job.total ? `${stage} (${job.done ?? 0} / ${job.total})` : `${stage}...`;
+};
+
+const awaitJobResult = async (jobId: string, onProgress?: (job: any) => void): Promise<Response> => {
+  while (true) {
+    const response = await fetch(`/api/jobs/${jobId}`);
+    const job = await response.json().catch(() => ({}));
+    if (!response.ok) throw new Error(job.error || `HTTP error! status: ${response.status}`);
+    if (job.status === 'done') return fetch(`/api/jobs/${jobId}/result`);
+    if (job.status === 'failed' || job.status === 'cancelled') {
+      throw new Error(job.error || `The job was ${job.status}`);
+    }
+    onProgress?.(job);
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+  }
+};
+
+const runJob = async (url: string, formData: FormData, onProgress?: (job: any) => void): Promise<Response> => {
+  formData.append("background", "true");
+  const response = await fetch(url, { method: "POST", body: formData });
+  // Validation errors are answered right away, like inline requests
+  if (response.status !== 202) return response;
+  const job = await response.json();
+  onProgress?.(job);
+  return awaitJobResult(job.job_id, onProgress);
+};
+
 // --- Components ---
 
 interface CopyButtonProps {
@@ -604,6 +639,7 @@ const EDLHacker = () => {
   const [dragActive, setDragActive] = useState(false);
   const [viewMode, setViewMode] = useState<'table' | 'grouped'>('table');
   const [error, setError] = useState<string | null>(null);
+  const [parseErrors, setParseErrors] = useState<{ file: string; error: string }[]>([]);
   const [loading, setLoading] = useState<boolean>(false);
   const [originalFiles, setOriginalFiles] = useState<File[]>([]);
 
@@ -666,6 +702,7 @@ const EDLHacker = () => {
 
     setLoading(true);
     setError(null);
+    setParseErrors([]);
     setEdlData([]);
 
     const formData = new FormData();
@@ -691,6 +728,12 @@ const EDLHacker = () => {
         throw new Error(errData.error || `HTTP error! status: ${response.status}`);
       }
 
+      // Files that failed to parse while the rest of the batch succeeded
+      const failed = response.headers.get("X-Parse-Errors");
+      if (failed) {
+        try { setParseErrors(JSON.parse(failed)); } catch (e) {}
+      }
+
       const data = await response.json();
       if (data && data.length > 0) {
         setEdlData(data);
@@ -799,6 +842,7 @@ const EDLHacker = () => {
   const resetView = () => {
       setEdlData([]);
       setError(null);
+      setParseErrors([]);
       setLoading(false);
   }
 
@@ -908,6 +952,19 @@ const EDLHacker = () => {
                   </div>
               </div>
 
+              {parseErrors.length > 0 && (
+                  <div className="px-4 py-3 border-b border-amber-200 bg-amber-50 text-sm text-amber-900">
+                      <div className="font-bold">
+                          {parseErrors.length} {parseErrors.length === 1 ? 'file' : 'files'} could not be parsed and {parseErrors.length === 1 ? 'is' : 'are'} not included:
+                      </div>
+                      <ul className="mt-1 space-y-0.5">
+                          {parseErrors.map((e, i) => (
+                              <li key={i}><span className="font-mono">{e.file}</span>: {e.error}</li>
+                          ))}
+                      </ul>
+                  </div>
+              )}
+
               <CollapsibleSection title={<><Settings size={20} /> Options</>} defaultOpen={true}>
                 <div className="p-4 grid grid-cols-1 md:grid-cols-4 gap-8">
                     {/* Column 1: Filter */}
@@ -1144,6 +1201,7 @@ const AVBInspector = () => {
     const [viewMode, setViewMode] = useState<'human' | 'raw'>('human');
     const [originalFile, setOriginalFile] = useState<File | null>(null);
     const [uploadProgress, setUploadProgress] = useState(0);
+    const [jobStage, setJobStage] = useState<string | null>(null);
 
     useEffect(() => {
         const handleBeforeUnload = (event: BeforeUnloadEvent) => {
@@ -1172,8 +1230,26 @@ const AVBInspector = () => {
         setOriginalFile(file);
         setViewMode('human');
         setUploadProgress(0);
+        setJobStage(null);
         const formData = new FormData();
         formData.append("file", file);
+        formData.append("background", "true");
+
+        const fetchResult = async (jobId: string) => {
+            try {
+                const response = await awaitJobResult(jobId, (job) => setJobStage(describeJob(job)));
+                if (!response.ok) {
+                    const err = await response.json().catch(() => ({}));
+                    throw new Error(err.details || err.error || `HTTP error! status: ${response.status}`);
+                }
+                setAvbData(await response.json());
+            } catch (e: any) {
+                setError(e.message || "Invalid JSON response from server.");
+            } finally {
+                setJobStage(null);
+                setLoading(false);
+            }
+        };
 
         try {
             const xhr = new XMLHttpRequest();
@@ -1189,7 +1265,17 @@ const AVBInspector = () => {
 
             xhr.onload = () => {
                 console.log("Upload complete.");
-                if (xhr.status >= 200 && xhr.status < 300) {
+                if (xhr.status === 202) {
+                    // The bin is read in a background job, poll it for the result
+                    try {
+                        const job = JSON.parse(xhr.responseText);
+                        setJobStage(describeJob(job));
+                        fetchResult(job.job_id);
+                        return;
+                    } catch (e) {
+                        setError("Invalid JSON response from server.");
+                    }
+                } else if (xhr.status >= 200 && xhr.status < 300) {
                     try {
                         const data = JSON.parse(xhr.responseText);
                         setAvbData(data);
@@ -1283,15 +1369,19 @@ const AVBInspector = () => {
         {loading ? (
             <div className="border-2 border-dashed rounded-2xl p-12 text-center min-h-[50vh] flex flex-col items-center justify-center">
                 <Hourglass className="h-10 w-10 text-gray-600 animate-spin" />
-                <div className="text-xl font-bold mt-4 text-gray-900">Uploading...</div>
-                <div className="w-full bg-gray-200 rounded-full mt-4">
-                    <div
-                        className="bg-black text-xs font-medium text-blue-100 text-center p-0.5 leading-none rounded-full"
-                        style={{ width: `${uploadProgress}%` }}
-                    >
-                        {uploadProgress}%
+                <div className="text-xl font-bold mt-4 text-gray-900">{jobStage ? 'Reading bin...' : 'Uploading...'}</div>
+                {jobStage ? (
+                    <p className="text-gray-600 text-sm mt-2">{jobStage}</p>
+                ) : (
+                    <div className="w-full bg-gray-200 rounded-full mt-4">
+                        <div
+                            className="bg-black text-xs font-medium text-blue-100 text-center p-0.5 leading-none rounded-full"
+                            style={{ width: `${uploadProgress}%` }}
+                        >
+                            {uploadProgress}%
+                        </div>
                     </div>
-                </div>
+                )}
             </div>
         ) : error ? (
             <div className="border-2 border-dashed border-red-500 bg-red-50 rounded-2xl p-12 text-center min-h-[50vh] flex flex-col items-center justify-center">
@@ -1680,6 +1770,25 @@ const SummaryTable: React.FC<{ summary: any }> = ({ summary }) => {
     );
 };
 
+// Bytes sent from each end of a large MXF for header/footer-only probing
+const MXF_PARTIAL_RANGE = 16 * 1024 * 1024;
+// Bytes hashed from each end for the probe cache fingerprint, must match FINGERPRINT_CHUNK on the server
+const MXF_FINGERPRINT_CHUNK = 1024 * 1024;
+
+const sha256Hex = async (blob: Blob) => {
+    const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+};
+
+// "<size>-<head sha256>-<tail sha256>", or null where SubtleCrypto is unavailable (plain http)
+const mxfFingerprint = async (file: File) => {
+    if (!window.crypto?.subtle) return null;
+    const length = Math.min(MXF_FINGERPRINT_CHUNK, file.size);
+    const head = await sha256Hex(file.slice(0, length));
+    const tail = await sha256Hex(file.slice(file.size - length));
+    return `${file.size}-${head}-${tail}`;
+};
+
 const MXFInspector = () => {
     const [dragActive, setDragActive] = useState(false);
     const [loading, setLoading] = useState(false);
@@ -1714,12 +1823,38 @@ const MXFInspector = () => {
         setMxfData(null);
         setViewMode('human');
         setUploadProgress(0);
+
+        // A file inspected before is answered from the server's probe cache without uploading it
+        try {
+            const fingerprint = await mxfFingerprint(file);
+            if (fingerprint) {
+                const params = new URLSearchParams({ fingerprint, filename: file.name });
+                const res = await fetch(`/api/mxf/lookup?${params}`);
+                if (res.ok) {
+                    setMxfData(await res.json());
+                    setLoading(false);
+                    return;
+                }
+            }
+        } catch (e) {
+            console.warn("Probe cache lookup failed, uploading instead.", e);
+        }
+
         const formData = new FormData();
-        formData.append("file", file);
+        // Large files: send only the header and footer partitions, the server probes a sparse stand-in
+        const partial = file.size > MXF_PARTIAL_RANGE * 2;
+        if (partial) {
+            formData.append("head", file.slice(0, MXF_PARTIAL_RANGE), "head.mxf");
+            formData.append("tail", file.slice(file.size - MXF_PARTIAL_RANGE), "tail.mxf");
+            formData.append("size", String(file.size));
+            formData.append("filename", file.name);
+        } else {
+            formData.append("file", file);
+        }
 
         try {
             const xhr = new XMLHttpRequest();
-            xhr.open("POST", "/api/mxf", true);
+            xhr.open("POST", partial ? "/api/mxf/partial" : "/api/mxf", true);
 
             xhr.upload.onprogress = (event) => {
                 if (event.lengthComputable) {
@@ -1886,6 +2021,7 @@ const AleConverter = () => {
     const [loading, setLoading] = useState<string | null>(null); // 'multi' or 'merge'
     const [error, setError] = useState<string | null>(null);
     const [success, setSuccess] = useState<string | null>(null);
+    const [jobStage, setJobStage] = useState<string | null>(null);
 
     useEffect(() => {
         const handleBeforeUnload = (event: BeforeUnloadEvent) => {
@@ -1974,10 +2110,7 @@ const AleConverter = () => {
         }
 
         try {
-            const response = await fetch(apiEndpoint, {
-                method: "POST",
-                body: formData,
-            });
+            const response = await runJob(apiEndpoint, formData, (job) => setJobStage(describeJob(job)));
             if (operation === 'multi') {
                 await handleMultiFileApiResponse(response);
             } else if (successFileName) {
@@ -1987,6 +2120,7 @@ const AleConverter = () => {
             setError(e.message);
         } finally {
             setLoading(null);
+            setJobStage(null);
         }
     };
 
@@ -2018,6 +2152,7 @@ const AleConverter = () => {
                  <div className="rounded-2xl p-8 text-center flex flex-col items-center justify-center bg-gray-50 border border-gray-200">
                     <Hourglass className="h-8 w-8 text-gray-600 animate-spin" />
                     <div className="text-lg font-bold mt-3 text-gray-900">Processing...</div>
+                    {jobStage && <p className="text-gray-600 text-sm mt-1">{jobStage}</p>}
                 </div>
             )}
 